@@ -9,6 +9,14 @@ from handlers.customer import customer_bp
 from handlers.agent import agent_bp
 from handlers.staff import staff_bp
 from handlers.utils import init_db_connection, login_required
+from handlers.metrics import init_metrics
+from handlers.slow_log import init_slow_log
+from handlers.passwords import init_passwords
+from handlers.ticket_ids import init_ticket_ids
+from handlers.seat_holds import init_seat_holds
+from handlers.rollups import rollups_cli
+from handlers.migrations import db_cli
+from handlers.flight_import import flights_cli
 
 load_dotenv()
 
@@ -22,8 +30,77 @@ def create_app():
     app.config["DB_USER"] = os.getenv("DB_USER", "root")
     app.config["DB_PASSWORD"] = os.getenv("DB_PASSWORD", "")
     app.config["DB_NAME"] = os.getenv("DB_NAME", "bookingsystem")
+    # mysql (默认) 或 sqlite：嵌入式替身，本地无 MySQL 时跑应用 / 基准 / 并发测试
+    app.config["DB_BACKEND"] = os.getenv("DB_BACKEND", "mysql")
+    app.config["SQLITE_PATH"] = os.getenv("SQLITE_PATH", os.path.join("data", "bookingsystem.sqlite3"))
+    app.config["SQLITE_BUSY_TIMEOUT"] = float(os.getenv("SQLITE_BUSY_TIMEOUT", "10"))
+
+    # Connection pool
+    app.config["DB_POOL_SIZE"] = int(os.getenv("DB_POOL_SIZE", "10"))
+    app.config["DB_POOL_TIMEOUT"] = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+    app.config["DB_POOL_RECYCLE"] = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+    app.config["DB_POOL_PING_INTERVAL"] = float(os.getenv("DB_POOL_PING_INTERVAL", "0"))
+
+    # In-memory flight search index: full rebuild interval (seconds)
+    app.config["SEARCH_INDEX_TTL"] = int(os.getenv("SEARCH_INDEX_TTL", "60"))
+    # Airport / city / alias resolver reload interval (seconds)
+    app.config["AIRPORT_RESOLVER_TTL"] = int(os.getenv("AIRPORT_RESOLVER_TTL", "300"))
+    # "Active airports" lists: server cache TTL and browser max-age (seconds)
+    app.config["AIRPORT_CACHE_TTL"] = int(os.getenv("AIRPORT_CACHE_TTL", "60"))
+    # Flight status push (SSE): max open streams per process, keep-alive interval (seconds)
+    app.config["SSE_MAX_SUBSCRIBERS"] = int(os.getenv("SSE_MAX_SUBSCRIBERS", "1000"))
+    app.config["SSE_HEARTBEAT"] = int(os.getenv("SSE_HEARTBEAT", "15"))
+    # Metrics: statements slower than this are sampled (ms); optional bearer token for /metrics
+    app.config["SLOW_QUERY_MS"] = float(os.getenv("SLOW_QUERY_MS", "200"))
+    app.config["METRICS_TOKEN"] = os.getenv("METRICS_TOKEN", "")
+    # Slow-query log (JSON lines, rotated by size) with rate-limited EXPLAIN capture; empty path disables it
+    app.config["SLOW_LOG_PATH"] = os.getenv("SLOW_LOG_PATH", os.path.join("logs", "slow_queries.log"))
+    app.config["SLOW_LOG_MAX_BYTES"] = int(os.getenv("SLOW_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    app.config["SLOW_LOG_BACKUPS"] = int(os.getenv("SLOW_LOG_BACKUPS", "5"))
+    app.config["SLOW_LOG_EXPLAIN_INTERVAL"] = int(os.getenv("SLOW_LOG_EXPLAIN_INTERVAL", "300"))
+    app.config["SLOW_LOG_EXPLAINS_PER_MINUTE"] = int(os.getenv("SLOW_LOG_EXPLAINS_PER_MINUTE", "10"))
+    # Bulk flight import: max rows per upload, rows per multi-row INSERT
+    app.config["FLIGHT_IMPORT_MAX_ROWS"] = int(os.getenv("FLIGHT_IMPORT_MAX_ROWS", "200000"))
+    app.config["FLIGHT_IMPORT_BATCH_SIZE"] = int(os.getenv("FLIGHT_IMPORT_BATCH_SIZE", "1000"))
+    # Recurring schedules: how many days ahead `flights expand` materializes flights
+    app.config["SCHEDULE_HORIZON_DAYS"] = int(os.getenv("SCHEDULE_HORIZON_DAYS", "60"))
+    # Staff identity cache (airline + permissions): entry lifetime (seconds) and max entries per process
+    app.config["STAFF_IDENTITY_TTL"] = int(os.getenv("STAFF_IDENTITY_TTL", "60"))
+    app.config["STAFF_IDENTITY_CACHE_SIZE"] = int(os.getenv("STAFF_IDENTITY_CACHE_SIZE", "10000"))
+    # Booking agent airline set (work_with) cache: entry lifetime (seconds) and max entries per process
+    app.config["AGENT_AIRLINES_TTL"] = int(os.getenv("AGENT_AIRLINES_TTL", "60"))
+    app.config["AGENT_AIRLINES_CACHE_SIZE"] = int(os.getenv("AGENT_AIRLINES_CACHE_SIZE", "10000"))
+    # Flight lifecycle (`flights lifecycle`): rows per status / archive batch; flights finished more than
+    # ARCHIVE_AFTER_DAYS ago move to the archive tables (keep it above the 1-year analytics windows);
+    # archive interval (seconds) when running with --every
+    app.config["LIFECYCLE_BATCH_SIZE"] = int(os.getenv("LIFECYCLE_BATCH_SIZE", "1000"))
+    app.config["ARCHIVE_AFTER_DAYS"] = int(os.getenv("ARCHIVE_AFTER_DAYS", "400"))
+    app.config["LIFECYCLE_ARCHIVE_INTERVAL"] = int(os.getenv("LIFECYCLE_ARCHIVE_INTERVAL", "3600"))
+    # Password hashing (handlers/passwords.py): method for new hashes (full parameters; older hashes are
+    # upgraded on login), worker processes (0 = hash on the request thread), jobs allowed to wait beyond
+    # the workers, seconds to wait for a result, Retry-After of the 503 when saturated
+    app.config["PASSWORD_HASH_METHOD"] = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:200000")
+    app.config["PASSWORD_HASH_WORKERS"] = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    app.config["PASSWORD_HASH_QUEUE"] = int(os.getenv("PASSWORD_HASH_QUEUE", "16"))
+    app.config["PASSWORD_HASH_TIMEOUT"] = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+    app.config["PASSWORD_HASH_RETRY_AFTER"] = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "2"))
+    # Ticket ID generator (handlers/ticket_ids.py): worker id 0-16383, unique per process / host;
+    # unset = derived from host name + pid
+    app.config["TICKET_WORKER_ID"] = int(os.environ["TICKET_WORKER_ID"]) if os.getenv("TICKET_WORKER_ID") else None
+    # Seat holds during checkout (handlers/seat_holds.py): "db" (seat_hold table, shared by all workers) or
+    # "memory" (this process only); hold lifetime (seconds), seconds a process reuses its snapshot of live
+    # holds for search results, expired holds deleted per sweep batch
+    app.config["SEAT_HOLD_STORE"] = os.getenv("SEAT_HOLD_STORE", "db")
+    app.config["SEAT_HOLD_TTL"] = int(os.getenv("SEAT_HOLD_TTL", "600"))
+    app.config["SEAT_HOLD_REFRESH"] = float(os.getenv("SEAT_HOLD_REFRESH", "1"))
+    app.config["SEAT_HOLD_SWEEP_BATCH"] = int(os.getenv("SEAT_HOLD_SWEEP_BATCH", "1000"))
 
     init_db_connection(app)
+    init_metrics(app)
+    init_slow_log(app)
+    init_passwords(app)
+    init_ticket_ids(app)
+    init_seat_holds(app)
 
     def datetimeformat(value, format='%Y-%m-%d %H:%M'):
             """Jinja 过滤器：格式化 datetime 对象"""
@@ -45,6 +122,11 @@ def create_app():
     app.register_blueprint(agent_bp, url_prefix="/agent")
     app.register_blueprint(staff_bp, url_prefix="/staff")
 
+    # CLI: flask --app app rollups rebuild / db migrate / db explain-check / db slow-queries / flights import / flights expand / flights lifecycle
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(db_cli)
+    app.cli.add_command(flights_cli)
+
     @app.route("/")
     def index():
         # 未登录就看公共首页
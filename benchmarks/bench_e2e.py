@@ -0,0 +1,409 @@
+"""
+端到端基准：按真实流量比例压测热点接口。
+
+    python -m benchmarks.bench_e2e --duration 30 --concurrency 8 --out results.json
+    python -m benchmarks.bench_e2e --mode server --duration 30 --baseline benchmarks/baseline.json
+    python -m benchmarks.bench_e2e --read-only --only public.live_search,public.check_status
+
+流量组成 (--only 选子集，权重见 SCENARIOS)：公开页面逐字输入的 live search、
+航班状态查询、客户 / 代理搜索和购票、代理交易记录、staff dashboard / analytics。
+
+  --mode client   Flask test client，同进程调用 (默认，测 handler + SQL 本身)
+  --mode server   进程内启动 werkzeug 多线程 WSGI 服务器，经真实 HTTP 访问
+
+每个场景输出请求数、错误数、吞吐、p50 / p95 / p99 延迟，以及每请求 SQL 条数和
+SQL 耗时 (取自 handlers.metrics.registry)。--out 写 JSON 结果；--baseline 与之前的
+结果比较，p95 变慢或吞吐下降超过 --tolerance、每请求 SQL 条数增加，都算回归，退出码 1。
+
+默认账号来自 benchmarks/datagen.py 生成的数据 (密码 "synthetic")。
+购票会真实写库，请在测试库上运行；--read-only 去掉写请求。
+"""
+import argparse
+import http.cookiejar
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[k]
+
+
+# ---------- 客户端 ----------
+
+class TestClient:
+    """Flask test client; keeps its own session cookie."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def get(self, path, params=None):
+        return self.client.get(path, query_string=params).status_code
+
+    def post(self, path, data):
+        return self.client.post(path, data=data).status_code
+
+
+class HttpClient:
+    """urllib client against a running server; redirects are not followed."""
+
+    class _NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), self._NoRedirect()
+        )
+
+    def _open(self, request):
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+    def get(self, path, params=None):
+        url = self.base_url + path
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        return self._open(urllib.request.Request(url))
+
+    def post(self, path, data):
+        return self._open(urllib.request.Request(self.base_url + path, data=urllib.parse.urlencode(data).encode()))
+
+
+def login(client, role, user, password):
+    status = client.post("/login", {"role": role, "email_or_username": user, "password": password})
+    # 成功时重定向到 dashboard，失败时重新渲染登录页 (200)
+    if status != 302:
+        raise SystemExit(f"login failed for {role} {user} (status {status})")
+
+
+# ---------- 场景 ----------
+
+def _live_search(c, rng, d):
+    # 模拟逐字输入：城市名的某个前缀
+    city = rng.choice(d["cities"])
+    prefix = city[: rng.randint(1, len(city))]
+    params = {"origin": prefix} if rng.random() < 0.6 else {"destination": prefix}
+    if rng.random() < 0.3:
+        params["date"] = rng.choice(d["flights"])["day"]
+    return c.get("/api/live_search", params)
+
+
+def _check_status(c, rng, d):
+    f = rng.choice(d["flights"])
+    r = rng.random()
+    if r < 0.5:
+        params = {"flight_number": f["flight_number"]}
+    elif r < 0.8:
+        params = {"airline": f["airline_name"], "date": f["day"]}
+    else:
+        params = {"date": f["day"]}
+    return c.get("/api/check_status", params)
+
+
+def _customer_search(c, rng, d):
+    f = rng.choice(d["flights"])
+    return c.get("/customer/api/search_flights", {"origin": f["dep_city"], "destination": f["arr_city"]})
+
+
+def _customer_purchase(c, rng, d):
+    f = rng.choice(d["flights"])
+    return c.post("/customer/purchase", {"airline_name": f["airline_name"], "flight_number": f["flight_number"]})
+
+
+def _agent_search(c, rng, d):
+    f = rng.choice(d["agent_flights"] or d["flights"])
+    return c.get("/agent/api/search_flights", {"origin": f["dep_city"]})
+
+
+def _agent_purchase(c, rng, d):
+    f = rng.choice(d["agent_flights"] or d["flights"])
+    return c.post("/agent/purchase", {"customer_email": rng.choice(d["customers"]),
+                                      "airline_name": f["airline_name"], "flight_number": f["flight_number"]})
+
+
+SCENARIOS = [
+    # name, weight, role, writes, method, path, fn
+    ("public.live_search", 30, None, False, "GET", "/api/live_search", _live_search),
+    ("public.check_status", 15, None, False, "GET", "/api/check_status", _check_status),
+    ("public.get_airports", 5, None, False, "GET", "/api/get_airports",
+     lambda c, rng, d: c.get("/api/get_airports")),
+    ("customer.search_flights_api", 10, "customer", False, "GET", "/customer/api/search_flights", _customer_search),
+    ("customer.flights", 5, "customer", False, "GET", "/customer/flights",
+     lambda c, rng, d: c.get("/customer/flights")),
+    ("customer.purchase", 3, "customer", True, "POST", "/customer/purchase", _customer_purchase),
+    ("agent.search_flights_api", 5, "agent", False, "GET", "/agent/api/search_flights", _agent_search),
+    ("agent.api_agent_transactions", 5, "agent", False, "GET", "/agent/api/agent_transactions",
+     lambda c, rng, d: c.get("/agent/api/agent_transactions")),
+    ("agent.purchase", 2, "agent", True, "POST", "/agent/purchase", _agent_purchase),
+    ("agent.analytics", 3, "agent", False, "GET", "/agent/analytics",
+     lambda c, rng, d: c.get("/agent/analytics")),
+    ("staff.dashboard", 10, "staff", False, "GET", "/staff/dashboard",
+     lambda c, rng, d: c.get("/staff/dashboard")),
+    ("staff.analytics", 5, "staff", False, "GET", "/staff/analytics",
+     lambda c, rng, d: c.get("/staff/analytics")),
+]
+
+
+def load_fixtures(app, args):
+    """Flights / cities / customers to draw request parameters from."""
+    from handlers.utils import query_all
+
+    with app.app_context():
+        flights = query_all(
+            """
+            SELECT f.airline_name, f.flight_number, DATE(f.departure_time) AS day,
+                   da.city AS dep_city, aa.city AS arr_city
+            FROM flight f
+            JOIN airport da ON f.departure_airport = da.name
+            JOIN airport aa ON f.arrival_airport = aa.name
+            WHERE f.status = 'upcoming' AND f.departure_time > NOW() AND f.remaining_seats > 0
+            ORDER BY f.departure_time
+            LIMIT 2000
+            """
+        )
+        agent_airlines = {r["airline_name"] for r in query_all(
+            "SELECT airline_name FROM work_with WHERE agent_email=%s", (args.agent,))}
+        customers = [r["email"] for r in query_all("SELECT email FROM customer LIMIT 1000")]
+    if not flights:
+        raise SystemExit("no upcoming flights with free seats; load data first (benchmarks/datagen.py)")
+    for f in flights:
+        f["day"] = str(f["day"])
+    return {
+        "flights": flights,
+        "agent_flights": [f for f in flights if f["airline_name"] in agent_airlines],
+        "cities": sorted({f["dep_city"] for f in flights} | {f["arr_city"] for f in flights}),
+        "customers": customers or [args.customer],
+    }
+
+
+# ---------- 运行 ----------
+
+def run(make_client, scenarios, data, args):
+    """Run the mix; returns ({scenario: [latency]}, {scenario: errors}, measured seconds)."""
+    from handlers.metrics import registry
+
+    weights = [s[1] for s in scenarios]
+    roles = {s[2] for s in scenarios if s[2]}
+    accounts = {"customer": args.customer, "agent": args.agent, "staff": args.staff}
+    latencies = {s[0]: [] for s in scenarios}
+    errors = {s[0]: 0 for s in scenarios}
+    lock = threading.Lock()
+    # 登录 (pbkdf2，很慢) 完成后所有线程一起开始
+    start = threading.Barrier(args.concurrency + 1)
+    measuring = threading.Event()
+    stop = threading.Event()
+
+    def worker(n):
+        rng = random.Random(args.seed + n)
+        try:
+            clients = {None: make_client()}
+            for role in roles:
+                clients[role] = make_client()
+                login(clients[role], role, accounts[role], args.password)
+        except BaseException as e:
+            print(f"worker {n}: {e}")
+            start.abort()
+            return
+        local_lat = {name: [] for name in latencies}
+        local_err = {name: 0 for name in latencies}
+        start.wait()
+        while not stop.is_set():
+            name, _, role, _, _, _, fn = rng.choices(scenarios, weights=weights)[0]
+            t0 = time.perf_counter()
+            try:
+                status = fn(clients[role], rng, data)
+            except Exception as e:
+                print(f"{name}: {e}")
+                status = 599
+            elapsed = time.perf_counter() - t0
+            if measuring.is_set():
+                local_lat[name].append(elapsed)
+                if status >= 400:
+                    local_err[name] += 1
+        with lock:
+            for name in latencies:
+                latencies[name].extend(local_lat[name])
+                errors[name] += local_err[name]
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    try:
+        start.wait()
+    except threading.BrokenBarrierError:
+        stop.set()
+        for t in threads:
+            t.join()
+        raise SystemExit("login failed; check --customer / --agent / --staff / --password")
+
+    time.sleep(args.warmup)
+    registry.reset()
+    measuring.set()
+    started = time.perf_counter()
+    time.sleep(args.duration)
+    measuring.clear()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for t in threads:
+        t.join()
+    return latencies, errors, elapsed
+
+
+def summarize(app, scenarios, latencies, errors, elapsed):
+    from handlers.metrics import registry
+
+    adapter = app.url_map.bind("localhost")
+    results = {}
+    for name, _, _, _, method, path, _ in scenarios:
+        lat = latencies[name]
+        endpoint = adapter.match(path, method=method)[0]
+        queries = registry.request_queries.get(endpoint)
+        sql_time = registry.request_sql_time.get(endpoint)
+        results[name] = {
+            "endpoint": endpoint,
+            "requests": len(lat),
+            "errors": errors[name],
+            "rps": round(len(lat) / elapsed, 2),
+            "mean_ms": round(sum(lat) / len(lat) * 1000, 3) if lat else 0.0,
+            "p50_ms": round(percentile(lat, 50) * 1000, 3),
+            "p95_ms": round(percentile(lat, 95) * 1000, 3),
+            "p99_ms": round(percentile(lat, 99) * 1000, 3),
+            "queries_per_request": round(queries.sum / queries.count, 2) if queries and queries.count else None,
+            "sql_ms_per_request": round(sql_time.sum / sql_time.count * 1000, 3) if sql_time and sql_time.count else None,
+        }
+    total = sum(r["requests"] for r in results.values())
+    return results, {"requests": total, "rps": round(total / elapsed, 2), "seconds": round(elapsed, 2)}
+
+
+def compare(results, baseline, tolerance):
+    """Regressions against a previous result file: slower p95, lower rps, more SQL per request."""
+    regressions = []
+    for name, r in results.items():
+        b = baseline.get("scenarios", {}).get(name)
+        if not b or not r["requests"] or not b.get("requests"):
+            continue
+        if r["p95_ms"] > b["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {b['p95_ms']}ms -> {r['p95_ms']}ms")
+        if r["rps"] < b["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {b['rps']} -> {r['rps']}")
+        # SQL 条数是确定的，多一条就是 N+1 之类的回归
+        if (r["queries_per_request"] is not None and b.get("queries_per_request") is not None
+                and r["queries_per_request"] > b["queries_per_request"] + 0.5):
+            regressions.append(f"{name}: queries/request {b['queries_per_request']} -> {r['queries_per_request']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["client", "server"], default="client")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before the run")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--only", default=None, help="comma-separated scenario names")
+    parser.add_argument("--read-only", action="store_true", help="skip the purchase scenarios")
+    parser.add_argument("--customer", default="user00000000@synthetic.test")
+    parser.add_argument("--agent", default="agent000000@synthetic.test")
+    parser.add_argument("--staff", default="synth_admin_xa")
+    parser.add_argument("--password", default="synthetic")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=None, help="write JSON results here")
+    parser.add_argument("--baseline", default=None, help="previous JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 / rps change (fraction)")
+    args = parser.parse_args()
+
+    scenarios = SCENARIOS
+    if args.only:
+        wanted = set(args.only.split(","))
+        unknown = wanted - {s[0] for s in SCENARIOS}
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+        scenarios = [s for s in scenarios if s[0] in wanted]
+    if args.read_only:
+        scenarios = [s for s in scenarios if not s[3]]
+
+    os.environ.setdefault("DB_POOL_SIZE", str(args.concurrency + 2))
+    # 慢 SQL 日志的 EXPLAIN 抓取会干扰计时，除非显式配置
+    os.environ.setdefault("SLOW_LOG_PATH", "")
+    from app import create_app
+
+    app = create_app()
+    data = load_fixtures(app, args)
+
+    server = None
+    if args.mode == "server":
+        from werkzeug.serving import make_server
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)  # 不打印每条访问日志
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        make_client = lambda: HttpClient(base_url)
+    else:
+        make_client = lambda: TestClient(app)
+
+    print(f"mode={args.mode} concurrency={args.concurrency} duration={args.duration}s "
+          f"scenarios={len(scenarios)} flights={len(data['flights'])}")
+    try:
+        latencies, errors, elapsed = run(make_client, scenarios, data, args)
+    finally:
+        if server is not None:
+            server.shutdown()
+    results, totals = summarize(app, scenarios, latencies, errors, elapsed)
+
+    print(f"{'scenario':32s} {'reqs':>7s} {'err':>5s} {'rps':>8s} {'p50ms':>8s} {'p95ms':>8s} {'p99ms':>8s} "
+          f"{'sql/req':>8s} {'sqlms':>8s}")
+    for name, r in results.items():
+        qpr = "-" if r["queries_per_request"] is None else f"{r['queries_per_request']:.1f}"
+        sql_ms = "-" if r["sql_ms_per_request"] is None else f"{r['sql_ms_per_request']:.2f}"
+        print(f"{name:32s} {r['requests']:7d} {r['errors']:5d} {r['rps']:8.1f} {r['p50_ms']:8.2f} "
+              f"{r['p95_ms']:8.2f} {r['p99_ms']:8.2f} {qpr:>8s} {sql_ms:>8s}")
+    print(f"total {totals['requests']} requests, {totals['rps']} req/s")
+
+    output = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "mode": args.mode, "concurrency": args.concurrency, "duration": args.duration,
+            "read_only": args.read_only, "python": platform.python_version(),
+            "db": f"{app.config['DB_HOST']}:{app.config['DB_PORT']}/{app.config['DB_NAME']}",
+        },
+        "totals": totals,
+        "scenarios": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+        print(f"results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("REGRESSIONS:")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print(f"no regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
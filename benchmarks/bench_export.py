@@ -0,0 +1,102 @@
+"""
+流式导出吞吐量 / 内存基准。
+
+    python -m benchmarks.bench_export transactions --agent agent_a@test.com
+    python -m benchmarks.bench_export customer_flights --airline Delta --format ndjson
+    python -m benchmarks.bench_export passengers --airline Delta --flight DL9010 --buffered --memory
+
+对同一条导出查询比较：
+  streamed  无缓冲服务端游标 (utils.stream_query) + 分块编码，即导出接口的实际路径
+  buffered  fetchall() 全部取回后再编码 (--buffered 时额外运行)
+输出行数、耗时、rows/s、MB/s；--memory 时再跑一轮记录 Python 堆峰值 (tracemalloc)。
+吞吐量要在数百万行的 purchases 数据集上才有意义。
+"""
+import argparse
+import time
+import tracemalloc
+
+
+def run(label, produce_rows, encode, columns, trace=False):
+    if trace:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    rows = produce_rows()
+    counted = _Counted(rows)
+    size = 0
+    for chunk in encode(counted, columns):
+        size += len(chunk.encode("utf-8"))
+    n = counted.count
+    elapsed = time.perf_counter() - t0
+    if hasattr(rows, "close"):
+        rows.close()
+    if trace:
+        # tracemalloc 本身会拖慢好几倍，这一轮只看内存
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:9s} rows={n} peak_heap={peak / 1e6:.1f}MB")
+    else:
+        print(f"{label:9s} rows={n} elapsed={elapsed:.2f}s rows/s={n / elapsed:,.0f} "
+              f"MB/s={size / elapsed / 1e6:.1f} output={size / 1e6:.1f}MB")
+
+
+class _Counted:
+    def __init__(self, rows):
+        self.rows, self.count = rows, 0
+
+    def __iter__(self):
+        for row in self.rows:
+            self.count += 1
+            yield row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("export", choices=["transactions", "passengers", "customer_flights"])
+    parser.add_argument("--agent")
+    parser.add_argument("--airline")
+    parser.add_argument("--flight")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--buffered", action="store_true", help="also run the fetchall() baseline")
+    parser.add_argument("--memory", action="store_true", help="extra pass measuring peak heap with tracemalloc")
+    args = parser.parse_args()
+
+    from app import create_app
+    from handlers import exports
+    from handlers.utils import query_all, stream_query
+    from handlers.agent import _transactions_query, _transaction_filters, TRANSACTION_EXPORT_COLUMNS
+    from handlers.staff import (
+        _PASSENGERS_SQL, _customer_flights_query, PASSENGER_EXPORT_COLUMNS, CUSTOMER_FLIGHT_EXPORT_COLUMNS,
+    )
+
+    if args.export == "transactions":
+        if not args.agent:
+            parser.error("--agent is required")
+        sql, params = _transactions_query(args.agent, _transaction_filters({}))
+        sql += " ORDER BY p.purchase_date DESC, p.ticket_ID DESC"
+        columns = TRANSACTION_EXPORT_COLUMNS
+    elif args.export == "passengers":
+        if not (args.airline and args.flight):
+            parser.error("--airline and --flight are required")
+        sql, params = _PASSENGERS_SQL + " ORDER BY t.ticket_ID", [args.airline, args.flight]
+        columns = PASSENGER_EXPORT_COLUMNS
+    else:
+        if not args.airline:
+            parser.error("--airline is required")
+        sql, params = _customer_flights_query(args.airline, "")
+        sql += " ORDER BY f.departure_time DESC, t.ticket_ID DESC"
+        columns = CUSTOMER_FLIGHT_EXPORT_COLUMNS
+
+    encode = exports.iter_csv if args.format == "csv" else exports.iter_ndjson
+    app = create_app()
+    print(f"export={args.export} format={args.format}")
+    modes = [("streamed", lambda: stream_query(sql, tuple(params)))]
+    if args.buffered:
+        modes.append(("buffered", lambda: query_all(sql, tuple(params))))
+    for trace in ([False, True] if args.memory else [False]):
+        for label, produce_rows in modes:
+            with app.app_context():
+                run(label, produce_rows, encode, columns, trace=trace)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+flight_search 读模型 vs. 原来的 JOIN 查询。
+
+    python -m benchmarks.bench_flight_search --repeat 50
+    python -m benchmarks.bench_flight_search --airline "Synth Air XA" --explain
+
+每个场景把同一个读取分别用两种写法跑 --repeat 次：
+  join    flight JOIN airport x2 (+ airplane、COUNT(ticket) 子查询)，即 004 迁移之前的写法
+  search  直接读 flight_search
+输出行数 (两边必须一致)、p50 / p95 毫秒；--explain 时再打印两边的执行计划。
+差距要在 datagen --scale medium 以上的数据集上才明显。
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[k]
+
+
+def scenarios(airline, now):
+    """[(name, join_sql, search_sql, params)]"""
+    window = (now - timedelta(days=1), now + timedelta(days=1))
+    return [
+        (
+            "search_index.rebuild",
+            """
+            SELECT f.*, da.city AS dep_city, aa.city AS arr_city, ap.seat_capacity, COALESCE(s.sold_cnt, 0) AS sold_cnt
+            FROM flight f
+            JOIN airport da ON f.departure_airport = da.name
+            JOIN airport aa ON f.arrival_airport = aa.name
+            LEFT JOIN airplane ap ON f.airplane_assigned = ap.airplane_id AND f.airline_name = ap.airline_name
+            LEFT JOIN (
+                SELECT airline_name, flight_number, COUNT(*) AS sold_cnt
+                FROM ticket
+                GROUP BY airline_name, flight_number
+            ) s ON s.airline_name = f.airline_name AND s.flight_number = f.flight_number
+            WHERE f.departure_time > NOW()
+            """,
+            "SELECT f.* FROM flight_search f WHERE f.departure_time > NOW()",
+            (),
+        ),
+        (
+            "public.check_status_api",
+            """
+            SELECT f.*, da.city AS dep_city, aa.city AS arr_city
+            FROM flight f
+            JOIN airport da ON f.departure_airport = da.name
+            JOIN airport aa ON f.arrival_airport = aa.name
+            WHERE f.status IN ('in-progress', 'delayed', 'upcoming')
+              AND f.departure_time >= %s AND f.departure_time < %s
+            ORDER BY f.departure_time DESC LIMIT 20
+            """,
+            """
+            SELECT f.*
+            FROM flight_search f
+            WHERE f.status IN ('in-progress', 'delayed', 'upcoming')
+              AND f.departure_time >= %s AND f.departure_time < %s
+            ORDER BY f.departure_time DESC LIMIT 20
+            """,
+            window,
+        ),
+        (
+            "public.get_airports",
+            """
+            SELECT DISTINCT f.departure_airport AS code, a.city
+            FROM flight f
+            JOIN airport a ON f.departure_airport = a.name
+            WHERE f.status = 'upcoming' AND f.departure_time > NOW()
+            ORDER BY a.city
+            """,
+            """
+            SELECT DISTINCT f.departure_airport AS code, f.dep_city AS city
+            FROM flight_search f
+            WHERE f.status = 'upcoming' AND f.departure_time > NOW()
+            ORDER BY f.dep_city
+            """,
+            (),
+        ),
+        (
+            "staff.dashboard",
+            """
+            SELECT f.*, da.city AS dep_city, aa.city AS arr_city
+            FROM flight f
+            LEFT JOIN airport da ON f.departure_airport = da.name
+            LEFT JOIN airport aa ON f.arrival_airport = aa.name
+            WHERE f.airline_name = %s
+              AND f.departure_time BETWEEN NOW() AND DATE_ADD(NOW(), INTERVAL 30 DAY)
+            ORDER BY f.departure_time ASC
+            """,
+            """
+            SELECT f.*
+            FROM flight_search f
+            WHERE f.airline_name = %s
+              AND f.departure_time BETWEEN NOW() AND DATE_ADD(NOW(), INTERVAL 30 DAY)
+            ORDER BY f.departure_time ASC
+            """,
+            (airline,),
+        ),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--airline", default=None, help="airline for the staff scenario (default: busiest)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--explain", action="store_true", help="print both query plans per scenario")
+    args = parser.parse_args()
+
+    from app import create_app
+    from handlers.utils import get_backend, query_all, query_one
+
+    app = create_app()
+    with app.app_context():
+        airline = args.airline or query_one(
+            "SELECT airline_name FROM flight GROUP BY airline_name ORDER BY COUNT(*) DESC LIMIT 1"
+        )["airline_name"]
+        explain = "EXPLAIN QUERY PLAN " if get_backend().name == "sqlite" else "EXPLAIN "
+        print(f"airline={airline} repeat={args.repeat}")
+        print(f"{'scenario':26s} {'rows':>7s} {'join p50':>9s} {'p95':>8s} {'search p50':>11s} {'p95':>8s} {'speedup':>8s}")
+        for name, join_sql, search_sql, params in scenarios(airline, datetime.now().replace(microsecond=0)):
+            timings = {}
+            counts = {}
+            for label, sql in (("join", join_sql), ("search", search_sql)):
+                query_all(sql, params)  # 预热缓存
+                samples = []
+                for _ in range(args.repeat):
+                    t0 = time.perf_counter()
+                    rows = query_all(sql, params)
+                    samples.append(time.perf_counter() - t0)
+                timings[label], counts[label] = samples, len(rows)
+            mismatch = "" if counts["join"] == counts["search"] else f"  ROW COUNT MISMATCH join={counts['join']}"
+            j50, s50 = percentile(timings["join"], 50), percentile(timings["search"], 50)
+            print(f"{name:26s} {counts['search']:7d} {j50 * 1e3:9.2f} {percentile(timings['join'], 95) * 1e3:8.2f} "
+                  f"{s50 * 1e3:11.2f} {percentile(timings['search'], 95) * 1e3:8.2f} "
+                  f"{j50 / s50 if s50 else 0:7.1f}x{mismatch}")
+            if args.explain:
+                for label, sql in (("join", join_sql), ("search", search_sql)):
+                    print(f"  -- {label}")
+                    for row in query_all(explain + sql, params):
+                        print("    " + "  ".join(f"{k}={v}" for k, v in row.items() if v is not None))
+
+
+if __name__ == "__main__":
+    main()
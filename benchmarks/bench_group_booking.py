@@ -0,0 +1,65 @@
+"""
+团单购票 vs 逐个购票基准。
+
+    python -m benchmarks.bench_group_booking --airline Delta --flight DL9010 \
+        --agent agent_a@test.com --size 50 --rounds 5 --reset-seats 1000
+
+每轮分别用 purchase_ticket 逐个购买 N 张、用 purchase_group 一次购买 N 张，
+比较总耗时和每位乘客的平均耗时。乘客取 customer 表前 N 个 email。
+注意：会真实写入 ticket / purchases，请在测试库上运行。
+"""
+import argparse
+import statistics
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--airline", required=True)
+    parser.add_argument("--flight", required=True)
+    parser.add_argument("--agent", required=True)
+    parser.add_argument("--size", type=int, default=50, help="passengers per group")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--reset-seats", type=int, default=None,
+                        help="set remaining_seats to this value before the run")
+    args = parser.parse_args()
+
+    from app import create_app
+    from handlers.utils import query_all, execute_sql
+    from handlers.purchase_service import purchase_ticket, purchase_group
+
+    app = create_app()
+    with app.app_context():
+        if args.reset_seats is not None:
+            execute_sql("UPDATE flight SET remaining_seats=%s WHERE airline_name=%s AND flight_number=%s",
+                        (args.reset_seats, args.airline, args.flight))
+        emails = [r["email"] for r in query_all("SELECT email FROM customer ORDER BY email LIMIT %s", (args.size,))]
+    if len(emails) < args.size:
+        print(f"only {len(emails)} customers available, using group size {len(emails)}")
+
+    sequential, group = [], []
+    for _ in range(args.rounds):
+        with app.app_context():
+            t0 = time.perf_counter()
+            for email in emails:
+                purchase_ticket(email, args.airline, args.flight, agent_email=args.agent)
+            sequential.append(time.perf_counter() - t0)
+
+        with app.app_context():
+            t0 = time.perf_counter()
+            results = purchase_group(args.agent, [(args.airline, args.flight)], emails)
+            group.append(time.perf_counter() - t0)
+            failed = [r for r in results if not r["ok"]]
+            if failed:
+                print(f"group booking failed for {len(failed)} passengers: {failed[0]['error']}")
+
+    n = len(emails)
+    seq_ms, grp_ms = statistics.median(sequential) * 1e3, statistics.median(group) * 1e3
+    print(f"passengers={n} rounds={args.rounds}")
+    print(f"sequential: {seq_ms:.1f} ms/group, {seq_ms / n:.2f} ms/passenger")
+    print(f"group:      {grp_ms:.1f} ms/group, {grp_ms / n:.2f} ms/passenger")
+    print(f"speedup:    {seq_ms / grp_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+登录风暴下的搜索延迟：密码哈希在请求线程里算 vs. 放到进程池里算。
+
+    python -m benchmarks.bench_login --duration 20 --logins 16 --searches 4
+    python -m benchmarks.bench_login --workers 0,1,2 --queue 8
+
+对 --workers 里的每个取值 (PASSWORD_HASH_WORKERS，0 = 请求线程里直接算) 各建一个应用，
+起进程内的多线程 WSGI 服务器，分两段各跑 --duration 秒：
+  idle   只有 --searches 个线程循环请求 /api/live_search
+  burst  同时再加 --logins 个线程循环 POST /login
+输出每段的搜索 p50 / p95 / p99，以及登录吞吐、503 (哈希池饱和) 个数和登录 p95。
+默认账号来自 benchmarks/datagen.py 生成的数据 (密码 "synthetic")。
+"""
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[k]
+
+
+def run_phase(base_url, cities, args, logins):
+    """One measured phase; returns (search latencies, {status: [login latency]})."""
+    from benchmarks.bench_e2e import HttpClient
+
+    search_lat = []
+    login_lat = {}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def searcher(n):
+        rng = random.Random(args.seed + n)
+        client = HttpClient(base_url)
+        local = []
+        while not stop.is_set():
+            city = rng.choice(cities)
+            t0 = time.perf_counter()
+            client.get("/api/live_search", {"origin": city[: rng.randint(1, len(city))]})
+            local.append(time.perf_counter() - t0)
+        with lock:
+            search_lat.extend(local)
+
+    def login_worker(n):
+        client = HttpClient(base_url)
+        local = {}
+        data = {"role": "customer", "email_or_username": args.customer, "password": args.password}
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            status = client.post("/login", data)
+            local.setdefault(status, []).append(time.perf_counter() - t0)
+            if status == 503:
+                time.sleep(args.backoff)
+        with lock:
+            for status, values in local.items():
+                login_lat.setdefault(status, []).extend(values)
+
+    threads = [threading.Thread(target=searcher, args=(n,)) for n in range(args.searches)]
+    threads += [threading.Thread(target=login_worker, args=(n,)) for n in range(logins)]
+    for t in threads:
+        t.start()
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    return search_lat, login_lat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="0,2", help="comma-separated PASSWORD_HASH_WORKERS values to compare")
+    parser.add_argument("--queue", type=int, default=None, help="PASSWORD_HASH_QUEUE (default: app config)")
+    parser.add_argument("--duration", type=float, default=15, help="seconds per phase")
+    parser.add_argument("--logins", type=int, default=16, help="concurrent login loops in the burst phase")
+    parser.add_argument("--searches", type=int, default=4, help="concurrent search loops")
+    parser.add_argument("--backoff", type=float, default=0.05, help="login sleep after a 503")
+    parser.add_argument("--customer", default="user00000000@synthetic.test")
+    parser.add_argument("--password", default="synthetic")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DB_POOL_SIZE", str(args.logins + args.searches + 2))
+    # 慢 SQL 日志的 EXPLAIN 抓取会干扰计时，除非显式配置
+    os.environ.setdefault("SLOW_LOG_PATH", "")
+    if args.queue is not None:
+        os.environ["PASSWORD_HASH_QUEUE"] = str(args.queue)
+    from werkzeug.serving import make_server
+    from app import create_app
+    from handlers.utils import query_all
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # 不打印每条访问日志
+    print(f"cpus={os.cpu_count()} logins={args.logins} searches={args.searches} duration={args.duration}s")
+    print(f"{'workers':>7s} {'phase':6s} {'search':>7s} {'p50ms':>8s} {'p95ms':>8s} {'p99ms':>8s} "
+          f"{'logins/s':>9s} {'503':>6s} {'login p95ms':>12s}")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        os.environ["PASSWORD_HASH_WORKERS"] = str(workers)
+        app = create_app()
+        with app.app_context():
+            cities = [r["city"] for r in query_all("SELECT DISTINCT city FROM airport")]
+        if not cities:
+            raise SystemExit("no airports; load data first (benchmarks/datagen.py)")
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        try:
+            # 预热：进程池启动子进程、连接池建连接
+            _, warm = run_phase(base_url, cities, argparse.Namespace(**{**vars(args), "duration": 1}), 1)
+            if not warm.get(302):
+                raise SystemExit(f"login failed for {args.customer} (statuses {sorted(warm)})")
+            for phase, logins in (("idle", 0), ("burst", args.logins)):
+                search_lat, login_lat = run_phase(base_url, cities, args, logins)
+                ok = login_lat.get(302, [])
+                print(f"{workers:7d} {phase:6s} {len(search_lat):7d} {percentile(search_lat, 50) * 1e3:8.1f} "
+                      f"{percentile(search_lat, 95) * 1e3:8.1f} {percentile(search_lat, 99) * 1e3:8.1f} "
+                      f"{len(ok) / args.duration:9.1f} {len(login_lat.get(503, [])):6d} "
+                      f"{percentile(ok, 95) * 1e3:12.1f}")
+        finally:
+            server.shutdown()
+            app.extensions["password_hasher"].shutdown()
+
+
+if __name__ == "__main__":
+    main()
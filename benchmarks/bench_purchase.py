@@ -0,0 +1,101 @@
+"""
+并发购票吞吐量基准：多个线程同时抢购同一个航班。
+
+    python -m benchmarks.bench_purchase --airline Delta --flight DL9010 \
+        --customer alice@test.com --threads 16 --attempts 400 --reset-seats 300
+
+结束后校验没有超卖：成功数 == 新增 ticket 数，remaining_seats >= 0。
+注意：会真实写入 ticket / purchases，请在测试库上运行。
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--airline", required=True)
+    parser.add_argument("--flight", required=True)
+    parser.add_argument("--customer", required=True)
+    parser.add_argument("--agent", default=None)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=400, help="total purchase attempts")
+    parser.add_argument("--reset-seats", type=int, default=None,
+                        help="set remaining_seats to this value before the run")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DB_POOL_SIZE", str(args.threads + 2))
+    from app import create_app
+    from handlers.utils import query_one, execute_sql
+    from handlers.purchase_service import purchase_ticket, PurchaseError
+
+    app = create_app()
+    key = (args.airline, args.flight)
+
+    with app.app_context():
+        if args.reset_seats is not None:
+            execute_sql("UPDATE flight SET remaining_seats=%s WHERE airline_name=%s AND flight_number=%s",
+                        (args.reset_seats,) + key)
+        before = query_one("SELECT COUNT(*) AS cnt FROM ticket WHERE airline_name=%s AND flight_number=%s", key)["cnt"]
+
+    latencies = []
+    outcomes = {"ok": 0, "rejected": 0, "error": 0}
+    lock = threading.Lock()
+    per_thread = [args.attempts // args.threads + (1 if i < args.attempts % args.threads else 0)
+                  for i in range(args.threads)]
+
+    def worker(n):
+        local_lat, local = [], {"ok": 0, "rejected": 0, "error": 0}
+        for _ in range(n):
+            with app.app_context():
+                t0 = time.perf_counter()
+                try:
+                    purchase_ticket(args.customer, args.airline, args.flight, agent_email=args.agent)
+                    local["ok"] += 1
+                except PurchaseError:
+                    local["rejected"] += 1
+                except Exception as e:
+                    local["error"] += 1
+                    print(f"purchase error: {e}")
+                local_lat.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local_lat)
+            for k, v in local.items():
+                outcomes[k] += v
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in per_thread]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        after = query_one("SELECT COUNT(*) AS cnt FROM ticket WHERE airline_name=%s AND flight_number=%s", key)["cnt"]
+        remaining = query_one("SELECT remaining_seats FROM flight WHERE airline_name=%s AND flight_number=%s",
+                              key)["remaining_seats"]
+
+    print(f"threads={args.threads} attempts={args.attempts} elapsed={elapsed:.3f}s")
+    print(f"outcomes={outcomes} throughput={args.attempts / elapsed:.1f} attempts/s, "
+          f"{outcomes['ok'] / elapsed:.1f} purchases/s")
+    print(f"latency ms: p50={percentile(latencies, 50) * 1e3:.2f} p95={percentile(latencies, 95) * 1e3:.2f} "
+          f"p99={percentile(latencies, 99) * 1e3:.2f} mean={statistics.mean(latencies) * 1e3:.2f}")
+    consistent = (after - before) == outcomes["ok"] and remaining >= 0
+    print(f"tickets added={after - before} remaining_seats={remaining} consistent={consistent}")
+    if not consistent:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
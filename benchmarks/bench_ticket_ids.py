@@ -0,0 +1,75 @@
+"""
+ticket_ID 生成器的吞吐和唯一性。
+
+    python -m benchmarks.bench_ticket_ids --count 1000000
+    python -m benchmarks.bench_ticket_ids --count 500000 --processes 4 --threads 4
+
+每个进程 (--processes，各自推 worker id) 里 --threads 个线程一起生成 --count 个 ID，
+分别用 new_ticket_id() 逐个取和 new_ticket_ids() 批量取，再与 uuid4().hex[:16] 对照。
+输出每秒生成数；汇总所有进程的 ID 检查是否有重复、长度是否都是 16、
+每个线程拿到的序列是否严格递增 (InnoDB 主键顺序追加的前提)。
+"""
+import argparse
+import multiprocessing
+import threading
+import time
+import uuid
+
+
+def _mint(mode, count, threads):
+    from handlers import ticket_ids
+
+    per_thread = count // threads
+    results = [None] * threads
+
+    def worker(n):
+        if mode == "single":
+            results[n] = [ticket_ids.new_ticket_id() for _ in range(per_thread)]
+        elif mode == "batch":
+            results[n] = ticket_ids.new_ticket_ids(per_thread)
+        else:
+            results[n] = [uuid.uuid4().hex[:16].upper() for _ in range(per_thread)]
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    t0 = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return time.perf_counter() - t0, results
+
+
+def _child(mode, count, threads, queue):
+    elapsed, results = _mint(mode, count, threads)
+    ordered = all(all(a < b for a, b in zip(ids, ids[1:])) for ids in results)
+    queue.put((elapsed, ordered, [i for ids in results for i in ids]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1000000, help="IDs per process")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=1, help="threads per process")
+    args = parser.parse_args()
+
+    print(f"count={args.count} processes={args.processes} threads={args.threads}")
+    print(f"{'mode':7s} {'ids':>10s} {'ids/s/proc':>12s} {'dupes':>6s} {'len16':>6s} {'ordered':>8s}")
+    ctx = multiprocessing.get_context("spawn")
+    for mode in ("single", "batch", "uuid4"):
+        queue = ctx.Queue()
+        procs = [ctx.Process(target=_child, args=(mode, args.count, args.threads, queue))
+                 for _ in range(args.processes)]
+        for p in procs:
+            p.start()
+        reports = [queue.get() for _ in procs]
+        for p in procs:
+            p.join()
+        ids = [i for _, _, chunk in reports for i in chunk]
+        rate = sum(len(chunk) / elapsed for elapsed, _, chunk in reports) / len(reports)
+        print(f"{mode:7s} {len(ids):10d} {rate:12,.0f} {len(ids) - len(set(ids)):6d} "
+              f"{'yes' if all(len(i) == 16 for i in ids) else 'NO':>6s} "
+              f"{'yes' if all(r[1] for r in reports) else 'no':>8s}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,508 @@
+"""
+合成数据生成 + 批量导入，用于规模测试。
+
+    python -m benchmarks.datagen --scale medium --method infile --fast
+    python -m benchmarks.datagen --flights 20000 --purchases 5000000 --skew 1.1 --seed 7
+    python -m benchmarks.datagen --scale large --dry-run        # 只生成不导入，看生成速度
+    python -m benchmarks.datagen --scale tiny --out /tmp/synth  # 写成 TSV 文件
+
+生成航司 / 机场 / 城市别名 / 飞机 / 航班 / 客户 / 代理 / 员工 / 机票 / 购买记录。
+机场、客户、代理的热度都服从 Zipf 分布 (--skew)，少数热门航线和常旅客占大头。
+合成实体都带独立前缀 (航司 "Synth Air X?"、邮箱 @synthetic.test、机票号 S...)，
+可以和 basic_info.sql 的种子数据共存；城市 / 机场用 INSERT IGNORE。
+
+导入方式：
+  --method insert   executemany 多行 INSERT (默认)
+  --method infile   LOAD DATA LOCAL INFILE (服务器需开启 local_infile)
+  --fast            本会话关闭 unique / foreign key 检查，并在导入期间摘掉
+                    after_insert_purchases_rollup 和 flight_search 的触发器，
+                    结束后重建汇总表和 flight_search
+
+DB_BACKEND=sqlite 时导入到本地 SQLite 文件 (只支持 --method insert)。
+
+before_insert_flight_capacity_check 要求新航班 remaining_seats 在 [1, capacity]：
+每个航班的售出数在生成时就确定，插入时直接写 capacity - sold，
+售罄的航班先写 1，机票导入后再 UPDATE 成 0 (UPDATE 不触发该触发器)。
+
+合成账号的密码都是 "synthetic"。
+"""
+import argparse
+import bisect
+import csv
+import itertools
+import math
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+SCALES = {
+    "tiny":   dict(airlines=4,  airports=40,  airplanes=20,  flights=2000,   customers=5000,    agents=100,   purchases=50000),
+    "small":  dict(airlines=6,  airports=80,  airplanes=60,  flights=10000,  customers=50000,   agents=500,   purchases=500000),
+    "medium": dict(airlines=8,  airports=150, airplanes=150, flights=30000,  customers=300000,  agents=2000,  purchases=3000000),
+    "large":  dict(airlines=12, airports=300, airplanes=400, flights=100000, customers=2000000, agents=10000, purchases=20000000),
+}
+
+PASSWORD = "synthetic"
+
+# 真实机场 (前 11 个与种子数据一致)
+REAL_AIRPORTS = [
+    ("JFK", "New York"), ("LAX", "Los Angeles"), ("SFO", "San Francisco"), ("ORD", "Chicago"),
+    ("SEA", "Seattle"), ("ATL", "Atlanta"), ("DAL", "Dallas"), ("HOU", "Houston"), ("DEN", "Denver"),
+    ("LAS", "Las Vegas"), ("PVG", "Shanghai"), ("LGA", "New York"), ("EWR", "Newark"),
+    ("BOS", "Boston"), ("MIA", "Miami"), ("PHX", "Phoenix"), ("IAH", "Houston"), ("MSP", "Minneapolis"),
+    ("DTW", "Detroit"), ("PHL", "Philadelphia"), ("CLT", "Charlotte"), ("SAN", "San Diego"),
+    ("PDX", "Portland"), ("SLC", "Salt Lake City"), ("BWI", "Baltimore"), ("IAD", "Washington"),
+    ("DCA", "Washington"), ("MDW", "Chicago"), ("HNL", "Honolulu"), ("AUS", "Austin"),
+    ("SHA", "Shanghai"), ("PEK", "Beijing"), ("PKX", "Beijing"), ("CAN", "Guangzhou"),
+    ("SZX", "Shenzhen"), ("HKG", "Hong Kong"), ("NRT", "Tokyo"), ("HND", "Tokyo"), ("ICN", "Seoul"),
+    ("LHR", "London"), ("CDG", "Paris"), ("FRA", "Frankfurt"), ("AMS", "Amsterdam"), ("DXB", "Dubai"),
+    ("SIN", "Singapore"), ("SYD", "Sydney"), ("YYZ", "Toronto"), ("YVR", "Vancouver"),
+]
+
+ALIASES = {
+    "New York": ["NYC", "Big Apple"], "Los Angeles": ["LA"], "San Francisco": ["SF", "Frisco"],
+    "Shanghai": ["SH", "Hu"], "Beijing": ["Peking", "BJ"], "Washington": ["DC"], "Las Vegas": ["Vegas"],
+    "Philadelphia": ["Philly"], "Hong Kong": ["HK"], "Tokyo": ["TYO"], "London": ["LON"], "Paris": ["PAR"],
+    "Chicago": ["Chi-town"], "Guangzhou": ["Canton"],
+}
+
+FIRST_NAMES = ["James", "Mary", "Wei", "Li", "Olivia", "Noah", "Emma", "Liam", "Yuki", "Hana", "Sofia",
+               "Lucas", "Mia", "Ethan", "Ava", "Chen", "Jun", "Aarav", "Priya", "Omar", "Fatima", "Diego"]
+LAST_NAMES = ["Smith", "Johnson", "Wang", "Zhang", "Li", "Brown", "Garcia", "Miller", "Tanaka", "Kim",
+              "Nguyen", "Patel", "Lopez", "Chen", "Liu", "Davis", "Martin", "Sato", "Khan", "Silva"]
+STREETS = ["Main Street", "Oak Avenue", "Park Road", "Lafayette Street", "Daduhe Road", "Broadway"]
+COUNTRIES = ["United States", "China", "Japan", "Korea", "United Kingdom", "France", "India", "Brazil"]
+CAPACITIES = [143, 150, 180, 200, 220, 250, 300, 400]
+
+TABLE_COLUMNS = {
+    "city": ("city_name",),
+    "airport": ("name", "city"),
+    "city_alias": ("city_name", "alias_name"),
+    "airline": ("name",),
+    "airplane": ("airplane_id", "airline_name", "seat_capacity"),
+    "flight": ("flight_number", "airline_name", "departure_airport", "arrival_airport", "departure_time",
+               "arrival_time", "price", "status", "airplane_assigned", "remaining_seats"),
+    "booking_agent": ("email", "password"),
+    "work_with": ("agent_email", "airline_name"),
+    "customer": ("email", "password", "name", "building_number", "street", "city", "state", "phone_number",
+                 "passport_expiration_date", "passport_country", "date_of_birth"),
+    "staff": ("username", "password", "first_name", "last_name", "date_of_birth", "airline_name"),
+    "permission": ("username", "permission_type"),
+    "ticket": ("ticket_ID", "ticket_price", "ticket_status", "airline_name", "flight_number"),
+    "purchases": ("customer_email", "agent_email", "ticket_ID", "purchase_date"),
+}
+
+# 与种子数据可能重叠的参考数据用 INSERT IGNORE
+SHARED_TABLES = {"city", "airport", "city_alias"}
+
+_B36 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def base36(n, width):
+    out = []
+    for _ in range(width):
+        n, r = divmod(n, 36)
+        out.append(_B36[r])
+    return "".join(reversed(out))
+
+
+class Zipf:
+    """Sample indices 0..n-1 with P(i) ~ 1 / (i+1)^s."""
+
+    def __init__(self, n, s, rng):
+        self.rng = rng
+        self.population = range(n)
+        self.cum = list(itertools.accumulate(1.0 / (i + 1) ** s for i in range(n)))
+
+    def weight(self, i):
+        return self.cum[i] - (self.cum[i - 1] if i else 0.0)
+
+    def sample(self, k=1):
+        return self.rng.choices(self.population, cum_weights=self.cum, k=k)
+
+
+# ---------- 生成 ----------
+
+def build_reference(cfg, rng, password_hash):
+    """Small tables, fully in memory. Returns {table: rows} plus lookup info."""
+    n_airports = max(cfg["airports"], 2)
+    airports = list(REAL_AIRPORTS[:n_airports])
+    synth_codes = ("Q" + a + b for a in _B36[10:] for b in _B36[10:])
+    while len(airports) < n_airports:
+        code = next(synth_codes)
+        airports.append((code, f"Synthetic City {code}"))
+    cities = sorted({city for _, city in airports})
+    aliases = [(c, a) for c in cities for a in ALIASES.get(c, [])]
+
+    codes = ["X" + chr(ord("A") + i) if i < 26 else "Y" + chr(ord("A") + i - 26) for i in range(cfg["airlines"])]
+    airlines = [f"Synth Air {code}" for code in codes]
+
+    airplanes = []  # (airplane_id, airline, capacity)
+    for a, (code, airline) in enumerate(zip(codes, airlines)):
+        for n in range(cfg["airplanes"]):
+            airplanes.append((f"{code}{n:05d}", airline, rng.choice(CAPACITIES)))
+
+    agents = [f"agent{n:06d}@synthetic.test" for n in range(cfg["agents"])]
+    work_with, agents_by_airline = [], [[] for _ in airlines]
+    for agent in agents:
+        for a in rng.sample(range(len(airlines)), k=min(len(airlines), rng.choice((1, 1, 2, 3)))):
+            work_with.append((agent, airlines[a]))
+            agents_by_airline[a].append(agent)
+
+    staff, permission = [], []
+    for code, airline in zip(codes, airlines):
+        for role, perms in (("admin", ("Admin", "Operator")), ("ops", ("Operator",))):
+            username = f"synth_{role}_{code.lower()}"
+            staff.append((username, password_hash, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+                          date(1970, 1, 1) + timedelta(days=rng.randrange(12000)), airline))
+            permission.extend((username, p) for p in perms)
+
+    tables = {
+        "city": [(c,) for c in cities],
+        "airport": airports,
+        "city_alias": aliases,
+        "airline": [(a,) for a in airlines],
+        "airplane": airplanes,
+        "booking_agent": [(a, password_hash) for a in agents],
+        "work_with": work_with,
+        "staff": staff,
+        "permission": permission,
+    }
+    info = {"codes": codes, "airlines": airlines, "airports": [c for c, _ in airports],
+            "airplanes_by_airline": [[p for p in airplanes if p[1] == a] for a in airlines],
+            "agents_by_airline": agents_by_airline}
+    return tables, info
+
+
+def build_flights(cfg, rng, info, now):
+    """
+    Flights plus per-flight sold counts. Sold counts are fixed up front so every
+    flight can be inserted with a valid remaining_seats.
+    """
+    airports = info["airports"]
+    airport_pop = Zipf(len(airports), cfg["skew"], rng)
+    airline_pop = Zipf(len(info["airlines"]), cfg["skew"] / 2, rng)
+    start = now - timedelta(days=cfg["days_back"])
+    span = (cfg["days_back"] + cfg["days_ahead"]) * 86400
+    counters = [0] * len(info["airlines"])
+
+    flights, weights = [], []
+    for a, dep, arr in zip(airline_pop.sample(cfg["flights"]), airport_pop.sample(cfg["flights"]),
+                           airport_pop.sample(cfg["flights"])):
+        if dep == arr:
+            arr = (arr + 1 + rng.randrange(len(airports) - 1)) % len(airports)
+        airline = info["airlines"][a]
+        plane_id, _, capacity = rng.choice(info["airplanes_by_airline"][a])
+        flight_number = info["codes"][a] + base36(counters[a], 4)
+        counters[a] += 1
+        departure = (start + timedelta(seconds=rng.randrange(span))).replace(second=0, microsecond=0)
+        hours = rng.uniform(1, 14)
+        arrival = departure + timedelta(minutes=int(hours * 60))
+        price = round(60 + hours * rng.uniform(40, 110), 2)
+        if departure < now:
+            status = "cancelled" if rng.random() < 0.02 else "arrived"
+        else:
+            status = "delayed" if rng.random() < 0.05 else "upcoming"
+        flights.append([flight_number, airline, airports[dep], airports[arr], departure, arrival,
+                        price, status, plane_id, capacity, a])
+        # 热门航线卖得多；未起飞的航班只卖出一部分
+        w = (airport_pop.weight(dep) + airport_pop.weight(arr)) * rng.lognormvariate(0, 0.5)
+        if departure > now:
+            w *= max(0.05, 1 - (departure - now).days / max(cfg["days_ahead"], 1))
+        weights.append(w)
+
+    capacity_total = sum(f[9] for f in flights)
+    target = min(cfg["purchases"], capacity_total)
+    if target < cfg["purchases"]:
+        print(f"note: only {capacity_total} seats in total; generating {target} purchases")
+    total_w = sum(weights)
+    sold = [min(f[9], int(target * w / total_w)) for f, w in zip(flights, weights)]
+    deficit = target - sum(sold)
+    for i in sorted(range(len(flights)), key=lambda i: -weights[i]):
+        if deficit <= 0:
+            break
+        add = min(flights[i][9] - sold[i], deficit)
+        sold[i] += add
+        deficit -= add
+    return flights, sold
+
+
+def flight_rows(flights, sold):
+    for f, s in zip(flights, sold):
+        number, airline, dep, arr, departure, arrival, price, status, plane, capacity, _ = f
+        # 售罄航班先按 1 插入 (触发器要求 >= 1)，导入机票后再改成 0
+        yield (number, airline, dep, arr, departure, arrival, price, status, plane, max(capacity - s, 1))
+
+
+def customer_rows(cfg, rng, password_hash):
+    for n in range(cfg["customers"]):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield (f"user{n:08d}@synthetic.test", password_hash, f"{first} {last}", rng.randrange(1, 999),
+               rng.choice(STREETS), rng.choice(REAL_AIRPORTS)[1], None, f"1{rng.randrange(10**9, 10**10)}",
+               date(2027, 1, 1) + timedelta(days=rng.randrange(3650)), rng.choice(COUNTRIES),
+               date(1950, 1, 1) + timedelta(days=rng.randrange(20000)))
+
+
+def sale_rows(cfg, rng, info, flights, sold, now):
+    """Yield (ticket_row, purchase_row) pairs, flight by flight."""
+    customer_pop = Zipf(cfg["customers"], cfg["skew"] * 0.6, rng)
+    agents_by_airline = info["agents_by_airline"]
+    serial = itertools.count(1)
+    for f, n in zip(flights, sold):
+        if not n:
+            continue
+        number, airline, departure, price, a = f[0], f[1], f[4], f[6], f[10]
+        hi = min(departure - timedelta(hours=1), now)
+        window = 60 * 86400
+        agents = agents_by_airline[a]
+        for c in customer_pop.sample(n):
+            ticket_id = "S" + format(next(serial), "015X")
+            agent = rng.choice(agents) if agents and rng.random() < cfg["agent_share"] else None
+            purchased = (hi - timedelta(seconds=rng.randrange(window))).replace(microsecond=0)
+            yield ((ticket_id, price, "Confirmed", airline, number),
+                   (f"user{c:08d}@synthetic.test", agent, ticket_id, purchased))
+
+
+def chunked(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ---------- 导入 ----------
+
+def _tsv(value):
+    if value is None:
+        return r"\N"
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    s = str(value)
+    if "\t" in s or "\n" in s or "\\" in s:
+        s = s.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+    return s
+
+
+class Loader:
+    """method: 'insert' | 'infile' | 'tsv' (write files only) | 'none' (dry run)."""
+
+    def __init__(self, method, conn=None, out_dir=None):
+        self.method = method
+        self.conn = conn
+        self.out_dir = out_dir
+        self.counts = {}
+        self.seconds = 0.0
+
+    def load(self, table, rows):
+        columns = TABLE_COLUMNS[table]
+        t0 = time.perf_counter()
+        n = len(rows)
+        if self.method == "insert":
+            verb = "INSERT IGNORE" if table in SHARED_TABLES else "INSERT"
+            sql = f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+            # 每块一个事务 (SQLite 连接默认自动提交，逐行提交会非常慢)
+            self.conn.begin()
+            with self.conn.cursor() as cursor:
+                cursor.executemany(sql, rows)
+            self.conn.commit()
+        elif self.method == "infile":
+            with tempfile.NamedTemporaryFile("w", suffix=".tsv", delete=False, encoding="utf-8", newline="") as f:
+                for row in rows:
+                    f.write("\t".join(_tsv(v) for v in row) + "\n")
+            try:
+                ignore = "IGNORE " if table in SHARED_TABLES else ""
+                with self.conn.cursor() as cursor:
+                    cursor.execute(
+                        f"LOAD DATA LOCAL INFILE %s {ignore}INTO TABLE {table} CHARACTER SET utf8mb4 "
+                        f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({', '.join(columns)})",
+                        (f.name,),
+                    )
+                self.conn.commit()
+            finally:
+                os.unlink(f.name)
+        elif self.method == "tsv":
+            path = os.path.join(self.out_dir, f"{table}.tsv")
+            with open(path, "a", encoding="utf-8", newline="") as f:
+                for row in rows:
+                    f.write("\t".join(_tsv(v) for v in row) + "\n")
+        self.seconds += time.perf_counter() - t0
+        self.counts[table] = self.counts.get(table, 0) + n
+        return n
+
+
+def _connect(app, local_infile):
+    from handlers.utils import get_backend
+    backend = get_backend(app)
+    if backend.name != "mysql":
+        return backend.connect()
+    import pymysql
+    c = app.config
+    return pymysql.connect(
+        host=c["DB_HOST"], port=c["DB_PORT"], user=c["DB_USER"], password=c["DB_PASSWORD"],
+        database=c["DB_NAME"], charset="utf8mb4", autocommit=False, local_infile=local_infile,
+        cursorclass=pymysql.cursors.DictCursor,
+    )
+
+
+def _trigger_sql(backend, migration, names):
+    """Return {trigger name: CREATE TRIGGER statement} for `names` as defined in the migration file."""
+    from handlers.migrations import MIGRATIONS_DIR, split_sql_script
+    path = os.path.join(MIGRATIONS_DIR, migration)
+    if backend != "mysql" and os.path.exists(os.path.join(MIGRATIONS_DIR, backend, migration)):
+        path = os.path.join(MIGRATIONS_DIR, backend, migration)
+    wanted = {name.upper(): name for name in names}
+    found = {}
+    with open(path, encoding="utf-8") as f:
+        for statement in split_sql_script(f.read()):
+            words = statement.split(None, 3)
+            if len(words) >= 3 and words[0].upper() == "CREATE" and words[1].upper() == "TRIGGER":
+                name = wanted.get(words[2].upper())
+                if name:
+                    found[name] = statement
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="tiny")
+    for key in ("airlines", "airports", "airplanes", "flights", "customers", "agents", "purchases"):
+        parser.add_argument(f"--{key}", type=int, default=None, help=f"override the scale's {key}"
+                            + (" (per airline)" if key == "airplanes" else ""))
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent for airport / customer popularity")
+    parser.add_argument("--agent-share", type=float, default=0.35, help="fraction of purchases made by agents")
+    parser.add_argument("--days-back", type=int, default=365)
+    parser.add_argument("--days-ahead", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch", type=int, default=50000, help="rows per insert / LOAD DATA chunk")
+    parser.add_argument("--method", choices=["insert", "infile"], default="insert")
+    parser.add_argument("--fast", action="store_true",
+                        help="disable unique/FK checks and the rollup / flight_search triggers during the load, rebuild both after")
+    parser.add_argument("--out", default=None, help="write TSV files to this directory instead of loading")
+    parser.add_argument("--dry-run", action="store_true", help="generate only; report generation speed")
+    args = parser.parse_args()
+
+    cfg = dict(SCALES[args.scale])
+    for key in cfg:
+        if getattr(args, key) is not None:
+            cfg[key] = getattr(args, key)
+    cfg.update(skew=args.skew, agent_share=args.agent_share, days_back=args.days_back, days_ahead=args.days_ahead)
+
+    from werkzeug.security import generate_password_hash
+    password_hash = generate_password_hash(PASSWORD, method="pbkdf2:sha256:200000")
+
+    rng = random.Random(args.seed)
+    now = datetime.now().replace(microsecond=0)
+    print("config:", cfg)
+
+    app = conn = None
+    if args.dry_run:
+        loader = Loader("none")
+    elif args.out:
+        os.makedirs(args.out, exist_ok=True)
+        for table in TABLE_COLUMNS:
+            path = os.path.join(args.out, f"{table}.tsv")
+            if os.path.exists(path):
+                os.unlink(path)
+        loader = Loader("tsv", out_dir=args.out)
+    else:
+        from app import create_app
+        app = create_app()
+        backend = app.config["DB_BACKEND"]
+        if backend != "mysql" and args.method == "infile":
+            parser.error("--method infile needs the MySQL backend")
+        conn = _connect(app, local_infile=args.method == "infile")
+        loader = Loader(args.method, conn)
+
+    from handlers import flight_search
+    # --fast 导入期间摘掉的触发器: 迁移文件 -> 触发器名
+    fast_drop = (
+        ("001_sales_rollups.sql", ("after_insert_purchases_rollup",)),
+        ("004_flight_search.sql", flight_search.TRIGGERS),
+    )
+    dropped = {}  # 迁移文件 -> [CREATE TRIGGER ...]
+    if conn is not None and args.fast:
+        with conn.cursor() as cursor:
+            if backend == "mysql":
+                cursor.execute("SET SESSION unique_checks=0, foreign_key_checks=0")
+                cursor.execute("SELECT TRIGGER_NAME AS name FROM information_schema.TRIGGERS "
+                               "WHERE TRIGGER_SCHEMA = DATABASE()")
+            else:
+                cursor.execute("PRAGMA foreign_keys=OFF")
+                cursor.execute("PRAGMA synchronous=OFF")
+                cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            existing = {row["name"].lower() for row in cursor.fetchall()}
+            for migration, names in fast_drop:
+                names = [name for name in names if name in existing]
+                if not names:
+                    continue
+                dropped[migration] = list(_trigger_sql(backend, migration, names).values())
+                for name in names:
+                    cursor.execute(f"DROP TRIGGER {name}")
+
+    started = time.perf_counter()
+    try:
+        tables, info = build_reference(cfg, rng, password_hash)
+        for table in ("city", "airport", "city_alias", "airline", "airplane", "booking_agent", "work_with",
+                      "staff", "permission"):
+            for chunk in chunked(tables[table], args.batch):
+                loader.load(table, chunk)
+
+        flights, sold = build_flights(cfg, rng, info, now)
+        for chunk in chunked(flight_rows(flights, sold), args.batch):
+            loader.load("flight", chunk)
+
+        for chunk in chunked(customer_rows(cfg, rng, password_hash), args.batch):
+            loader.load("customer", chunk)
+
+        report_at = time.perf_counter() + 10
+        for chunk in chunked(sale_rows(cfg, rng, info, flights, sold, now), args.batch):
+            loader.load("ticket", [t for t, _ in chunk])
+            loader.load("purchases", [p for _, p in chunk])
+            if time.perf_counter() > report_at:
+                done = loader.counts["purchases"]
+                print(f"  purchases {done}/{sum(sold)} ({done / (time.perf_counter() - started):,.0f} rows/s overall)")
+                report_at = time.perf_counter() + 10
+
+        sold_out = [(f[1], f[0]) for f, s in zip(flights, sold) if s >= f[9]]
+        if conn is not None and sold_out:
+            with conn.cursor() as cursor:
+                for chunk in chunked(sold_out, 1000):
+                    cursor.execute(
+                        "UPDATE flight SET remaining_seats = 0 WHERE (airline_name, flight_number) IN ("
+                        + ", ".join(["(%s, %s)"] * len(chunk)) + ")",
+                        [v for key in chunk for v in key],
+                    )
+            conn.commit()
+    finally:
+        if conn is not None and dropped:
+            with conn.cursor() as cursor:
+                for statements in dropped.values():
+                    for statement in statements:
+                        cursor.execute(statement)
+            conn.commit()
+
+    elapsed = time.perf_counter() - started
+    total = sum(loader.counts.values())
+    for table, n in loader.counts.items():
+        print(f"{table:14s} {n:>12,}")
+    print(f"total {total:,} rows in {elapsed:.1f}s = {total / elapsed:,.0f} rows/s "
+          f"(load {loader.seconds:.1f}s, generate {elapsed - loader.seconds:.1f}s)")
+    print(f"sold-out flights: {sum(1 for f, s in zip(flights, sold) if s >= f[9])}; "
+          f"staff logins: synth_admin_xa / synth_ops_xa ..., password '{PASSWORD}'")
+
+    if conn is not None:
+        conn.close()
+        with app.app_context():
+            if "001_sales_rollups.sql" in dropped:
+                from handlers.rollups import rebuild_rollups
+                print("rebuilding rollups:", rebuild_rollups())
+            if "004_flight_search.sql" in dropped:
+                print("rebuilding flight_search:", flight_search.rebuild_flight_search(), "rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+-- ==========================================================
+-- 001: 每日销售汇总表 (staff.analytics 读取)
+-- 维度: airline x day x agent / customer / destination
+-- 由 after_insert_purchases_rollup 触发器在每次购票时增量维护；
+-- 历史数据用 `flask rollups rebuild` 回填 / 重建。
+-- ==========================================================
+
+CREATE TABLE sales_daily_agent(
+    airline_name    varchar(20) NOT NULL,
+    sale_date   date NOT NULL,
+    agent_email varchar(50) NOT NULL,
+    ticket_count    int NOT NULL DEFAULT 0,
+    revenue numeric(14,2) NOT NULL DEFAULT 0,
+    primary key(airline_name, sale_date, agent_email)
+);
+
+CREATE TABLE sales_daily_customer(
+    airline_name    varchar(20) NOT NULL,
+    sale_date   date NOT NULL,
+    customer_email  varchar(50) NOT NULL,
+    ticket_count    int NOT NULL DEFAULT 0,
+    revenue numeric(14,2) NOT NULL DEFAULT 0,
+    primary key(airline_name, sale_date, customer_email)
+);
+
+CREATE TABLE sales_daily_destination(
+    airline_name    varchar(20) NOT NULL,
+    sale_date   date NOT NULL,
+    arrival_airport char(3) NOT NULL,
+    ticket_count    int NOT NULL DEFAULT 0,
+    revenue numeric(14,2) NOT NULL DEFAULT 0,
+    primary key(airline_name, sale_date, arrival_airport)
+);
+
+DELIMITER $$
+
+CREATE TRIGGER after_insert_purchases_rollup
+AFTER INSERT ON purchases
+FOR EACH ROW
+BEGIN
+    DECLARE v_airline varchar(20);
+    DECLARE v_price numeric(12,2);
+    DECLARE v_dest char(3);
+
+    SELECT t.airline_name, t.ticket_price, f.arrival_airport
+      INTO v_airline, v_price, v_dest
+    FROM ticket t
+    JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
+    WHERE t.ticket_ID = NEW.ticket_ID;
+
+    INSERT INTO sales_daily_customer (airline_name, sale_date, customer_email, ticket_count, revenue)
+    VALUES (v_airline, DATE(NEW.purchase_date), NEW.customer_email, 1, COALESCE(v_price, 0))
+    ON DUPLICATE KEY UPDATE ticket_count = ticket_count + 1, revenue = revenue + COALESCE(v_price, 0);
+
+    INSERT INTO sales_daily_destination (airline_name, sale_date, arrival_airport, ticket_count, revenue)
+    VALUES (v_airline, DATE(NEW.purchase_date), v_dest, 1, COALESCE(v_price, 0))
+    ON DUPLICATE KEY UPDATE ticket_count = ticket_count + 1, revenue = revenue + COALESCE(v_price, 0);
+
+    IF NEW.agent_email IS NOT NULL THEN
+        INSERT INTO sales_daily_agent (airline_name, sale_date, agent_email, ticket_count, revenue)
+        VALUES (v_airline, DATE(NEW.purchase_date), NEW.agent_email, 1, COALESCE(v_price, 0))
+        ON DUPLICATE KEY UPDATE ticket_count = ticket_count + 1, revenue = revenue + COALESCE(v_price, 0);
+    END IF;
+END$$
+
+DELIMITER ;
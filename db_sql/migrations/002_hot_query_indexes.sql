@@ -0,0 +1,29 @@
+-- ==========================================================
+-- 002: 热点查询的二级索引 / 覆盖索引
+-- 配合 handlers 中的半开区间日期条件 (col >= %s AND col < %s)
+-- 以及 airport_resolver 生成的 `IN (codes)` 条件使用。
+-- ==========================================================
+
+-- 搜索索引重建 / 公共状态查询 / active airports: status + 起飞时间范围
+CREATE INDEX idx_flight_status_departure ON flight (status, departure_time);
+-- 搜索索引重建: departure_time > NOW()
+CREATE INDEX idx_flight_departure_time ON flight (departure_time);
+-- staff dashboard / 搜索 / 乘客列表: 某航司按起飞时间
+CREATE INDEX idx_flight_airline_departure ON flight (airline_name, departure_time);
+-- 出发 / 到达机场 IN (codes) + 时间
+CREATE INDEX idx_flight_dep_airport_time ON flight (departure_airport, departure_time);
+CREATE INDEX idx_flight_arr_airport_time ON flight (arrival_airport, departure_time);
+
+-- 已售数统计 / 乘客名单 / 航司客户: ticket -> flight
+CREATE INDEX idx_ticket_flight ON ticket (airline_name, flight_number);
+
+-- 代理交易记录 / 佣金统计 (覆盖 agent_email + 日期范围 + 关联 ticket)
+CREATE INDEX idx_purchases_agent_date ON purchases (agent_email, purchase_date, ticket_ID);
+-- 客户历史 / 消费统计
+CREATE INDEX idx_purchases_customer_date ON purchases (customer_email, purchase_date, ticket_ID);
+-- ticket -> purchases 反向关联
+CREATE INDEX idx_purchases_ticket ON purchases (ticket_ID);
+
+-- 城市 / 别名
+CREATE INDEX idx_airport_city ON airport (city);
+CREATE INDEX idx_city_alias_alias ON city_alias (alias_name);
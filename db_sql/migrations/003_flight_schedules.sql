@@ -0,0 +1,44 @@
+-- ==========================================================
+-- 003: 周期航班计划
+-- flight_schedule: 一条班次定义 (航线、起飞时刻、班期、有效期、机型、票价)
+-- flight_schedule_instance: 已展开的 (schedule, 日期) -> flight 行，
+--   保证展开幂等；flight_number 由 instance_id 生成 (见 handlers/schedules.py)。
+-- 由 `flask --app app flights expand` 按滚动窗口批量展开。
+-- ==========================================================
+
+CREATE TABLE flight_schedule(
+    schedule_id int AUTO_INCREMENT,
+    airline_name    varchar(20) NOT NULL,
+    service_number  varchar(10) NOT NULL,
+    departure_airport   char(3) NOT NULL,
+    arrival_airport char(3) NOT NULL,
+    departure_local time NOT NULL,
+    duration_minutes    int NOT NULL check (duration_minutes > 0),
+    days_of_week    varchar(7) NOT NULL,
+    valid_from  date NOT NULL,
+    valid_to    date,
+    airplane_assigned   varchar(20) NOT NULL,
+    price   numeric(12,2) NOT NULL check (price >= 0),
+    seats   int,
+    active  tinyint(1) NOT NULL DEFAULT 1,
+    updated_at  datetime NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    primary key(schedule_id),
+    foreign key(airline_name) references airline(name) ON DELETE CASCADE ON UPDATE CASCADE,
+    foreign key(departure_airport) references airport(name) ON UPDATE CASCADE,
+    foreign key(arrival_airport) references airport(name) ON UPDATE CASCADE,
+    foreign key(airplane_assigned, airline_name) references airplane(airplane_id, airline_name) ON UPDATE CASCADE
+);
+
+CREATE INDEX idx_flight_schedule_airline ON flight_schedule (airline_name, active);
+
+CREATE TABLE flight_schedule_instance(
+    instance_id int AUTO_INCREMENT,
+    schedule_id int NOT NULL,
+    service_date    date NOT NULL,
+    airline_name    varchar(20) NOT NULL,
+    flight_number   varchar(6),
+    primary key(instance_id),
+    unique key uq_schedule_instance_date (schedule_id, service_date),
+    unique key uq_schedule_instance_flight (airline_name, flight_number),
+    foreign key(schedule_id) references flight_schedule(schedule_id) ON DELETE CASCADE
+);
@@ -0,0 +1,27 @@
+-- ==========================================================
+-- 007: sales_history 补上航班的到达时间和状态
+-- 历史列表 / 导出 (customer.flights、agent.transactions、staff 的客户航班历史)
+-- 查询范围跨越归档边界时改读这个视图，需要显示 arrival_time 和 status。
+-- 新列追加在末尾，原有列不变。
+-- 按起飞日期筛选的列表用 MAX(departure_time) 判断是否跨越归档边界，补一个单列索引。
+-- ==========================================================
+
+DROP VIEW IF EXISTS sales_history;
+
+CREATE VIEW sales_history AS
+SELECT p.customer_email, p.agent_email, p.ticket_ID, p.purchase_date, t.ticket_price,
+       t.airline_name, t.flight_number, f.departure_airport, f.arrival_airport, f.departure_time, f.price,
+       f.arrival_time, f.status
+FROM purchases p
+JOIN ticket t ON p.ticket_ID = t.ticket_ID
+JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
+UNION ALL
+SELECT p.customer_email, p.agent_email, p.ticket_ID, p.purchase_date, t.ticket_price,
+       t.airline_name, t.flight_number, f.departure_airport, f.arrival_airport, f.departure_time, f.price,
+       f.arrival_time, f.status
+FROM purchases_archive p
+JOIN ticket_archive t ON p.ticket_ID = t.ticket_ID
+JOIN flight_archive f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
+    AND t.departure_time = f.departure_time;
+
+CREATE INDEX idx_flight_archive_departure ON flight_archive (departure_time);
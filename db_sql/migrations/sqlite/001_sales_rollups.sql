@@ -0,0 +1,64 @@
+-- ==========================================================
+-- 001: 每日销售汇总表 (SQLite 版本，触发器用 ON CONFLICT 改写)
+-- 维度: airline x day x agent / customer / destination
+-- 由 after_insert_purchases_rollup 触发器在每次购票时增量维护；
+-- 历史数据用 `flask rollups rebuild` 回填 / 重建。
+-- ==========================================================
+
+CREATE TABLE sales_daily_agent(
+    airline_name    varchar(20) COLLATE NOCASE NOT NULL,
+    sale_date   date NOT NULL,
+    agent_email varchar(50) COLLATE NOCASE NOT NULL,
+    ticket_count    int NOT NULL DEFAULT 0,
+    revenue numeric(14,2) NOT NULL DEFAULT 0,
+    primary key(airline_name, sale_date, agent_email)
+);
+
+CREATE TABLE sales_daily_customer(
+    airline_name    varchar(20) COLLATE NOCASE NOT NULL,
+    sale_date   date NOT NULL,
+    customer_email  varchar(50) COLLATE NOCASE NOT NULL,
+    ticket_count    int NOT NULL DEFAULT 0,
+    revenue numeric(14,2) NOT NULL DEFAULT 0,
+    primary key(airline_name, sale_date, customer_email)
+);
+
+CREATE TABLE sales_daily_destination(
+    airline_name    varchar(20) COLLATE NOCASE NOT NULL,
+    sale_date   date NOT NULL,
+    arrival_airport char(3) COLLATE NOCASE NOT NULL,
+    ticket_count    int NOT NULL DEFAULT 0,
+    revenue numeric(14,2) NOT NULL DEFAULT 0,
+    primary key(airline_name, sale_date, arrival_airport)
+);
+
+DELIMITER $$
+
+CREATE TRIGGER after_insert_purchases_rollup
+AFTER INSERT ON purchases
+FOR EACH ROW
+BEGIN
+    INSERT INTO sales_daily_customer (airline_name, sale_date, customer_email, ticket_count, revenue)
+    SELECT t.airline_name, DATE(NEW.purchase_date), NEW.customer_email, 1, COALESCE(t.ticket_price, 0)
+    FROM ticket t
+    WHERE t.ticket_ID = NEW.ticket_ID
+    ON CONFLICT (airline_name, sale_date, customer_email)
+    DO UPDATE SET ticket_count = ticket_count + 1, revenue = revenue + excluded.revenue;
+
+    INSERT INTO sales_daily_destination (airline_name, sale_date, arrival_airport, ticket_count, revenue)
+    SELECT t.airline_name, DATE(NEW.purchase_date), f.arrival_airport, 1, COALESCE(t.ticket_price, 0)
+    FROM ticket t
+    JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
+    WHERE t.ticket_ID = NEW.ticket_ID
+    ON CONFLICT (airline_name, sale_date, arrival_airport)
+    DO UPDATE SET ticket_count = ticket_count + 1, revenue = revenue + excluded.revenue;
+
+    INSERT INTO sales_daily_agent (airline_name, sale_date, agent_email, ticket_count, revenue)
+    SELECT t.airline_name, DATE(NEW.purchase_date), NEW.agent_email, 1, COALESCE(t.ticket_price, 0)
+    FROM ticket t
+    WHERE t.ticket_ID = NEW.ticket_ID AND NEW.agent_email IS NOT NULL
+    ON CONFLICT (airline_name, sale_date, agent_email)
+    DO UPDATE SET ticket_count = ticket_count + 1, revenue = revenue + excluded.revenue;
+END$$
+
+DELIMITER ;
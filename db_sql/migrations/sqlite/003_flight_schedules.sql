@@ -0,0 +1,41 @@
+-- ==========================================================
+-- 003: 周期航班计划 (SQLite 版本：AUTOINCREMENT 主键，无 ON UPDATE 时间戳)
+-- flight_schedule: 一条班次定义 (航线、起飞时刻、班期、有效期、机型、票价)
+-- flight_schedule_instance: 已展开的 (schedule, 日期) -> flight 行，
+--   保证展开幂等；flight_number 由 instance_id 生成 (见 handlers/schedules.py)。
+-- ==========================================================
+
+CREATE TABLE flight_schedule(
+    schedule_id integer PRIMARY KEY AUTOINCREMENT,
+    airline_name    varchar(20) COLLATE NOCASE NOT NULL,
+    service_number  varchar(10) COLLATE NOCASE NOT NULL,
+    departure_airport   char(3) COLLATE NOCASE NOT NULL,
+    arrival_airport char(3) COLLATE NOCASE NOT NULL,
+    departure_local time NOT NULL,
+    duration_minutes    int NOT NULL check (duration_minutes > 0),
+    days_of_week    varchar(7) NOT NULL,
+    valid_from  date NOT NULL,
+    valid_to    date,
+    airplane_assigned   varchar(20) COLLATE NOCASE NOT NULL,
+    price   numeric(12,2) NOT NULL check (price >= 0),
+    seats   int,
+    active  tinyint(1) NOT NULL DEFAULT 1,
+    updated_at  datetime NOT NULL DEFAULT (datetime('now','localtime')),
+    foreign key(airline_name) references airline(name) ON DELETE CASCADE ON UPDATE CASCADE,
+    foreign key(departure_airport) references airport(name) ON UPDATE CASCADE,
+    foreign key(arrival_airport) references airport(name) ON UPDATE CASCADE,
+    foreign key(airplane_assigned, airline_name) references airplane(airplane_id, airline_name) ON UPDATE CASCADE
+);
+
+CREATE INDEX idx_flight_schedule_airline ON flight_schedule (airline_name, active);
+
+CREATE TABLE flight_schedule_instance(
+    instance_id integer PRIMARY KEY AUTOINCREMENT,
+    schedule_id int NOT NULL,
+    service_date    date NOT NULL,
+    airline_name    varchar(20) COLLATE NOCASE NOT NULL,
+    flight_number   varchar(6) COLLATE NOCASE,
+    unique (schedule_id, service_date),
+    unique (airline_name, flight_number),
+    foreign key(schedule_id) references flight_schedule(schedule_id) ON DELETE CASCADE
+);
@@ -0,0 +1,147 @@
+-- ==========================================================
+-- 004: 反范式的航班搜索读模型 flight_search (SQLite 版本：触发器用 WHEN / UPDATE OF 代替 IF)
+-- flight 的全部列 + 出发 / 到达城市 + 飞机容量 + 已售票数，
+-- 列表 / 搜索查询直接读这张表，不再 JOIN airport 两次、不再 COUNT(ticket)。
+--
+-- 由触发器维护：
+--   flight  INSERT / UPDATE          -> 插入 / 更新对应行
+--   ticket  INSERT / DELETE          -> sold_cnt +1 / -1
+--   airport / airplane / city UPDATE -> 改名、改城市、改容量 (外键级联不会触发触发器，在这里补上)
+-- flight 的删除和主键级联由 flight_search 自己的外键 ON DELETE / ON UPDATE CASCADE 完成。
+-- 全量重建 / 一致性检查：flask --app app flights search-rebuild / search-check
+-- ==========================================================
+
+CREATE TABLE flight_search(
+    flight_number   varchar(6) COLLATE NOCASE NOT NULL,
+    airline_name    varchar(20) COLLATE NOCASE NOT NULL,
+    departure_airport   char(3) COLLATE NOCASE NOT NULL,
+    arrival_airport char(3) COLLATE NOCASE NOT NULL,
+    departure_time  datetime NOT NULL,
+    arrival_time    datetime NOT NULL,
+    price   numeric(12,2),
+    status  varchar(11) NOT NULL,
+    airplane_assigned  varchar(20) COLLATE NOCASE NOT NULL,
+    remaining_seats   int,
+    dep_city    varchar(30) COLLATE NOCASE,
+    arr_city    varchar(30) COLLATE NOCASE,
+    seat_capacity   int,
+    sold_cnt    int NOT NULL DEFAULT 0,
+    primary key(flight_number, airline_name),
+    foreign key(flight_number, airline_name) references flight(flight_number, airline_name)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- 搜索索引重建 / 状态查询 / active airports
+CREATE INDEX idx_flight_search_departure ON flight_search (departure_time);
+CREATE INDEX idx_flight_search_status_departure ON flight_search (status, departure_time);
+-- staff 列表: 某航司按起飞时间
+CREATE INDEX idx_flight_search_airline_departure ON flight_search (airline_name, departure_time);
+-- 出发 / 到达机场 IN (codes) + 时间
+CREATE INDEX idx_flight_search_dep_time ON flight_search (departure_airport, departure_time);
+CREATE INDEX idx_flight_search_arr_time ON flight_search (arrival_airport, departure_time);
+
+-- 回填
+INSERT INTO flight_search
+    (flight_number, airline_name, departure_airport, arrival_airport, departure_time, arrival_time,
+     price, status, airplane_assigned, remaining_seats, dep_city, arr_city, seat_capacity, sold_cnt)
+SELECT f.flight_number, f.airline_name, f.departure_airport, f.arrival_airport, f.departure_time, f.arrival_time,
+       f.price, f.status, f.airplane_assigned, f.remaining_seats, da.city, aa.city, ap.seat_capacity,
+       COALESCE(s.sold_cnt, 0)
+FROM flight f
+LEFT JOIN airport da ON f.departure_airport = da.name
+LEFT JOIN airport aa ON f.arrival_airport = aa.name
+LEFT JOIN airplane ap ON f.airplane_assigned = ap.airplane_id AND f.airline_name = ap.airline_name
+LEFT JOIN (
+    SELECT airline_name, flight_number, COUNT(*) AS sold_cnt
+    FROM ticket
+    GROUP BY airline_name, flight_number
+) s ON s.airline_name = f.airline_name AND s.flight_number = f.flight_number;
+
+DELIMITER $$
+
+-- flight 行从表里读：after_insert_flight_default_seats 可能在本触发器之前或之后
+-- 把 NULL 座位数补成容量，之后的 UPDATE 会经 after_update_flight_search 同步
+CREATE TRIGGER after_insert_flight_search
+AFTER INSERT ON flight
+FOR EACH ROW
+BEGIN
+    INSERT INTO flight_search
+        (flight_number, airline_name, departure_airport, arrival_airport, departure_time, arrival_time,
+         price, status, airplane_assigned, remaining_seats, dep_city, arr_city, seat_capacity, sold_cnt)
+    SELECT f.flight_number, f.airline_name, f.departure_airport, f.arrival_airport,
+           f.departure_time, f.arrival_time, f.price, f.status, f.airplane_assigned, f.remaining_seats,
+           (SELECT city FROM airport WHERE name = f.departure_airport),
+           (SELECT city FROM airport WHERE name = f.arrival_airport),
+           (SELECT seat_capacity FROM airplane WHERE airplane_id = f.airplane_assigned AND airline_name = f.airline_name),
+           0
+    FROM flight f
+    WHERE f.airline_name = NEW.airline_name AND f.flight_number = NEW.flight_number;
+END$$
+
+CREATE TRIGGER after_update_flight_search
+AFTER UPDATE ON flight
+FOR EACH ROW
+BEGIN
+    UPDATE flight_search
+    SET departure_airport = NEW.departure_airport, arrival_airport = NEW.arrival_airport,
+        departure_time = NEW.departure_time, arrival_time = NEW.arrival_time, price = NEW.price,
+        status = NEW.status, airplane_assigned = NEW.airplane_assigned, remaining_seats = NEW.remaining_seats
+    WHERE airline_name = NEW.airline_name AND flight_number = NEW.flight_number;
+END$$
+
+-- 购票只改 remaining_seats，不必每次都查 airport / airplane
+CREATE TRIGGER after_update_flight_search_refs
+AFTER UPDATE OF departure_airport, arrival_airport, airplane_assigned ON flight
+FOR EACH ROW
+BEGIN
+    UPDATE flight_search
+    SET dep_city = (SELECT city FROM airport WHERE name = NEW.departure_airport),
+        arr_city = (SELECT city FROM airport WHERE name = NEW.arrival_airport),
+        seat_capacity = (SELECT seat_capacity FROM airplane
+                         WHERE airplane_id = NEW.airplane_assigned AND airline_name = NEW.airline_name)
+    WHERE airline_name = NEW.airline_name AND flight_number = NEW.flight_number;
+END$$
+
+CREATE TRIGGER after_insert_ticket_flight_search
+AFTER INSERT ON ticket
+FOR EACH ROW
+BEGIN
+    UPDATE flight_search SET sold_cnt = sold_cnt + 1
+    WHERE airline_name = NEW.airline_name AND flight_number = NEW.flight_number;
+END$$
+
+CREATE TRIGGER after_delete_ticket_flight_search
+AFTER DELETE ON ticket
+FOR EACH ROW
+BEGIN
+    UPDATE flight_search SET sold_cnt = max(sold_cnt - 1, 0)
+    WHERE airline_name = OLD.airline_name AND flight_number = OLD.flight_number;
+END$$
+
+CREATE TRIGGER after_update_airport_flight_search
+AFTER UPDATE ON airport
+FOR EACH ROW
+BEGIN
+    UPDATE flight_search SET departure_airport = NEW.name, dep_city = NEW.city
+    WHERE departure_airport = OLD.name;
+    UPDATE flight_search SET arrival_airport = NEW.name, arr_city = NEW.city
+    WHERE arrival_airport = OLD.name;
+END$$
+
+CREATE TRIGGER after_update_airplane_flight_search
+AFTER UPDATE ON airplane
+FOR EACH ROW
+BEGIN
+    UPDATE flight_search SET airplane_assigned = NEW.airplane_id, seat_capacity = NEW.seat_capacity
+    WHERE airline_name = NEW.airline_name AND airplane_assigned = OLD.airplane_id;
+END$$
+
+CREATE TRIGGER after_update_city_flight_search
+AFTER UPDATE ON city
+FOR EACH ROW
+BEGIN
+    UPDATE flight_search SET dep_city = NEW.city_name WHERE dep_city = OLD.city_name;
+    UPDATE flight_search SET arr_city = NEW.city_name WHERE arr_city = OLD.city_name;
+END$$
+
+DELIMITER ;
@@ -0,0 +1,66 @@
+-- ==========================================================
+-- 005: 已完成航班归档 (SQLite 版本：文本键列用 NOCASE，与基表一致)
+-- 到达 / 取消超过 ARCHIVE_AFTER_DAYS 天的航班连同机票、购买记录
+-- 由 handlers/lifecycle.py 分批搬进 *_archive 表，热表只保留近期数据。
+-- 归档表不带外键：航班号可能被新航班复用，所以 flight_archive 的主键含 departure_time，
+-- ticket_archive 也记下所属航班的 departure_time 以便关联。
+-- sales_history: 在线 + 归档的购买明细，分析查询需要跨越归档边界时读它。
+-- ==========================================================
+
+CREATE TABLE flight_archive(
+    flight_number   varchar(6) COLLATE NOCASE NOT NULL,
+    airline_name    varchar(20) COLLATE NOCASE NOT NULL,
+    departure_airport   char(3) COLLATE NOCASE NOT NULL,
+    arrival_airport char(3) COLLATE NOCASE NOT NULL,
+    departure_time  datetime NOT NULL,
+    arrival_time    datetime NOT NULL,
+    price   numeric(12,2),
+    status  varchar(11) COLLATE NOCASE NOT NULL,
+    airplane_assigned  varchar(20) COLLATE NOCASE NOT NULL,
+    remaining_seats   int,
+    archived_at datetime NOT NULL,
+    primary key(airline_name, flight_number, departure_time)
+);
+
+CREATE INDEX idx_flight_archive_airline_departure ON flight_archive (airline_name, departure_time);
+
+CREATE TABLE ticket_archive(
+    ticket_ID   char(16) COLLATE NOCASE NOT NULL,
+    ticket_price    numeric(12,2),
+    ticket_status   varchar(10) COLLATE NOCASE NOT NULL,
+    airline_name    varchar(20) COLLATE NOCASE NOT NULL,
+    flight_number   varchar(6) COLLATE NOCASE NOT NULL,
+    departure_time  datetime NOT NULL,
+    archived_at datetime NOT NULL,
+    primary key(ticket_ID)
+);
+
+CREATE INDEX idx_ticket_archive_flight ON ticket_archive (airline_name, flight_number, departure_time);
+
+CREATE TABLE purchases_archive(
+    customer_email   varchar(50) COLLATE NOCASE NOT NULL,
+    agent_email   varchar(50) COLLATE NOCASE,
+    ticket_ID   char(16) COLLATE NOCASE NOT NULL,
+    purchase_date   datetime NOT NULL,
+    archived_at datetime NOT NULL,
+    primary key(customer_email, ticket_ID)
+);
+
+CREATE INDEX idx_purchases_archive_ticket ON purchases_archive (ticket_ID);
+CREATE INDEX idx_purchases_archive_date ON purchases_archive (purchase_date);
+CREATE INDEX idx_purchases_archive_customer_date ON purchases_archive (customer_email, purchase_date);
+CREATE INDEX idx_purchases_archive_agent_date ON purchases_archive (agent_email, purchase_date);
+
+CREATE VIEW sales_history AS
+SELECT p.customer_email, p.agent_email, p.ticket_ID, p.purchase_date, t.ticket_price,
+       t.airline_name, t.flight_number, f.departure_airport, f.arrival_airport, f.departure_time, f.price
+FROM purchases p
+JOIN ticket t ON p.ticket_ID = t.ticket_ID
+JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
+UNION ALL
+SELECT p.customer_email, p.agent_email, p.ticket_ID, p.purchase_date, t.ticket_price,
+       t.airline_name, t.flight_number, f.departure_airport, f.arrival_airport, f.departure_time, f.price
+FROM purchases_archive p
+JOIN ticket_archive t ON p.ticket_ID = t.ticket_ID
+JOIN flight_archive f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
+    AND t.departure_time = f.departure_time;
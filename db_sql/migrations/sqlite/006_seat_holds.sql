@@ -0,0 +1,20 @@
+-- ==========================================================
+-- 006: 结账期间的临时占座 (SQLite 版本：文本键列用 NOCASE，与基表一致)
+-- 打开购票确认页时为 (航班, 下单人) 占一个座，expires_at 之后自动失效，
+-- 购票成功时删除。搜索显示的余座、购票的条件扣减都减去别人未过期的占座。
+-- 多个 worker 进程共享这张表 (SEAT_HOLD_STORE=db)；过期行由
+-- `flights lifecycle` 分批清理，读取时一律按 expires_at 过滤。
+-- ==========================================================
+
+CREATE TABLE seat_hold(
+    airline_name    varchar(20) COLLATE NOCASE NOT NULL,
+    flight_number   varchar(6) COLLATE NOCASE NOT NULL,
+    holder  varchar(50) COLLATE NOCASE NOT NULL,
+    expires_at  datetime NOT NULL,
+    created_at  datetime NOT NULL,
+    primary key(airline_name, flight_number, holder),
+    foreign key(flight_number, airline_name) references flight(flight_number, airline_name) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+CREATE INDEX idx_seat_hold_expires ON seat_hold (expires_at);
+CREATE INDEX idx_seat_hold_holder ON seat_hold (holder, expires_at);
@@ -0,0 +1,37 @@
+DELIMITER $$
+
+-- ==========================================================
+-- SQLite 版本的 before_insert_flight_capacity_check
+-- 目的: 确保 flight.remaining_seats 在 [1, capacity] 范围内。
+-- SQLite 的 BEFORE 触发器不能修改 NEW，NULL -> capacity 在
+-- after_insert_flight_default_seats 中补上。
+-- ==========================================================
+CREATE TRIGGER before_insert_flight_capacity_check
+BEFORE INSERT ON flight
+FOR EACH ROW
+BEGIN
+    -- 上界检查
+    SELECT RAISE(ABORT, 'Error: Initial remaining_seats cannot exceed the assigned airplane seat capacity.')
+    WHERE NEW.remaining_seats > (
+        SELECT seat_capacity FROM airplane
+        WHERE airplane_id = NEW.airplane_assigned AND airline_name = NEW.airline_name
+    );
+
+    -- 下界检查
+    SELECT RAISE(ABORT, 'Error: New flights must be initialized with a positive number of remaining seats.')
+    WHERE NEW.remaining_seats <= 0;
+END$$
+
+CREATE TRIGGER after_insert_flight_default_seats
+AFTER INSERT ON flight
+FOR EACH ROW
+WHEN NEW.remaining_seats IS NULL
+BEGIN
+    UPDATE flight SET remaining_seats = (
+        SELECT seat_capacity FROM airplane
+        WHERE airplane_id = NEW.airplane_assigned AND airline_name = NEW.airline_name
+    )
+    WHERE flight_number = NEW.flight_number AND airline_name = NEW.airline_name;
+END$$
+
+DELIMITER ;
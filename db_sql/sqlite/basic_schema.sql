@@ -0,0 +1,126 @@
+-- ==========================================================
+-- SQLite 版本的表结构 (对应 basic_info.sql 的 CREATE TABLE 部分)
+-- - 文本列 COLLATE NOCASE，与 MySQL 默认的大小写不敏感比较 / 主键一致
+-- - flight.remaining_seats 允许 NULL：SQLite 的 BEFORE 触发器不能改 NEW，
+--   NULL 由 after_insert_flight_default_seats 补成飞机容量
+-- - flight.airplane_assigned 外键引用 airplane 的完整主键
+--   (SQLite 要求被引用列是主键或唯一键)
+-- ==========================================================
+
+CREATE TABLE customer
+    (email   varchar(50) COLLATE NOCASE,
+    password    varchar(255) NOT NULL,
+    name    varchar(30) COLLATE NOCASE NOT NULL,
+    building_number int,
+    street  varchar(60) COLLATE NOCASE,
+    city    varchar(30) COLLATE NOCASE,
+    state   varchar(30) COLLATE NOCASE,
+    phone_number    varchar(16) NOT NULL,
+    passport_expiration_date    date NOT NULL,
+    passport_country    varchar(20) COLLATE NOCASE NOT NULL,
+    date_of_birth   date NOT NULL,
+    primary key(email)
+);
+
+CREATE TABLE city(
+    city_name varchar(30) COLLATE NOCASE NOT NULL,
+    primary key(city_name)
+);
+
+CREATE TABLE airport(
+    name    char(3) COLLATE NOCASE,
+    city    varchar(30) COLLATE NOCASE NOT NULL,
+    primary key(name),
+    foreign key(city) references city(city_name) ON UPDATE CASCADE
+);
+
+CREATE TABLE airline(
+    name    varchar(20) COLLATE NOCASE,
+    primary key(name)
+);
+
+CREATE TABLE airplane(
+    airplane_id varchar(20) COLLATE NOCASE,
+    airline_name    varchar(20) COLLATE NOCASE,
+    seat_capacity   int NOT NULL,
+    primary key(airplane_id, airline_name),
+    foreign key(airline_name) references airline(name) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+CREATE TABLE flight(
+    flight_number   varchar(6) COLLATE NOCASE,
+    airline_name    varchar(20) COLLATE NOCASE,
+    departure_airport   char(3) COLLATE NOCASE NOT NULL,
+    arrival_airport char(3) COLLATE NOCASE NOT NULL,
+    departure_time  datetime NOT NULL,
+    arrival_time    datetime NOT NULL,
+    price   numeric(12,2) check (price >= 0),
+    status  varchar(11) COLLATE NOCASE NOT NULL,
+    airplane_assigned  varchar(20) COLLATE NOCASE NOT NULL,
+    remaining_seats   int,
+    primary key(flight_number, airline_name),
+    foreign key(airline_name) references airline(name) ON DELETE CASCADE ON UPDATE CASCADE,
+    foreign key(departure_airport) references airport(name) ON UPDATE CASCADE,
+    foreign key(arrival_airport) references airport(name) ON UPDATE CASCADE,
+    foreign key(airplane_assigned, airline_name) references airplane(airplane_id, airline_name) ON UPDATE CASCADE
+);
+
+CREATE TABLE ticket(
+    ticket_ID   char(16) COLLATE NOCASE,
+    ticket_price    numeric(12,2) check (ticket_price >= 0) ,
+    ticket_status   varchar(10) COLLATE NOCASE NOT NULL,
+    airline_name    varchar(20) COLLATE NOCASE NOT NULL,
+    flight_number   varchar(6) COLLATE NOCASE NOT NULL,
+    primary key(ticket_ID),
+    foreign key(flight_number, airline_name) references flight(flight_number, airline_name) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+CREATE TABLE booking_agent(
+    email   varchar(50) COLLATE NOCASE,
+    password    varchar(255) NOT NULL,
+    primary key(email)
+);
+
+CREATE TABLE staff(
+    username    varchar(30) COLLATE NOCASE,
+    password    varchar(255) NOT NULL,
+    first_name   varchar(20) NOT NULL,
+    last_name    varchar(20) NOT NULL,
+    date_of_birth   date NOT NULL,
+    airline_name    varchar(20) COLLATE NOCASE NOT NULL,
+    primary key(username),
+    foreign key(airline_name) references airline(name) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+CREATE TABLE city_alias(
+    city_name varchar(30) COLLATE NOCASE NOT NULL,
+    alias_name varchar(30) COLLATE NOCASE NOT NULL,
+    primary key(city_name, alias_name),
+    foreign key(city_name) references city(city_name) ON UPDATE CASCADE
+);
+
+CREATE TABLE permission(
+    username    varchar(50) COLLATE NOCASE,
+    permission_type    varchar(10) COLLATE NOCASE NOT NULL,
+    primary key(username, permission_type),
+    foreign key(username) references staff(username) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+CREATE TABLE work_with(
+    agent_email   varchar(50) COLLATE NOCASE,
+    airline_name    varchar(20) COLLATE NOCASE,
+    primary key(agent_email, airline_name),
+    foreign key(agent_email) references booking_agent(email) ON DELETE CASCADE ON UPDATE CASCADE,
+    foreign key(airline_name) references airline(name) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+CREATE TABLE purchases(
+    customer_email   varchar(50) COLLATE NOCASE NOT NULL,
+    agent_email   varchar(50) COLLATE NOCASE,
+    ticket_ID   char(16) COLLATE NOCASE NOT NULL,
+    purchase_date   datetime NOT NULL,
+    primary key(customer_email, ticket_ID),
+    foreign key(customer_email) references customer(email) ON UPDATE CASCADE,
+    foreign key(agent_email) references booking_agent(email) ON UPDATE CASCADE,
+    foreign key(ticket_ID) references ticket(ticket_ID) ON DELETE CASCADE ON UPDATE CASCADE
+);
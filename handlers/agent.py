@@ -1,8 +1,9 @@
 from flask import Blueprint, render_template, request, session, flash, redirect, url_for, jsonify
 from datetime import datetime, timedelta
-import uuid
-from .utils import login_required, query_all, query_one, execute_sql
-from .customer import check_capacity
+from .utils import login_required, query_all, query_one, execute_sql, date_range, stream_query
+from .purchase_service import purchase_ticket, purchase_group, PurchaseError
+from . import airport_resolver, cache, exports, identity, lifecycle, pagination, search_index, seat_holds
+from .cache import cached_json_response
 
 agent_bp = Blueprint("agent", __name__)
 
@@ -16,12 +17,8 @@ def dashboard():
     """
     email = session.get("user_id")
     
-    # 1. Get Allowed Airlines (For display context)
-    airlines_data = query_all(
-        "SELECT airline_name FROM work_with WHERE agent_email=%s",
-        (email,),
-    )
-    allowed_airlines = [a["airline_name"] for a in airlines_data]
+    # 1. Get Allowed Airlines (For display context), from the per-agent cache
+    allowed_airlines = identity.agent_airlines(email)
 
 
     return render_template(
@@ -29,6 +26,75 @@ def dashboard():
         allowed_airlines=allowed_airlines
     )
 
+def _transaction_filters(values):
+    return {
+        'start_date': values.get('start_date', '').strip(),
+        'end_date': values.get('end_date', '').strip(),
+        'origin': values.get('origin', '').strip(),
+        'destination': values.get('destination', '').strip(),
+        'customer_email': values.get('customer_email', '').strip(),
+    }
+
+
+def _transactions_query(email, filters, archived=None):
+    """
+    (sql, params, keyset) for the agent's purchases matching `filters`, without ORDER BY.
+    archived: read sales_history (live + archived flights); None = decide from the start date.
+    """
+    if archived is None:
+        archived = lifecycle.reaches_archive(filters['start_date'])
+    if archived:
+        # 早于归档边界的记录只在 sales_history 里：p / t / f 都换成视图 s 的列
+        sql = lifecycle.HISTORY_SELECT + " WHERE s.agent_email=%s"
+        p = f = "s"
+        keyset = pagination.PURCHASES.over("s")
+    else:
+        sql = """
+            SELECT f.*, t.ticket_ID, p.customer_email, p.purchase_date
+            FROM purchases p
+            JOIN ticket t ON p.ticket_ID = t.ticket_ID
+            JOIN flight_search f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
+            WHERE p.agent_email=%s
+        """
+        p, f = "p", "f"
+        keyset = pagination.PURCHASES
+    params = [email]
+
+    # Apply Filters
+    conds, date_params = date_range(f"{p}.purchase_date", filters['start_date'], filters['end_date'])
+    for cond in conds:
+        sql += " AND " + cond
+    params.extend(date_params)
+    if filters['origin']:
+        clause, codes = airport_resolver.in_clause(f"{f}.departure_airport", filters['origin'])
+        sql += " AND " + clause
+        params.extend(codes)
+    if filters['destination']:
+        clause, codes = airport_resolver.in_clause(f"{f}.arrival_airport", filters['destination'])
+        sql += " AND " + clause
+        params.extend(codes)
+    if filters['customer_email']:
+        sql += f" AND {p}.customer_email LIKE %s"
+        params.append(f"%{filters['customer_email']}%")
+    return sql, params, keyset
+
+
+def _transactions_page(email, filters, cursor, size):
+    """
+    One page of the agent's purchases, newest first.
+    Keyset on (purchase_date, ticket_ID) — served by idx_purchases_agent_date.
+    Returns (rows, next_cursor).
+    """
+    sql, params, keyset = _transactions_query(email, filters)
+    after, after_params = keyset.where(cursor)
+    if after:
+        sql += " AND " + after
+        params.extend(after_params)
+    sql += keyset.order_limit(size)
+
+    return keyset.page(query_all(sql, tuple(params)), size)
+
+
 @agent_bp.route("/transactions", methods=["GET", "POST"])
 @login_required(role="agent")
 def transactions():
@@ -39,59 +105,50 @@ def transactions():
     email = session.get("user_id")
     
     # Get filter parameters (support both GET and POST)
-    start_date = request.values.get('start_date', '').strip()
-    end_date = request.values.get('end_date', '').strip()
-    origin = request.values.get('origin', '').strip()
-    destination = request.values.get('destination', '').strip()
-    customer_email = request.values.get('customer_email', '').strip()
-
-    # Base query
-    sql = """
-        SELECT f.*, t.ticket_ID, p.customer_email, p.purchase_date,
-               da.city AS dep_city, aa.city AS arr_city
-        FROM purchases p
-        JOIN ticket t ON p.ticket_ID = t.ticket_ID
-        JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
-        LEFT JOIN airport da ON f.departure_airport = da.name
-        LEFT JOIN airport aa ON f.arrival_airport = aa.name
-        WHERE p.agent_email=%s
-    """
-    params = [email]
-
-    # Apply Filters
-    if start_date:
-        sql += " AND DATE(p.purchase_date) >= %s"
-        params.append(start_date)
-    if end_date:
-        sql += " AND DATE(p.purchase_date) <= %s"
-        params.append(end_date)
-    if origin:
-        sql += " AND (f.departure_airport LIKE %s OR da.city LIKE %s OR da.city IN (SELECT ca.city_name FROM city_alias ca WHERE ca.alias_name = %s))"
-        params.extend([f"%{origin}%", f"%{origin}%", origin])
-    if destination:
-        sql += " AND (f.arrival_airport LIKE %s OR aa.city LIKE %s OR aa.city IN (SELECT ca.city_name FROM city_alias ca WHERE ca.alias_name = %s))"
-        params.extend([f"%{destination}%", f"%{destination}%", destination])
-    if customer_email:
-        sql += " AND p.customer_email LIKE %s"
-        params.append(f"%{customer_email}%")
-
-    sql += " ORDER BY p.purchase_date DESC LIMIT 50"
-    
-    recent_purchases = query_all(sql, tuple(params))
+    filters = _transaction_filters(request.values)
+    try:
+        recent_purchases, next_cursor = _transactions_page(
+            email, filters, request.values.get('cursor'), pagination.page_size(request.values.get('limit'))
+        )
+    except pagination.InvalidCursor as e:
+        flash(str(e))
+        recent_purchases, next_cursor = _transactions_page(email, filters, None, pagination.DEFAULT_PAGE_SIZE)
     
     return render_template(
         "agent_transactions.html", 
         recent_purchases=recent_purchases,
+        next_cursor=next_cursor,
         # Pass back values to repopulate form
-        filters={
-            'start_date': start_date,
-            'end_date': end_date,
-            'origin': origin,
-            'destination': destination,
-            'customer_email': customer_email
-        }
+        filters=filters
     )
 
+TRANSACTION_EXPORT_COLUMNS = [
+    "ticket_ID", "purchase_date", "customer_email", "airline_name", "flight_number",
+    "departure_airport", "arrival_airport", "departure_time", "arrival_time", "price", "status",
+]
+
+
+@agent_bp.route("/export/transactions")
+@login_required(role="agent")
+def export_transactions():
+    """
+    Stream the agent's full (filtered) transaction history as CSV or NDJSON.
+    Same filters as /transactions, plus ?format=csv|ndjson.
+    """
+    fmt = exports.requested_format()
+    if fmt is None:
+        return jsonify({"error": "Unsupported format. Use csv or ndjson."}), 400
+
+    sql, params, keyset = _transactions_query(session.get("user_id"), _transaction_filters(request.args))
+    sql += keyset.order_by()
+    try:
+        stream = stream_query(sql, tuple(params))
+    except Exception as e:
+        print(f"Export error: {e}")
+        return jsonify({"error": "Export failed."}), 500
+    return exports.export_response(stream, TRANSACTION_EXPORT_COLUMNS, fmt, "transactions")
+
+
 @agent_bp.route("/api/agent_airports")
 @login_required(role="agent")
 def get_agent_airports():
@@ -100,47 +157,47 @@ def get_agent_airports():
     """
     email = session.get("user_id")
     
-    # 1. Get Allowed Airlines
-    airlines_data = query_all(
-        "SELECT airline_name FROM work_with WHERE agent_email=%s",
-        (email,),
-    )
-    allowed_airlines = [a["airline_name"] for a in airlines_data]
+    # 1. Get Allowed Airlines (per-agent cache)
+    allowed_airlines = identity.agent_airlines(email)
     
     if not allowed_airlines:
         return jsonify({"origins": [], "destinations": []})
 
-    # Prepare SQL for IN clause
-    placeholders = ",".join(["%s"] * len(allowed_airlines))
+    # Agents with the same airline set share one cache entry
+    def load():
+        # Prepare SQL for IN clause
+        placeholders = ",".join(["%s"] * len(allowed_airlines))
     
-    # Get distinct departure airports for these airlines
-    sql_origins = f"""
-        SELECT DISTINCT f.departure_airport AS code, a.city
-        FROM flight f
-        JOIN airport a ON f.departure_airport = a.name
-        WHERE f.airline_name IN ({placeholders})
-          AND f.status IN ('upcoming', 'Delayed') 
-          AND f.departure_time > NOW()
-        ORDER BY a.city
-    """
-    origins = query_all(sql_origins, tuple(allowed_airlines))
-
-    # Get distinct arrival airports for these airlines
-    sql_dests = f"""
-        SELECT DISTINCT f.arrival_airport AS code, a.city
-        FROM flight f
-        JOIN airport a ON f.arrival_airport = a.name
-        WHERE f.airline_name IN ({placeholders})
-          AND f.status IN ('upcoming', 'Delayed') 
-          AND f.departure_time > NOW()
-        ORDER BY a.city
-    """
-    dests = query_all(sql_dests, tuple(allowed_airlines))
+        # Get distinct departure airports for these airlines
+        sql_origins = f"""
+            SELECT DISTINCT f.departure_airport AS code, f.dep_city AS city
+            FROM flight_search f
+            WHERE f.airline_name IN ({placeholders})
+              AND f.status IN ('upcoming', 'Delayed') 
+              AND f.departure_time > NOW()
+            ORDER BY f.dep_city
+        """
+        origins = query_all(sql_origins, tuple(allowed_airlines))
+
+        # Get distinct arrival airports for these airlines
+        sql_dests = f"""
+            SELECT DISTINCT f.arrival_airport AS code, f.arr_city AS city
+            FROM flight_search f
+            WHERE f.airline_name IN ({placeholders})
+              AND f.status IN ('upcoming', 'Delayed') 
+              AND f.departure_time > NOW()
+            ORDER BY f.arr_city
+        """
+        dests = query_all(sql_dests, tuple(allowed_airlines))
 
-    return jsonify({
-        "origins": origins,
-        "destinations": dests
-    })
+        return {
+            "origins": origins,
+            "destinations": dests
+        }
+
+    return cached_json_response(
+        cache.active_airports, ("airlines", tuple(sorted(allowed_airlines))), load
+    )
 
 @agent_bp.route("/api/agent_customers")
 @login_required(role="agent")
@@ -159,49 +216,18 @@ def api_agent_customers():
 def api_agent_transactions():
     """
     API to fetch agent transaction history dynamically.
+    Paged with ?cursor= / ?limit=; the next cursor is in the X-Next-Cursor header.
     """
     email = session.get("user_id")
     
     # Get filter parameters
-    start_date = request.args.get('start_date', '').strip()
-    end_date = request.args.get('end_date', '').strip()
-    origin = request.args.get('origin', '').strip()
-    destination = request.args.get('destination', '').strip()
-    customer_email = request.args.get('customer_email', '').strip()
-
-    # Base query
-    sql = """
-        SELECT f.*, t.ticket_ID, p.customer_email, p.purchase_date,
-               da.city AS dep_city, aa.city AS arr_city
-        FROM purchases p
-        JOIN ticket t ON p.ticket_ID = t.ticket_ID
-        JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
-        LEFT JOIN airport da ON f.departure_airport = da.name
-        LEFT JOIN airport aa ON f.arrival_airport = aa.name
-        WHERE p.agent_email=%s
-    """
-    params = [email]
-
-    # Apply Filters
-    if start_date:
-        sql += " AND DATE(p.purchase_date) >= %s"
-        params.append(start_date)
-    if end_date:
-        sql += " AND DATE(p.purchase_date) <= %s"
-        params.append(end_date)
-    if origin:
-        sql += " AND (f.departure_airport LIKE %s OR da.city LIKE %s)"
-        params.extend([f"%{origin}%", f"%{origin}%"])
-    if destination:
-        sql += " AND (f.arrival_airport LIKE %s OR aa.city LIKE %s)"
-        params.extend([f"%{destination}%", f"%{destination}%"])
-    if customer_email:
-        sql += " AND p.customer_email LIKE %s"
-        params.append(f"%{customer_email}%")
-
-    sql += " ORDER BY p.purchase_date DESC LIMIT 50"
-    
-    transactions = query_all(sql, tuple(params))
+    filters = _transaction_filters(request.args)
+    try:
+        transactions, next_cursor = _transactions_page(
+            email, filters, request.args.get('cursor'), pagination.page_size(request.args.get('limit'))
+        )
+    except pagination.InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     
     # Serialize for JSON
     for t in transactions:
@@ -210,7 +236,7 @@ def api_agent_transactions():
         if t.get('arrival_time'): t['arrival_time'] = str(t['arrival_time'])
         if 'price' in t: t['price'] = str(t['price'])
         
-    return jsonify(transactions)
+    return pagination.next_page_headers(jsonify(transactions), next_cursor)
 
 @agent_bp.route("/api/agent_airports")
 
@@ -226,25 +252,23 @@ def get_agent_transaction_airports():
     
     # Origins from history
     sql_origins = """
-        SELECT DISTINCT f.departure_airport AS code, da.city
+        SELECT DISTINCT f.departure_airport AS code, f.dep_city AS city
         FROM purchases p
         JOIN ticket t ON p.ticket_ID = t.ticket_ID
-        JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
-        JOIN airport da ON f.departure_airport = da.name
+        JOIN flight_search f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
         WHERE p.agent_email = %s
-        ORDER BY da.city
+        ORDER BY f.dep_city
     """
     origins = query_all(sql_origins, (email,))
 
     # Destinations from history
     sql_dests = """
-        SELECT DISTINCT f.arrival_airport AS code, aa.city
+        SELECT DISTINCT f.arrival_airport AS code, f.arr_city AS city
         FROM purchases p
         JOIN ticket t ON p.ticket_ID = t.ticket_ID
-        JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
-        JOIN airport aa ON f.arrival_airport = aa.name
+        JOIN flight_search f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
         WHERE p.agent_email = %s
-        ORDER BY aa.city
+        ORDER BY f.arr_city
     """
     dests = query_all(sql_dests, (email,))
 
@@ -262,12 +286,8 @@ def search_flights_api():
     """
     email = session.get("user_id")
     
-    # 1. Get Allowed Airlines
-    airlines_data = query_all(
-        "SELECT airline_name FROM work_with WHERE agent_email=%s",
-        (email,),
-    )
-    allowed_airlines = [a["airline_name"] for a in airlines_data]
+    # 1. Get Allowed Airlines (per-agent cache)
+    allowed_airlines = identity.agent_airlines(email)
     
     # If agent has no airlines, return empty list immediately
     if not allowed_airlines:
@@ -277,44 +297,23 @@ def search_flights_api():
     destination = request.args.get("destination", "").strip()
     date = request.args.get("date", "").strip()
 
-    # Build Query
-    conditions = [
-        "f.status IN ('upcoming', 'Delayed')",
-        "f.remaining_seats > 0",
-        "f.departure_time > NOW()"
-    ]
-    
-    # CRITICAL: Restrict to allowed airlines
-    conditions.append("f.airline_name IN ({})".format(
-        ",".join(["%s"] * len(allowed_airlines))
-    ))
-    params = list(allowed_airlines)
-
-    if origin:
-        conditions.append("(f.departure_airport LIKE %s OR da.city LIKE %s OR da.city IN (SELECT ca.city_name FROM city_alias ca WHERE ca.alias_name = %s))")
-        params.extend([f"%{origin}%", f"%{origin}%", origin])
-    if destination:
-        conditions.append("(f.arrival_airport LIKE %s OR aa.city LIKE %s OR aa.city IN (SELECT ca.city_name FROM city_alias ca WHERE ca.alias_name = %s))")
-        params.extend([f"%{destination}%", f"%{destination}%", destination])
-    if date:
-        conditions.append("DATE(f.departure_time) = %s")
-        params.append(date)
-
-    where_clause = " AND ".join(conditions)
-    
-    # Join with airport for city names
-    sql = f"""
-        SELECT f.*, da.city AS dep_city, aa.city AS arr_city
-        FROM flight f
-        JOIN airport da ON f.departure_airport = da.name
-        JOIN airport aa ON f.arrival_airport = aa.name
-        WHERE {where_clause}
-        ORDER BY f.departure_time ASC
-        LIMIT 50
-    """
-    
+    day = search_index.parse_date(date)
+    if date and day is None:
+        return jsonify([])
+
     try:
-        flights = query_all(sql, tuple(params))
+        # 别人结账中的占座不算余座：在索引里就按扣掉占座后的余座过滤，limit 只数可售航班
+        held = seat_holds.held_counts(email)
+        # CRITICAL: Restrict to allowed airlines
+        flights = search_index.search(
+            origin, destination, day,
+            statuses=["upcoming", "Delayed"],
+            airlines=allowed_airlines,
+            require_seats=True,
+            held=held,
+            limit=50,
+        )
+        seat_holds.apply_to(flights, counts=held)
         # Serialization
         for f in flights:
             if f.get('departure_time'): f['departure_time'] = str(f['departure_time'])
@@ -341,10 +340,8 @@ def book_ticket():
 
     # Fetch flight details with city names
     sql = """
-        SELECT f.*, da.city AS dep_city, aa.city AS arr_city
-        FROM flight f
-        LEFT JOIN airport da ON f.departure_airport = da.name
-        LEFT JOIN airport aa ON f.arrival_airport = aa.name
+        SELECT f.*
+        FROM flight_search f
         WHERE f.airline_name=%s AND f.flight_number=%s
     """
     flight = query_one(sql, (airline, flight_num))
@@ -352,8 +349,12 @@ def book_ticket():
     if not flight:
         flash("Flight not found.", "danger")
         return redirect(url_for("agent.dashboard"))
-        
-    return render_template("agent_booking.html", flight=flight)
+
+    # 结账期间为本 agent 占一个座 (重复打开只续期)
+    agent_email = session.get("user_id")
+    hold_expires_at = seat_holds.take(flight["airline_name"], flight["flight_number"], agent_email)
+    seat_holds.apply_to([flight], agent_email)
+    return render_template("agent_booking.html", flight=flight, hold_expires_at=hold_expires_at)
 
 @agent_bp.route("/flights", methods=["GET", "POST"])
 @login_required(role="agent")
@@ -369,12 +370,9 @@ def flights():
         conditions = ["p.agent_email=%s"]
         params = [email]
 
-        if start_date:
-            conditions.append("DATE(p.purchase_date) >= %s")
-            params.append(start_date)
-        if end_date:
-            conditions.append("DATE(p.purchase_date) <= %s")
-            params.append(end_date)
+        conds, date_params = date_range("p.purchase_date", start_date, end_date)
+        conditions.extend(conds)
+        params.extend(date_params)
 
         if origin:
             conditions.append("f.departure_airport=%s")
@@ -414,77 +412,72 @@ def purchase():
         flash("Missing flight or customer data.", "danger")
         return redirect(url_for("agent.dashboard"))
 
-    # 2. 确认 customer 存在
-    cust = query_one("SELECT email FROM customer WHERE email=%s", (customer_email,))
-    if not cust:
-        flash(f"Customer '{customer_email}' not found. Please ensure the email is correct.", "danger")
-        return redirect(url_for("agent.dashboard"))
-
-    # 3. 确认 agent 和 airline work_with
-    rel = query_one(
-        "SELECT * FROM work_with WHERE agent_email=%s AND airline_name=%s",
-        (agent_email, airline_name),
-    )
-    if not rel:
+    # 2. 确认 agent 和 airline work_with (可售航司缓存)
+    if not identity.agent_can_sell(agent_email, airline_name):
         flash("You are not allowed to sell tickets for this airline.", "danger")
         return redirect(url_for("agent.dashboard"))
 
-    # 4. 检查舱位 (使用 check_capacity)
-    ok, msg = check_capacity(airline_name, flight_number)
-    if not ok:
-        flash(msg, "warning")
-        return redirect(url_for("agent.dashboard"))
-
-    # 5. 获取航班价格
-    flight = query_one(
-        "SELECT price FROM flight WHERE airline_name=%s AND flight_number=%s",
-        (airline_name, flight_number),
-    )
-    if not flight:
-        flash("Flight not found.", "danger")
-        return redirect(url_for("agent.dashboard"))
-
-    price = flight["price"]
-    # 使用 UUID 生成 Ticket ID
-    ticket_id = str(uuid.uuid4())[:8].upper() 
-    purchase_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    # 6. 执行购买事务
+    # 3. 单事务购票：座位扣减、ticket、purchases 一起提交
+    #    (customer 不存在时由 purchases 外键拒绝)
     try:
-        # a. 插入到 ticket 表
-        execute_sql(
-            """
-            INSERT INTO ticket (ticket_ID, ticket_price, ticket_status, airline_name, flight_number)
-            VALUES (%s, %s, 'Confirmed', %s, %s)
-            """,
-            (ticket_id, price, airline_name, flight_number),
-        )
-        
-        # b. 插入到 purchases 表 (Agent 销售记录)
-        execute_sql(
-            """
-            INSERT INTO purchases (customer_email, agent_email, ticket_ID, purchase_date)
-            VALUES (%s, %s, %s, %s)
-            """,
-            (customer_email, agent_email, ticket_id, purchase_date),
-        )
-        
-        # c. 关键步骤：减少剩余座位
-        execute_sql(
-            """
-            UPDATE flight SET remaining_seats = remaining_seats - 1
-            WHERE airline_name=%s AND flight_number=%s
-            """,
-            (airline_name, flight_number),
-        )
-        
+        ticket_id = purchase_ticket(customer_email, airline_name, flight_number, agent_email=agent_email)
         flash(f"Success! Ticket {ticket_id} purchased for {customer_email} on Flight {flight_number}.", "success")
-        
+    except PurchaseError as e:
+        flash(str(e), "warning")
     except Exception as e:
         flash(f"Purchase failed: Transaction Error. Please check logs. Details: {e}", "danger")
     
     return redirect(url_for("agent.dashboard"))
 
+MAX_GROUP_SIZE = 200
+
+
+@agent_bp.route("/api/group_purchase", methods=["POST"])
+@login_required(role="agent")
+def group_purchase():
+    """
+    Group booking: one or more flights x a list of customer emails, booked in a
+    single transaction. Accepts JSON
+        {"flights": [{"airline_name": ..., "flight_number": ...}], "customer_emails": [...]}
+    (or a single airline_name / flight_number) and form posts where
+    customer_emails is a comma / newline separated string.
+    Returns per-passenger results.
+    """
+    agent_email = session.get("user_id")
+    data = request.get_json(silent=True) or request.form
+
+    flights = data.get("flights") or [
+        {"airline_name": data.get("airline_name"), "flight_number": data.get("flight_number")}
+    ]
+    flights = [(f.get("airline_name"), f.get("flight_number")) for f in flights
+               if f.get("airline_name") and f.get("flight_number")]
+
+    emails = data.get("customer_emails") or []
+    if isinstance(emails, str):
+        emails = emails.replace(",", "\n").split("\n")
+    emails = [e.strip() for e in emails if e and e.strip()]
+
+    if not flights or not emails:
+        return jsonify({"error": "Missing flights or customer emails."}), 400
+    if len(emails) > MAX_GROUP_SIZE:
+        return jsonify({"error": f"At most {MAX_GROUP_SIZE} passengers per group."}), 400
+
+    not_allowed = sorted({a for a, _ in flights if not identity.agent_can_sell(agent_email, a)})
+    if not_allowed:
+        return jsonify({"error": f"You are not allowed to sell tickets for: {', '.join(not_allowed)}."}), 403
+
+    try:
+        results = purchase_group(agent_email, flights, emails)
+    except Exception as e:
+        print(f"Error in group purchase: {e}")
+        return jsonify({"error": f"Transaction Error: {e}"}), 500
+
+    return jsonify({
+        "booked": sum(1 for r in results if r["ok"]),
+        "failed": sum(1 for r in results if not r["ok"]),
+        "results": results,
+    })
+
 @agent_bp.route("/analytics")
 @login_required(role="agent")
 def analytics():
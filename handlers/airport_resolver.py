@@ -0,0 +1,129 @@
+"""
+机场 / 城市 / 别名解析缓存。
+
+一次性加载 airport、city、city_alias 三张表，在内存中把用户输入的自由文本
+(机场代码、城市名、别名或其前缀) 解析成精确的机场代码集合，
+查询端再用 `IN (codes)` 命中索引列，替代原来的
+`departure_airport LIKE %s OR da.city LIKE %s OR da.city IN (SELECT ... city_alias ...)`。
+
+staff.add_airport 写入后调用 reload()；另按 AIRPORT_RESOLVER_TTL 定期重载。
+"""
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from flask import current_app
+
+from .utils import query_all
+
+_MEMO_SIZE = 1024
+
+
+class AirportResolver:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._airport_city = {}
+        self._alias_city = {}
+        self._cities = set()
+        self._memo = OrderedDict()
+        self.loaded_at = 0.0
+
+    def load(self, airports, cities, aliases):
+        airport_city = {a["name"].upper(): a["city"] for a in airports}
+        alias_city = defaultdict(set)
+        for a in aliases:
+            alias_city[a["alias_name"].lower()].add(a["city_name"].lower())
+        city_set = {c["city_name"] for c in cities}
+
+        with self._lock:
+            self._airport_city = airport_city
+            self._alias_city = dict(alias_city)
+            self._cities = city_set
+            self._memo = OrderedDict()
+            self.loaded_at = time.monotonic()
+
+    def resolve(self, text, exact_code=False):
+        """
+        Free-text place -> frozenset of airport codes.
+
+        Matches (case-insensitively) when the text is contained in the airport
+        code (or equals it, with exact_code), is contained in the city name,
+        or is exactly one of the city's aliases.
+        """
+        needle = (text or "").strip().lower()
+        memo_key = (needle, exact_code)
+        with self._lock:
+            codes = self._memo.get(memo_key)
+            if codes is not None:
+                self._memo.move_to_end(memo_key)
+                return codes
+
+            alias_cities = self._alias_city.get(needle, ())
+            matched = set()
+            for code, city in self._airport_city.items():
+                code_l, city_l = code.lower(), city.lower()
+                if code_l == needle or (not exact_code and needle in code_l):
+                    matched.add(code)
+                elif needle in city_l or city_l in alias_cities:
+                    matched.add(code)
+            codes = frozenset(matched)
+
+            self._memo[memo_key] = codes
+            if len(self._memo) > _MEMO_SIZE:
+                self._memo.popitem(last=False)
+            return codes
+
+    def city_of(self, code):
+        return self._airport_city.get((code or "").upper())
+
+    def has_airport(self, code):
+        return (code or "").upper() in self._airport_city
+
+    def has_city(self, city):
+        return city in self._cities
+
+
+_resolver = AirportResolver()
+_load_lock = threading.Lock()
+
+
+def _load():
+    airports = query_all("SELECT name, city FROM airport")
+    cities = query_all("SELECT city_name FROM city")
+    aliases = query_all("SELECT city_name, alias_name FROM city_alias")
+    _resolver.load(airports, cities, aliases)
+
+
+def get_resolver():
+    """Return the process-wide resolver, loading it when missing or older than AIRPORT_RESOLVER_TTL."""
+    ttl = current_app.config.get("AIRPORT_RESOLVER_TTL", 300)
+    if _resolver.loaded_at and time.monotonic() - _resolver.loaded_at < ttl:
+        return _resolver
+    if _load_lock.acquire(blocking=not _resolver.loaded_at):
+        try:
+            if not _resolver.loaded_at or time.monotonic() - _resolver.loaded_at >= ttl:
+                _load()
+        finally:
+            _load_lock.release()
+    return _resolver
+
+
+def reload():
+    """Reload airports / cities / aliases now (after staff.add_airport)."""
+    with _load_lock:
+        _load()
+
+
+def resolve(text, exact_code=False):
+    return get_resolver().resolve(text, exact_code)
+
+
+def in_clause(column, text, exact_code=False):
+    """
+    Build `column IN (%s, ...)` for the airports matching `text`.
+    Returns (sql_fragment, params); an unmatched text yields a false predicate.
+    """
+    codes = sorted(resolve(text, exact_code))
+    if not codes:
+        return "1=0", []
+    return f"{column} IN ({','.join(['%s'] * len(codes))})", codes
@@ -1,7 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from werkzeug.security import generate_password_hash, check_password_hash
 
 from .utils import query_one, execute_sql, query_all
+from . import identity
+from .passwords import HashPoolBusyError, hash_password, verify_password
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -23,7 +24,7 @@ def register():
         if password != confirm:
             flash("Passwords do not match.", "error")
             return render_template("register.html", airlines=airlines)
-        password_hash = generate_password_hash(password, method="pbkdf2:sha256:200000")
+        password_hash = hash_password(password)
 
         try:
             if role == "customer":
@@ -108,6 +109,7 @@ def register():
 
                 # Insert single permission
                 execute_sql("INSERT INTO permission (username, permission_type) VALUES (%s, %s)", (email_or_username, permission_type))
+                identity.invalidate(email_or_username)
             else:
                 flash("Invalid role.", "error")
                 return render_template("register.html", airlines=airlines)
@@ -172,9 +174,12 @@ def login():
             # if user["password"] != password:
             #     flash("Invalid password.")
             #     return render_template("login.html")
-            if not check_password_hash(user["password"], password):
+            ok, new_hash = verify_password(user["password"], password)
+            if not ok:
                 flash("Invalid password.", "error")
                 return render_template("login.html")
+            if new_hash:
+                rehash(role, email_or_username, new_hash)
 
             session.clear()
             session["user_role"] = role
@@ -185,6 +190,8 @@ def login():
 
             if role == "staff":
                 session["airline_name"] = user["airline_name"]
+                # 登录时已查过 staff / permission：直接放进身份缓存，后续请求不再查库
+                identity.remember(identity.from_row(user, permissions))
 
             flash("Login success.")
             if role == "customer":
@@ -194,6 +201,8 @@ def login():
             else:
                 return redirect(url_for("staff.dashboard"))
 
+        except HashPoolBusyError:
+            raise  # 503 + Retry-After (passwords.init_passwords)
         except Exception as e:
             flash(f"Login error: {e}", "error")
             return render_template("login.html")
@@ -210,6 +219,25 @@ def query_one_permissions(username):
     return [r["permission_type"] for r in rows] if rows else []
 
 
+# 角色 -> (表, 主键列)
+_ACCOUNT_TABLES = {
+    "customer": ("customer", "email"),
+    "agent": ("booking_agent", "email"),
+    "staff": ("staff", "username"),
+}
+
+
+def rehash(role, key, new_hash):
+    """
+    登录成功且哈希参数已变：写回新哈希。失败只记一笔，不影响这次登录
+    """
+    table, column = _ACCOUNT_TABLES[role]
+    try:
+        execute_sql(f"UPDATE {table} SET password=%s WHERE {column}=%s", (new_hash, key))
+    except Exception as e:
+        print(f"Password rehash failed for {role} {key}: {e}")
+
+
 @auth_bp.route("/logout")
 def logout():
     session.clear()
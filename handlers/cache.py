@@ -0,0 +1,77 @@
+"""
+带 TTL 和版本号失效的 JSON 响应缓存。
+
+- 每个 scope (public / 某个航司 / 某个代理可售航司集合) 一条缓存；
+- 条目在 ttl 秒后过期，或在写路径调用 invalidate() 递增版本号后立即失效；
+- 缓存的是序列化后的 JSON 及其 ETag，响应时带上 ETag / Cache-Control，
+  浏览器在 max-age 内不再请求，过期后用 If-None-Match 拿 304。
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+
+
+class VersionedTTLCache:
+    def __init__(self, ttl=60, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.version = 0
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def get(self, key, compute, ttl=None):
+        """Return (body_bytes, etag) for key, calling compute() on a miss."""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > now and entry[3] == self.version:
+                self._entries.move_to_end(key)
+                return entry[0], entry[1]
+            version = self.version
+
+        body = current_app.json.dumps(compute()).encode("utf-8")
+        etag = hashlib.sha1(body).hexdigest()
+
+        with self._lock:
+            # 计算期间若有写入 (版本号变了)，不要把旧结果放进缓存
+            if version == self.version:
+                self._entries[key] = (body, etag, now + ttl, version)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return body, etag
+
+
+# "有未起飞航班的机场" 列表；任何航班写入 (新增 / 改状态) 后调用 invalidate()
+active_airports = VersionedTTLCache()
+
+
+def cached_json_response(cache, key, compute, public=False):
+    """
+    Serve compute()'s JSON through `cache` with ETag + Cache-Control.
+    Per-user scopes are sent as private and Vary on the session cookie.
+    """
+    ttl = current_app.config.get("AIRPORT_CACHE_TTL", cache.ttl)
+    body, etag = cache.get(key, compute, ttl=ttl)
+
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.max_age = ttl
+    if public:
+        response.cache_control.public = True
+    else:
+        response.cache_control.private = True
+        response.vary.add("Cookie")
+    return response
@@ -1,7 +1,10 @@
 from flask import Blueprint, render_template, request, session, flash, redirect, url_for, jsonify
 from datetime import datetime, timedelta
 
-from .utils import login_required, query_all, query_one, execute_sql
+from .utils import login_required, query_all, query_one, execute_sql, date_range
+from . import cache, lifecycle, pagination, search_index, seat_holds
+from .cache import cached_json_response
+from .purchase_service import purchase_ticket, PurchaseError
 
 customer_bp = Blueprint("customer", __name__)
 
@@ -21,14 +24,10 @@ def upcoming_flights():
     """
     email = session.get("user_id")
     sql = """
-        SELECT f.*, t.ticket_ID, p.purchase_date,
-               dep.city as dep_city, 
-               arr.city as arr_city
+        SELECT f.*, t.ticket_ID, p.purchase_date
         FROM purchases p
         JOIN ticket t ON p.ticket_ID = t.ticket_ID
-        JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
-        LEFT JOIN airport dep ON f.departure_airport = dep.name
-        LEFT JOIN airport arr ON f.arrival_airport = arr.name
+        JOIN flight_search f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
         WHERE p.customer_email=%s AND f.status IN ('upcoming', 'Delayed', 'on-time') AND f.departure_time > NOW()
         ORDER BY f.departure_time ASC
     """
@@ -48,44 +47,18 @@ def search_flights_api():
     destination = request.args.get("destination", "").strip()
     date = request.args.get("date", "").strip()
 
-    # Base condition: Only show future flights that are not cancelled
-    conditions = ["f.status = 'upcoming' AND f.departure_time > NOW()"]
-    params = []
-
-    if origin:
-        conditions.append("(f.departure_airport = %s OR dep.city LIKE %s OR dep.city IN (select ca.city_name from city_alias ca where ca.alias_name= %s))")
-        params.extend([origin, f"%{origin}%", origin])
-    
-    if destination:
-        conditions.append("(f.arrival_airport = %s OR arr.city LIKE %s OR arr.city IN (select ca.city_name from city_alias ca where ca.alias_name= %s))")
-        params.extend([destination, f"%{destination}%", destination])
-    
-    if date:
-        conditions.append("DATE(f.departure_time) = %s")
-        params.append(date)
-
-    where_clause = " AND ".join(conditions)
+    day = search_index.parse_date(date)
+    if date and day is None:
+        return jsonify([])
 
-    # Join with airport table to get City Names for display
-    # Join with airplane to get total capacity
-    # Subquery to get sold tickets count
-    sql = f"""
-    SELECT f.*, 
-           dep.city as dep_city, 
-           arr.city as arr_city,
-           ap.seat_capacity,
-           (SELECT COUNT(*) FROM ticket t WHERE t.airline_name = f.airline_name AND t.flight_number = f.flight_number) as sold_cnt
-        FROM flight f
-        LEFT JOIN airport dep ON f.departure_airport = dep.name
-        LEFT JOIN airport arr ON f.arrival_airport = arr.name
-        LEFT JOIN airplane ap ON f.airplane_assigned = ap.airplane_id AND f.airline_name = ap.airline_name
-        WHERE {where_clause}
-        ORDER BY f.departure_time ASC
-        LIMIT 50
-    """
-    
+    # Served from the in-memory index: city names, seat capacity and sold count
+    # are already denormalized onto each entry.
     try:
-        flights = query_all(sql, tuple(params))
+        flights = search_index.search(
+            origin, destination, day, statuses=["upcoming"], exact_code=True, limit=50
+        )
+        # 别人结账中的占座不算余座
+        seat_holds.apply_to(flights, session.get("user_id"))
         # Convert datetime objects to string for JSON serialization
         for f in flights:
             if isinstance(f.get('departure_time'), datetime):
@@ -112,30 +85,32 @@ def get_active_airports():
     Return airports that actually have upcoming flights.
     Used for autocomplete to only show relevant airports.
     """
-    # Get origins (airports with departing flights)
-    sql_origins = """
-        SELECT DISTINCT f.departure_airport as code, a.city
-        FROM flight f
-        JOIN airport a ON f.departure_airport = a.name
-        WHERE f.status = 'upcoming' AND f.departure_time > NOW()
-        ORDER BY a.city
-    """
-    origins = query_all(sql_origins)
-
-    # Get destinations (airports with arriving flights)
-    sql_dests = """
-        SELECT DISTINCT f.arrival_airport as code, a.city
-        FROM flight f
-        JOIN airport a ON f.arrival_airport = a.name
-        WHERE f.status = 'upcoming' AND f.departure_time > NOW()
-        ORDER BY a.city
-    """
-    dests = query_all(sql_dests)
-
-    return jsonify({
-        "origins": origins,
-        "destinations": dests
-    })
+    # Same answer for every customer: share the public scope
+    def load():
+        # Get origins (airports with departing flights)
+        sql_origins = """
+            SELECT DISTINCT f.departure_airport as code, f.dep_city AS city
+            FROM flight_search f
+            WHERE f.status = 'upcoming' AND f.departure_time > NOW()
+            ORDER BY f.dep_city
+        """
+        origins = query_all(sql_origins)
+
+        # Get destinations (airports with arriving flights)
+        sql_dests = """
+            SELECT DISTINCT f.arrival_airport as code, f.arr_city AS city
+            FROM flight_search f
+            WHERE f.status = 'upcoming' AND f.departure_time > NOW()
+            ORDER BY f.arr_city
+        """
+        dests = query_all(sql_dests)
+
+        return {
+            "origins": origins,
+            "destinations": dests
+        }
+
+    return cached_json_response(cache.active_airports, ("public",), load)
 
 
 @customer_bp.route("/flights", methods=["GET", "POST"])
@@ -143,47 +118,68 @@ def get_active_airports():
 def flights():
     """
     Show purchased flights history.
+    Newest departure first, paged by (departure_time, ticket_ID) with ?cursor=.
     """
     email = session.get("user_id")
     
     # Get filter parameters (default to empty if not provided)
-    start_date = request.form.get("start_date", "").strip()
-    end_date = request.form.get("end_date", "").strip()
-    origin = request.form.get("origin", "").strip()
-    destination = request.form.get("destination", "").strip()
-
-    conditions = ["p.customer_email=%s"]
+    # request.values: the form POST, or the query string of a "Load more" link
+    start_date = request.values.get("start_date", "").strip()
+    end_date = request.values.get("end_date", "").strip()
+    origin = request.values.get("origin", "").strip()
+    destination = request.values.get("destination", "").strip()
+    size = pagination.page_size(request.values.get("limit"))
+
+    # 筛选的起飞日期早于归档边界 (或不限) 时连同已归档的航班一起列出：p / f 都换成视图 s 的列
+    archived = lifecycle.reaches_archive(start_date, departures=True)
+    p, f = ("s", "s") if archived else ("p", "f")
+    keyset = pagination.TICKETS_BY_DEPARTURE.over("s") if archived else pagination.TICKETS_BY_DEPARTURE
+
+    conditions = [f"{p}.customer_email=%s"]
     params = [email]
 
     # Apply filters if they exist
-    if start_date:
-        conditions.append("DATE(f.departure_time) >= %s")
-        params.append(start_date)
-    if end_date:
-        conditions.append("DATE(f.departure_time) <= %s")
-        params.append(end_date)
+    conds, date_params = date_range(f"{f}.departure_time", start_date, end_date)
+    conditions.extend(conds)
+    params.extend(date_params)
 
     if origin:
-        conditions.append("f.departure_airport=%s")
+        conditions.append(f"{f}.departure_airport=%s")
         params.append(origin)
     if destination:
-        conditions.append("f.arrival_airport=%s")
+        conditions.append(f"{f}.arrival_airport=%s")
         params.append(destination)
 
+    try:
+        after, after_params = keyset.where(request.values.get("cursor"))
+    except pagination.InvalidCursor as e:
+        flash(str(e))
+        after, after_params = None, []
+    if after:
+        conditions.append(after)
+        params.extend(after_params)
+
     where_clause = " AND ".join(conditions)
     
     # Always execute the query
-    sql = f"""
-        SELECT f.*, t.ticket_ID, p.purchase_date
-        FROM purchases p
-        JOIN ticket t ON p.ticket_ID = t.ticket_ID
-        JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
-        WHERE {where_clause}
-        ORDER BY f.departure_time DESC
-    """
-    flights = query_all(sql, tuple(params))
-
-    return render_template("customer_flights.html", flights=flights)
+    if archived:
+        sql = f"{lifecycle.HISTORY_SELECT} WHERE {where_clause}" + keyset.order_limit(size)
+    else:
+        sql = f"""
+            SELECT f.*, t.ticket_ID, p.purchase_date
+            FROM purchases p
+            JOIN ticket t ON p.ticket_ID = t.ticket_ID
+            JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
+            WHERE {where_clause}
+        """ + keyset.order_limit(size)
+    flights, next_cursor = keyset.page(query_all(sql, tuple(params)), size)
+
+    next_url = None
+    if next_cursor:
+        filters = {"start_date": start_date, "end_date": end_date, "origin": origin, "destination": destination,
+                   "limit": request.values.get("limit")}
+        next_url = url_for("customer.flights", cursor=next_cursor, **{k: v for k, v in filters.items() if v})
+    return render_template("customer_flights.html", flights=flights, next_url=next_url)
 
 
 @customer_bp.route("/search", methods=["GET", "POST"])
@@ -200,8 +196,9 @@ def search():
     params = []
 
     if date:
-        conditions.append("DATE(f.departure_time) = %s")
-        params.append(date)
+        conds, date_params = date_range("f.departure_time", date, date)
+        conditions.extend(conds)
+        params.extend(date_params)
     
     if origin:
         conditions.append("f.departure_airport=%s")
@@ -218,6 +215,8 @@ def search():
         ORDER BY f.departure_time ASC
     """
     flights = query_all(sql, tuple(params))
+    # 别人结账中的占座不算余座
+    seat_holds.apply_to(flights, session.get("user_id"))
 
     return render_template("customer_search.html", flights=flights)
 
@@ -234,14 +233,10 @@ def book_ticket():
         flash("Invalid flight selection.", "danger")
         return redirect(url_for("customer.dashboard"))
 
-    # Updated SQL to join with airport table for city names
+    # City names come from the flight_search read model
     sql = """
-        SELECT f.*, 
-               dep.city as dep_city, 
-               arr.city as arr_city
-        FROM flight f
-        LEFT JOIN airport dep ON f.departure_airport = dep.name
-        LEFT JOIN airport arr ON f.arrival_airport = arr.name
+        SELECT f.*
+        FROM flight_search f
         WHERE f.airline_name=%s AND f.flight_number=%s
     """
     flight = query_one(sql, (airline, flight_num))
@@ -250,27 +245,10 @@ def book_ticket():
         flash("Flight not found.", "danger")
         return redirect(url_for("customer.dashboard"))
 
-    return render_template("customer_booking.html", flight=flight)
-
-
-def check_capacity(airline_name, flight_number):
-    """
-    检查 flight 剩余座位，直接使用 flight 表中的 remaining_seats 字段。
-    """
-    sql_remaining = """
-        SELECT remaining_seats
-        FROM flight
-        WHERE airline_name=%s AND flight_number=%s
-    """
-    
-    row = query_one(sql_remaining, (airline_name, flight_number))
-    
-    if not row:
-        return False, "Flight not found."
-    remaining_seats = row["remaining_seats"]
-    if remaining_seats <= 0:
-        return False, "No available seats."
-    return True, ""
+    # 结账期间为本人占一个座 (重复打开只续期)
+    hold_expires_at = seat_holds.take(flight["airline_name"], flight["flight_number"], session.get("user_id"))
+    seat_holds.apply_to([flight], session.get("user_id"))
+    return render_template("customer_booking.html", flight=flight, hold_expires_at=hold_expires_at)
 
 
 @customer_bp.route("/purchase", methods=["POST"])
@@ -283,49 +261,11 @@ def purchase():
     airline_name = request.form.get("airline_name")
     flight_number = request.form.get("flight_number")
 
-    ok, msg = check_capacity(airline_name, flight_number)
-    if not ok:
-        flash(msg)
-        return redirect(url_for("customer.dashboard"))
-
-    flight = query_one(
-        "SELECT price FROM flight WHERE airline_name=%s AND flight_number=%s",
-        (airline_name, flight_number),
-    )
-    if not flight:
-        flash("Flight not found.")
-        return redirect(url_for("customer.dashboard"))
-
-    price = flight["price"]
-    ticket_id = datetime.now().strftime("%Y%m%d%H%M%S") + "C"
-
     try:
-        execute_sql(
-            """
-            INSERT INTO ticket (ticket_ID, ticket_price, ticket_status, airline_name, flight_number)
-            VALUES (%s, %s, 'Confirmed', %s, %s)
-            """,
-            (ticket_id, price, airline_name, flight_number),
-        )
-
-        execute_sql(
-            """
-            INSERT INTO purchases (customer_email, agent_email, ticket_ID, purchase_date)
-            VALUES (%s, NULL, %s, NOW())
-            """,
-            (email, ticket_id),
-        )
-
-        execute_sql(
-            """
-            UPDATE flight
-            SET remaining_seats = remaining_seats - 1
-            WHERE airline_name=%s AND flight_number=%s AND remaining_seats > 0
-            """,
-            (airline_name, flight_number),
-        )
-
+        purchase_ticket(email, airline_name, flight_number)
         flash("Ticket purchased successfully.")
+    except PurchaseError as e:
+        flash(str(e))
     except Exception as e:
         flash(f"Purchase failed: {e}")
 
@@ -349,27 +289,34 @@ def spending():
         end_date = datetime.today().date()
         start_date = end_date - timedelta(days=365)
 
-    sql_total = """
-        SELECT COALESCE(SUM(t.ticket_price), 0) AS total
-        FROM purchases p
-        JOIN ticket t ON p.ticket_ID = t.ticket_ID
-        WHERE p.customer_email=%s
-          AND DATE(p.purchase_date) BETWEEN %s AND %s
+    # 半开区间 [start, end + 1 day)，purchase_date 列上不套函数
+    conds, range_params = date_range("p.purchase_date", start_date, end_date)
+    range_clause = "".join(" AND " + c for c in conds)
+    params = (email, *range_params)
+
+    # 自定义区间早于归档边界时连同已归档的购买记录一起统计
+    if lifecycle.reaches_archive(start_date):
+        source, price = "sales_history p", "p.ticket_price"
+    else:
+        source, price = "purchases p JOIN ticket t ON p.ticket_ID = t.ticket_ID", "t.ticket_price"
+
+    sql_total = f"""
+        SELECT COALESCE(SUM({price}), 0) AS total
+        FROM {source}
+        WHERE p.customer_email=%s{range_clause}
     """
-    total_row = query_one(sql_total, (email, start_date, end_date))
+    total_row = query_one(sql_total, params)
     total_spending = float(total_row["total"]) if total_row else 0.0
 
-    sql_month = """
+    sql_month = f"""
         SELECT DATE_FORMAT(p.purchase_date, '%%Y-%%m') AS month,
-               COALESCE(SUM(t.ticket_price), 0) AS total
-        FROM purchases p
-        JOIN ticket t ON p.ticket_ID = t.ticket_ID
-        WHERE p.customer_email=%s
-          AND DATE(p.purchase_date) BETWEEN %s AND %s
+               COALESCE(SUM({price}), 0) AS total
+        FROM {source}
+        WHERE p.customer_email=%s{range_clause}
         GROUP BY month
         ORDER BY month
     """
-    rows = query_all(sql_month, (email, start_date, end_date))
+    rows = query_all(sql_month, params)
     months = [r["month"] for r in rows]
     amounts = [float(r["total"]) for r in rows]
 
@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolExhaustedError(RuntimeError):
+    """Raised when no connection could be borrowed within the wait timeout."""
+
+
+class ConnectionPool:
+    """
+    线程安全的有界连接池。
+
+    - max_size: 同时存在的连接上限 (in use + idle)
+    - timeout: 借不到连接时最多等待的秒数
+    - recycle: 连接最大存活秒数，超过后在归还/借出时销毁重建
+    - ping_interval: 空闲超过该秒数的连接在借出前先 ping 校验
+    """
+
+    def __init__(self, creator, max_size=10, timeout=5.0, recycle=3600, ping_interval=0):
+        self._creator = creator
+        self.max_size = max(1, int(max_size))
+        self.timeout = float(timeout)
+        self.recycle = float(recycle)
+        self.ping_interval = float(ping_interval)
+
+        self._cond = threading.Condition(threading.Lock())
+        # idle entries: (conn, created_at, last_used_at)
+        self._idle = deque()
+        self._created_at = {}
+        self._in_use = 0
+
+        self._created = 0
+        self._destroyed = 0
+        self._borrowed = 0
+        self._timeouts = 0
+        self._wait_count = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    # ---------- borrow / return ----------
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, created_at, last_used = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use + len(self._idle) < self.max_size:
+                    conn = None
+                    self._in_use += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolExhaustedError(
+                        f"Database connection pool exhausted: {self.max_size} connections in use, "
+                        f"waited {self.timeout:.1f}s"
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+            if waited:
+                elapsed = time.monotonic() - start
+                self._wait_count += 1
+                self._wait_total += elapsed
+                self._wait_max = max(self._wait_max, elapsed)
+
+        # 网络 I/O 放在锁外面
+        try:
+            if conn is not None:
+                conn = self._validate(conn, created_at, last_used)
+            if conn is None:
+                conn = self._create()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._borrowed += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        if conn is None:
+            return
+        created_at = self._created_at.get(id(conn), 0.0)
+        expired = self.recycle > 0 and time.monotonic() - created_at > self.recycle
+        if not (discard or expired or not getattr(conn, "open", True)):
+            # 借用方 begin() 之后没有 commit/rollback 就归还时，回滚掉未结束的事务和行锁，
+            # 不留给下一个借用方；回滚失败的连接直接销毁
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        if discard or expired or not getattr(conn, "open", True):
+            self._destroy(conn)
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def _validate(self, conn, created_at, last_used):
+        """Return a usable connection or None (caller then creates a fresh one)."""
+        now = time.monotonic()
+        if self.recycle > 0 and now - created_at > self.recycle:
+            self._destroy(conn)
+            return None
+        if now - last_used >= self.ping_interval:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                self._destroy(conn)
+                return None
+        return conn
+
+    def _create(self):
+        conn = self._creator()
+        with self._cond:
+            self._created_at[id(conn)] = time.monotonic()
+            self._created += 1
+        return conn
+
+    def _destroy(self, conn):
+        with self._cond:
+            self._created_at.pop(id(conn), None)
+            self._destroyed += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Close every idle connection (connections still in use are closed on release)."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _, _ in idle:
+            self._destroy(conn)
+
+    # ---------- stats ----------
+
+    def stats(self):
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "created": self._created,
+                "destroyed": self._destroyed,
+                "borrowed": self._borrowed,
+                "timeouts": self._timeouts,
+                "wait_count": self._wait_count,
+                "wait_time_total": round(self._wait_total, 6),
+                "wait_time_max": round(self._wait_max, 6),
+            }
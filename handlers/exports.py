@@ -0,0 +1,69 @@
+"""
+CSV / NDJSON 流式导出。
+
+行来自 utils.stream_query (无缓冲的服务端游标)，按批编码后由生成器逐块
+写给客户端，不会把整个结果集放进内存：
+
+    GET /staff/export/passengers?flight_number=DL9010&format=csv
+    GET /agent/export/transactions?start_date=2025-01-01&format=ndjson
+"""
+import csv
+import io
+import json
+
+from flask import Response, request
+
+from .utils import plain_value
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+# 每次 yield 的大致字节数；太小会产生大量很小的 chunk
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_csv(rows, columns):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([plain_value(row.get(c)) for c in columns])
+        if buf.tell() >= CHUNK_SIZE:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def iter_ndjson(rows, columns):
+    parts, size = [], 0
+    for row in rows:
+        line = json.dumps({c: plain_value(row.get(c)) for c in columns}, ensure_ascii=False) + "\n"
+        parts.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(parts)
+            parts, size = [], 0
+    yield "".join(parts)
+
+
+def requested_format():
+    """?format=csv|ndjson (default csv); None if unsupported."""
+    fmt = (request.args.get("format") or "csv").lower()
+    return fmt if fmt in FORMATS else None
+
+
+def export_response(stream, columns, fmt, filename):
+    """
+    Stream `stream` (a utils.RowStream) as a download.
+    The DB connection is returned to the pool when the response is closed.
+    """
+    body = iter_csv(stream, columns) if fmt == "csv" else iter_ndjson(stream, columns)
+    response = Response(body, mimetype=FORMATS[fmt])
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    # 让反向代理直接转发，不要攒满整个响应
+    response.headers["X-Accel-Buffering"] = "no"
+    response.call_on_close(stream.close)
+    return response
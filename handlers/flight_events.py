@@ -0,0 +1,183 @@
+"""
+航班状态推送 (Server-Sent Events)。
+
+staff 修改状态 / 创建航班后调用 publish_flight()，变更只广播一次，
+由进程内的 broker 按订阅条件 (airline / flight_number / date) 分发给
+所有打开 /api/status_stream 的浏览器，不再需要每个页面轮询 MySQL。
+
+断线重连时浏览器会带上 Last-Event-ID，最近 EVENT_HISTORY 条事件可以补发；
+更早的或者消费太慢被丢弃的，发送 `event: resync`，客户端重新拉一次快照。
+
+注意：broker 在进程内。多 worker 部署时每个 worker 只能推送自己处理的变更，
+需要换成共享的消息通道 (例如 Redis pub/sub)。
+"""
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+from flask import Response, current_app, request
+
+from .utils import query_one
+
+EVENT_HISTORY = 500
+QUEUE_SIZE = 256
+
+
+class Subscription:
+    """One SSE client and its filters (same semantics as public.check_status_api)."""
+
+    def __init__(self, airline=None, flight_number=None, date=None):
+        self.airline = (airline or "").strip().lower()
+        self.flight_number = (flight_number or "").strip().lower()
+        self.date = (date or "").strip()
+        self.queue = queue.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+    def matches(self, event):
+        if self.airline and self.airline not in event["airline_name"].lower():
+            return False
+        if self.flight_number and self.flight_number not in event["flight_number"].lower():
+            return False
+        if self.date and not (event.get("departure_time") or "").startswith(self.date):
+            return False
+        return True
+
+    def offer(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # 客户端太慢：丢掉积压，让它重新拉快照
+            self.overflowed = True
+
+
+class FlightEventBroker:
+    def __init__(self, history=EVENT_HISTORY):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._history = deque(maxlen=history)
+        self._epoch = str(int(time.time()))
+        self._seq = itertools.count(1)
+        self.published = 0
+
+    def subscribe(self, sub, last_event_id=None, max_subscribers=None):
+        """
+        Register `sub`. Returns the events to replay after last_event_id,
+        or None if they are no longer available (client must resync).
+        Returns False when max_subscribers is reached.
+        """
+        with self._lock:
+            if max_subscribers is not None and len(self._subscribers) >= max_subscribers:
+                return False
+            self._subscribers.add(sub)
+            if not last_event_id:
+                return []
+            epoch, _, seq = last_event_id.partition("-")
+            if epoch != self._epoch or not seq.isdigit():
+                return None
+            seq = int(seq)
+            if self._history and self._history[0][0] > seq + 1:
+                return None
+            return [ev for n, ev in self._history if n > seq and sub.matches(ev)]
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, event):
+        with self._lock:
+            seq = next(self._seq)
+            event = dict(event, id=f"{self._epoch}-{seq}")
+            self._history.append((seq, event))
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for sub in subscribers:
+            if sub.matches(event):
+                sub.offer(event)
+        return event["id"]
+
+    def stats(self):
+        with self._lock:
+            return {"subscribers": len(self._subscribers), "published": self.published}
+
+
+broker = FlightEventBroker()
+
+
+def _serialize(row):
+    out = {}
+    for key in ("airline_name", "flight_number", "departure_airport", "arrival_airport",
+                "dep_city", "arr_city", "departure_time", "arrival_time", "status"):
+        value = row.get(key)
+        out[key] = str(value) if value is not None else None
+    return out
+
+
+def publish_flight(airline_name, flight_number, kind):
+    """
+    Broadcast the current state of one flight. kind: 'created' | 'status'.
+    Call after the change is committed; failures are logged, never raised.
+    """
+    try:
+        row = query_one(
+            """
+            SELECT f.* FROM flight_search f
+            WHERE f.airline_name=%s AND f.flight_number=%s
+            """,
+            (airline_name, flight_number),
+        )
+        if row:
+            broker.publish(dict(_serialize(row), kind=kind))
+    except Exception as e:
+        print(f"Error publishing flight event: {e}")
+
+
+def _format(event):
+    return f"id: {event['id']}\nevent: flight\ndata: {json.dumps(event)}\n\n"
+
+
+def _stream(sub, replay, heartbeat):
+    yield "retry: 3000\n\n"
+    if replay is None:
+        yield "event: resync\ndata: {}\n\n"
+    for event in replay or ():
+        yield _format(event)
+    while True:
+        try:
+            event = sub.queue.get(timeout=heartbeat)
+        except queue.Empty:
+            # 注释行保持连接，也让服务器及时发现客户端已断开
+            yield ": keep-alive\n\n"
+            continue
+        if sub.overflowed:
+            while not sub.queue.empty():
+                sub.queue.get_nowait()
+            sub.overflowed = False
+            yield "event: resync\ndata: {}\n\n"
+            continue
+        yield _format(event)
+
+
+def stream_response():
+    """SSE response for ?airline=&flight_number=&date= (all optional)."""
+    sub = Subscription(
+        request.args.get("airline"), request.args.get("flight_number"), request.args.get("date")
+    )
+    replay = broker.subscribe(
+        sub,
+        request.headers.get("Last-Event-ID") or request.args.get("last_event_id"),
+        current_app.config.get("SSE_MAX_SUBSCRIBERS", 1000),
+    )
+    if replay is False:
+        return "Too many status subscribers, please retry shortly.", 503, {"Retry-After": "5"}
+
+    response = Response(
+        _stream(sub, replay, current_app.config.get("SSE_HEARTBEAT", 15)),
+        mimetype="text/event-stream",
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    response.call_on_close(lambda: broker.unsubscribe(sub))
+    return response
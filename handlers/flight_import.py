@@ -0,0 +1,344 @@
+"""
+航班计划批量导入 (CSV / JSON / NDJSON)。
+
+一次性把机场、本航司飞机 (含容量)、已有航班号读进内存，逐行校验后
+在同一个事务里分批 executemany (pymysql 会拼成多行 INSERT)：
+
+    BEGIN
+    INSERT INTO flight (...) VALUES (...), (...), ...   -- 每批 IMPORT_BATCH_SIZE 行
+    COMMIT
+
+remaining_seats 的规则与 before_insert_flight_capacity_check 触发器一致
+(空 -> 飞机容量，必须在 [1, capacity])，在校验阶段就按行报错，
+触发器仍然会在插入时再检查一遍。默认有任何错误行就整批不导入；
+skip_invalid 时只导入合法行。
+
+    POST /staff/admin/flight/import            (上传文件或 JSON body)
+    flask --app app flights import schedule.csv --airline "China Eastern"
+"""
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from .utils import get_db, query_all
+from . import cache, flight_events, search_index
+from .flight_search import search_check_command, search_rebuild_command
+from .lifecycle import lifecycle_command
+from .schedules import expand_command
+
+FIELDS = (
+    "flight_number", "departure_airport", "arrival_airport", "departure_time",
+    "arrival_time", "price", "airplane_assigned", "remaining_seats", "status",
+)
+REQUIRED = ("flight_number", "departure_airport", "arrival_airport", "departure_time",
+            "arrival_time", "price", "airplane_assigned")
+# 表单上叫 seats_available
+ALIASES = {"seats_available": "remaining_seats", "airplane_id": "airplane_assigned"}
+STATUSES = ("upcoming", "on-time", "delayed", "cancelled", "arrived")
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 500
+# 超过这个行数就不逐个推送 'created' 事件 (每个事件要查一次库)
+MAX_CREATED_EVENTS = 100
+
+_INSERT_SQL = """
+    INSERT INTO flight
+    (flight_number, airline_name, departure_airport, arrival_airport,
+     departure_time, arrival_time, price, status, airplane_assigned, remaining_seats)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+class ImportFormatError(ValueError):
+    """The upload could not be parsed at all (bad JSON, missing CSV columns, too many rows)."""
+
+
+# ---------- 解析 ----------
+
+def _normalize_keys(record):
+    out = {}
+    for key, value in record.items():
+        if key is None:
+            continue
+        key = key.strip().lower()
+        out[ALIASES.get(key, key)] = value
+    return out
+
+
+def parse_csv(text):
+    reader = csv.DictReader(io.StringIO(text))
+    header = {ALIASES.get(h.strip().lower(), h.strip().lower()) for h in reader.fieldnames or ()}
+    missing = [f for f in REQUIRED if f not in header]
+    if missing:
+        raise ImportFormatError(f"CSV is missing columns: {', '.join(missing)}")
+    return [_normalize_keys(r) for r in reader]
+
+
+def parse_json(text):
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise ImportFormatError(f"Invalid JSON: {e}")
+    if isinstance(data, dict):
+        data = data.get("flights")
+    if not isinstance(data, list):
+        raise ImportFormatError('JSON must be a list of flights or {"flights": [...]}.')
+    return [_normalize_keys(r) if isinstance(r, dict) else r for r in data]
+
+
+def parse_ndjson(text):
+    rows = []
+    for lineno, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise ImportFormatError(f"Invalid JSON on line {lineno}: {e}")
+        rows.append(_normalize_keys(record) if isinstance(record, dict) else record)
+    return rows
+
+
+PARSERS = {"csv": parse_csv, "json": parse_json, "ndjson": parse_ndjson}
+
+
+def guess_format(filename, declared=None):
+    fmt = (declared or "").strip().lower()
+    if not fmt and filename and "." in filename:
+        fmt = filename.rsplit(".", 1)[1].lower()
+    if fmt == "jsonl":
+        fmt = "ndjson"
+    if fmt not in PARSERS:
+        raise ImportFormatError("Unknown file format; use .csv, .json or .ndjson.")
+    return fmt
+
+
+def parse_upload(data, fmt):
+    """bytes / str -> list of row dicts (keys lower-cased, aliases applied)."""
+    if isinstance(data, (bytes, bytearray)):
+        try:
+            data = data.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise ImportFormatError("File must be UTF-8 encoded.")
+    rows = PARSERS[fmt](data)
+    max_rows = current_app.config.get("FLIGHT_IMPORT_MAX_ROWS", 200000)
+    if len(rows) > max_rows:
+        raise ImportFormatError(f"Too many rows ({len(rows)}); the limit is {max_rows}.")
+    return rows
+
+
+# ---------- 校验 ----------
+
+class ImportLookups:
+    """Airports, this airline's airplanes and existing flight numbers, loaded once per import."""
+
+    def __init__(self, airline_name):
+        self.airline_name = airline_name
+        # MySQL 默认排序规则不区分大小写，这里也按不区分大小写匹配，写入库里原本的写法
+        self.airports = {r["name"].upper(): r["name"] for r in query_all("SELECT name FROM airport")}
+        self.airplanes = {
+            r["airplane_id"].lower(): (r["airplane_id"], r["seat_capacity"])
+            for r in query_all(
+                "SELECT airplane_id, seat_capacity FROM airplane WHERE airline_name=%s", (airline_name,)
+            )
+        }
+        self.flight_numbers = {
+            r["flight_number"].lower()
+            for r in query_all("SELECT flight_number FROM flight WHERE airline_name=%s", (airline_name,))
+        }
+
+
+def _text(value):
+    return "" if value is None else str(value).strip()
+
+
+def _parse_time(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(_text(value)).replace(tzinfo=None, microsecond=0)
+
+
+def validate_row(record, lookups, seen):
+    """Return (params_tuple, None) or (None, [error, ...]) for one input record."""
+    if not isinstance(record, dict):
+        return None, ["Row must be an object."]
+    errors = []
+    values = {f: _text(record.get(f)) for f in FIELDS}
+    missing = [f for f in REQUIRED if not values[f]]
+    if missing:
+        return None, [f"Missing {', '.join(missing)}."]
+
+    airline = _text(record.get("airline_name"))
+    if airline and airline.lower() != lookups.airline_name.lower():
+        errors.append(f"Airline '{airline}' does not match your airline.")
+
+    flight_number = values["flight_number"]
+    if len(flight_number) > 6:
+        errors.append("Flight number must be at most 6 characters.")
+    elif flight_number.lower() in lookups.flight_numbers:
+        errors.append(f"Flight {flight_number} already exists.")
+    elif flight_number.lower() in seen:
+        errors.append(f"Flight {flight_number} appears more than once in this file (row {seen[flight_number.lower()]}).")
+
+    dep = lookups.airports.get(values["departure_airport"].upper())
+    arr = lookups.airports.get(values["arrival_airport"].upper())
+    if dep is None:
+        errors.append(f"Unknown departure airport '{values['departure_airport']}'.")
+    if arr is None:
+        errors.append(f"Unknown arrival airport '{values['arrival_airport']}'.")
+    if dep is not None and dep == arr:
+        errors.append("Departure and Arrival airports cannot be the same.")
+
+    try:
+        departure_time = _parse_time(values["departure_time"])
+        arrival_time = _parse_time(values["arrival_time"])
+        if arrival_time <= departure_time:
+            errors.append("Arrival time must be after departure time.")
+    except ValueError:
+        departure_time = arrival_time = None
+        errors.append("Times must look like YYYY-MM-DD HH:MM[:SS].")
+
+    try:
+        price = Decimal(values["price"]).quantize(Decimal("0.01"), ROUND_HALF_UP)
+        if not price.is_finite() or price < 0:
+            raise InvalidOperation
+    except (InvalidOperation, ValueError):
+        price = None
+        errors.append("Price must be a non-negative number.")
+
+    status = values["status"].lower() or "upcoming"
+    if status not in STATUSES:
+        errors.append(f"Unknown status '{values['status']}'.")
+
+    airplane = lookups.airplanes.get(values["airplane_assigned"].lower())
+    remaining_seats = None
+    if airplane is None:
+        errors.append(f"Airplane '{values['airplane_assigned']}' not found for this airline.")
+    else:
+        capacity = airplane[1]
+        # 与 before_insert_flight_capacity_check 相同：空值取容量，必须在 [1, capacity]
+        if values["remaining_seats"]:
+            try:
+                remaining_seats = int(values["remaining_seats"])
+            except ValueError:
+                errors.append("Seats Available must be a valid number.")
+        else:
+            remaining_seats = capacity
+        if remaining_seats is not None and remaining_seats > capacity:
+            errors.append("Error: Initial remaining_seats cannot exceed the assigned airplane seat capacity.")
+        elif remaining_seats is not None and remaining_seats <= 0:
+            errors.append("Error: New flights must be initialized with a positive number of remaining seats.")
+
+    if errors:
+        return None, errors
+    return (
+        flight_number, lookups.airline_name, dep, arr, departure_time, arrival_time,
+        price, status, airplane[0], remaining_seats,
+    ), None
+
+
+# ---------- 导入 ----------
+
+def _insert(rows, batch_size):
+    db = get_db()
+    db.begin()
+    try:
+        with db.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                cursor.executemany(_INSERT_SQL, rows[start:start + batch_size])
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+
+
+def import_flights(records, airline_name, skip_invalid=False, dry_run=False):
+    """
+    Validate and insert flight records for one airline. Returns a report dict:
+    received / valid / inserted counts, per-row errors (first MAX_REPORTED_ERRORS,
+    row numbers are 1-based data rows) and timings.
+    Database errors during the insert roll back the whole import and propagate.
+    """
+    started = time.perf_counter()
+    lookups = ImportLookups(airline_name)
+    valid, errors, seen = [], [], {}
+    error_count = 0
+    for i, record in enumerate(records, 1):
+        params, row_errors = validate_row(record, lookups, seen)
+        if row_errors:
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                number = record.get("flight_number") if isinstance(record, dict) else None
+                errors.append({"row": i, "flight_number": number, "errors": row_errors})
+            continue
+        seen[params[0].lower()] = i
+        valid.append(params)
+    validated = time.perf_counter()
+
+    report = {
+        "received": len(records),
+        "valid": len(valid),
+        "error_count": error_count,
+        "errors": errors,
+        "inserted": 0,
+        "dry_run": dry_run,
+        "validate_ms": round((validated - started) * 1000, 1),
+        "insert_ms": 0.0,
+    }
+    if dry_run or not valid or (error_count and not skip_invalid):
+        return report
+
+    _insert(valid, current_app.config.get("FLIGHT_IMPORT_BATCH_SIZE", IMPORT_BATCH_SIZE))
+    report["inserted"] = len(valid)
+    report["insert_ms"] = round((time.perf_counter() - validated) * 1000, 1)
+
+    search_index.invalidate()
+    cache.active_airports.invalidate()
+    if len(valid) <= MAX_CREATED_EVENTS:
+        for params in valid:
+            flight_events.publish_flight(airline_name, params[0], "created")
+    return report
+
+
+# ---------- CLI ----------
+
+flights_cli = AppGroup("flights", help="Flight schedule import, recurring schedules, the flight_search read model and the status / archive lifecycle.")
+
+
+@flights_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--airline", required=True, help="Airline the flights belong to.")
+@click.option("--format", "fmt", default=None, help="csv / json / ndjson (default: from the file extension).")
+@click.option("--skip-invalid", is_flag=True, help="Import the valid rows even if some rows fail.")
+@click.option("--dry-run", is_flag=True, help="Validate only.")
+def import_command(path, airline, fmt, skip_invalid, dry_run):
+    """Bulk-import a flight schedule file for one airline."""
+    try:
+        with open(path, "rb") as f:
+            records = parse_upload(f.read(), guess_format(path, fmt))
+    except ImportFormatError as e:
+        raise click.UsageError(str(e))
+    report = import_flights(records, airline, skip_invalid=skip_invalid, dry_run=dry_run)
+    for err in report["errors"][:20]:
+        click.echo(f"row {err['row']} ({err['flight_number']}): {' '.join(err['errors'])}")
+    if report["error_count"] > 20:
+        click.echo(f"... {report['error_count'] - 20} more rows with errors")
+    click.echo(
+        f"received={report['received']} valid={report['valid']} errors={report['error_count']} "
+        f"inserted={report['inserted']} validate={report['validate_ms']}ms insert={report['insert_ms']}ms"
+    )
+    if report["error_count"] and not (skip_invalid or dry_run):
+        click.echo("Nothing imported; fix the rows above or pass --skip-invalid.")
+
+
+flights_cli.add_command(expand_command)
+flights_cli.add_command(search_rebuild_command)
+flights_cli.add_command(search_check_command)
+flights_cli.add_command(lifecycle_command)
@@ -0,0 +1,99 @@
+"""
+flight_search 读模型的全量重建与一致性检查。
+
+flight_search (db_sql/migrations/004_flight_search.sql) = flight 的全部列
++ 出发 / 到达城市 + 飞机容量 + 已售票数，平时由触发器增量维护，
+列表 / 搜索查询直接读它，省掉 airport 的两次 JOIN 和 ticket 的 COUNT。
+批量导入时摘掉触发器 (benchmarks/datagen.py --fast) 或怀疑漂移时：
+
+    flask --app app flights search-check
+    flask --app app flights search-rebuild
+"""
+import click
+
+from .utils import get_db, query_all
+
+# 维护 flight_search 的触发器 (datagen --fast 导入期间摘掉，结束后重建)
+TRIGGERS = (
+    "after_insert_flight_search",
+    "after_update_flight_search",
+    "after_update_flight_search_refs",  # 仅 SQLite
+    "after_insert_ticket_flight_search",
+    "after_delete_ticket_flight_search",
+)
+
+COLUMNS = (
+    "flight_number", "airline_name", "departure_airport", "arrival_airport", "departure_time", "arrival_time",
+    "price", "status", "airplane_assigned", "remaining_seats", "dep_city", "arr_city", "seat_capacity", "sold_cnt",
+)
+
+_SOURCE_SQL = """
+    SELECT f.flight_number, f.airline_name, f.departure_airport, f.arrival_airport, f.departure_time, f.arrival_time,
+           f.price, f.status, f.airplane_assigned, f.remaining_seats, da.city AS dep_city, aa.city AS arr_city,
+           ap.seat_capacity, COALESCE(s.sold_cnt, 0) AS sold_cnt
+    FROM flight f
+    LEFT JOIN airport da ON f.departure_airport = da.name
+    LEFT JOIN airport aa ON f.arrival_airport = aa.name
+    LEFT JOIN airplane ap ON f.airplane_assigned = ap.airplane_id AND f.airline_name = ap.airline_name
+    LEFT JOIN (
+        SELECT airline_name, flight_number, COUNT(*) AS sold_cnt
+        FROM ticket
+        GROUP BY airline_name, flight_number
+    ) s ON s.airline_name = f.airline_name AND s.flight_number = f.flight_number
+"""
+
+
+def rebuild_flight_search():
+    """Recompute every flight_search row from the base tables in one transaction. Returns the row count."""
+    db = get_db()
+    db.begin()
+    try:
+        with db.cursor() as cursor:
+            cursor.execute("DELETE FROM flight_search")
+            rows = cursor.execute(f"INSERT INTO flight_search ({', '.join(COLUMNS)}) " + _SOURCE_SQL)
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    return rows
+
+
+def _key(row):
+    return row["airline_name"].lower(), row["flight_number"].lower()
+
+
+def check_flight_search():
+    """Return [(airline, flight_number, [differing columns])] where flight_search disagrees with the base tables."""
+    expected = {_key(r): r for r in query_all(_SOURCE_SQL)}
+    actual = {_key(r): r for r in query_all(f"SELECT {', '.join(COLUMNS)} FROM flight_search")}
+    problems = []
+    for key, row in expected.items():
+        got = actual.pop(key, None)
+        if got is None:
+            problems.append((row["airline_name"], row["flight_number"], ["missing"]))
+            continue
+        diff = [c for c in COLUMNS[2:] if got[c] != row[c]]
+        if diff:
+            problems.append((row["airline_name"], row["flight_number"], diff))
+    for row in actual.values():
+        problems.append((row["airline_name"], row["flight_number"], ["orphan"]))
+    return problems
+
+
+@click.command("search-rebuild")
+def search_rebuild_command():
+    """Rebuild the flight_search read model from flight / airport / airplane / ticket."""
+    click.echo(f"flight_search: {rebuild_flight_search()} rows")
+
+
+@click.command("search-check")
+@click.option("--show", default=20, show_default=True, help="Number of mismatched flights to list.")
+def search_check_command(show):
+    """Compare flight_search with the base tables; exits 1 on drift."""
+    problems = check_flight_search()
+    for airline, number, diff in problems[:show]:
+        click.echo(f"{airline} {number}: {', '.join(diff)}")
+    if problems:
+        click.echo(f"{len(problems)} flight(s) out of sync; run `flask --app app flights search-rebuild`.")
+        raise SystemExit(1)
+    click.echo("flight_search is in sync.")
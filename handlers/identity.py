@@ -0,0 +1,196 @@
+"""
+身份缓存：staff 用户名 -> 航司 + 权限 + 姓名；booking agent 邮箱 -> 可售航司。
+
+热路径零 DB 往返，按顺序查：
+1. 本请求已解析过 (g)；
+2. 进程级 LRU (STAFF_IDENTITY_CACHE_SIZE 条，STAFF_IDENTITY_TTL 秒)；
+3. session 里登录时写入的副本 (airline_name / permissions / identity_at)，
+   未过 TTL 且晚于该用户最近一次 invalidate() 时直接采用并放进 LRU；
+都不命中才查一次库 (staff LEFT JOIN permission)，结果写回 LRU 和 session，
+staff_permission_required 读到的 session 权限也随之刷新。
+
+权限或所属航司变更后调用 invalidate(username)：本进程立即生效，
+其他 worker 进程在 TTL 内生效 (与 search_index 的做法一致)。
+
+agent 的可售航司 (work_with) 只放进程级 LRU (AGENT_AIRLINES_CACHE_SIZE 条，
+AGENT_AIRLINES_TTL 秒)，搜索 / 购票授权直接用它；staff.add_agent 写入
+work_with 后调用 invalidate_agent(email)。
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, has_request_context, session
+
+from .utils import query_all
+
+
+class IdentityCache:
+    """key -> (value, loaded_at) LRU with TTL and per-key invalidation timestamps."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, loaded_at)
+        self._invalidated = {}  # key -> time.time() of the last invalidate(key)
+        self._invalidated_all = 0.0
+
+    def get(self, username, ttl):
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            if entry[1] + ttl <= time.time():
+                del self._entries[username]
+                return None
+            self._entries.move_to_end(username)
+            return entry[0]
+
+    def put(self, username, identity, loaded_at, max_entries=None):
+        max_entries = max_entries or self.max_entries
+        with self._lock:
+            # 加载期间被 invalidate 过，不要放回旧结果
+            if loaded_at < self._invalidated.get(username, self._invalidated_all):
+                return
+            self._entries[username] = (identity, loaded_at)
+            self._entries.move_to_end(username)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def is_current(self, username, loaded_at, ttl):
+        """Whether a copy loaded at `loaded_at` (e.g. from the session) may still be trusted."""
+        if loaded_at + ttl <= time.time():
+            return False
+        with self._lock:
+            return loaded_at >= self._invalidated.get(username, self._invalidated_all)
+
+    def invalidate(self, username=None):
+        now = time.time()
+        with self._lock:
+            if username is None:
+                self._entries.clear()
+                self._invalidated.clear()
+                self._invalidated_all = now
+            else:
+                self._entries.pop(username, None)
+                self._invalidated[username] = now
+
+
+_cache = IdentityCache()
+_agent_airlines = IdentityCache()
+
+
+def _ttl():
+    return current_app.config.get("STAFF_IDENTITY_TTL", 60)
+
+
+def load_staff(username):
+    """Read one staff member's identity from the DB: dict or None."""
+    rows = query_all(
+        """
+        SELECT s.username, s.first_name, s.last_name, s.airline_name, p.permission_type
+        FROM staff s
+        LEFT JOIN permission p ON p.username = s.username
+        WHERE s.username = %s
+        """,
+        (username,),
+    )
+    if not rows:
+        return None
+    return from_row(rows[0], [r["permission_type"] for r in rows if r["permission_type"]])
+
+
+def from_row(row, permissions):
+    return {
+        "username": row["username"],
+        "first_name": row["first_name"],
+        "last_name": row["last_name"],
+        "airline_name": row["airline_name"],
+        "permissions": list(permissions),
+    }
+
+
+def remember(identity, loaded_at=None):
+    """Store a freshly loaded identity in the LRU and in the session (login, reload)."""
+    loaded_at = loaded_at or time.time()
+    _cache.put(identity["username"], identity, loaded_at, current_app.config.get("STAFF_IDENTITY_CACHE_SIZE"))
+    session["airline_name"] = identity["airline_name"]
+    session["permissions"] = identity["permissions"]
+    session["identity_name"] = [identity["first_name"], identity["last_name"]]
+    session["identity_at"] = loaded_at
+    g.staff_identity = identity
+
+
+def _from_session(username):
+    loaded_at = session.get("identity_at")
+    if loaded_at is None or "airline_name" not in session or not _cache.is_current(username, loaded_at, _ttl()):
+        return None
+    first_name, last_name = session.get("identity_name") or ["", ""]
+    identity = {
+        "username": username,
+        "first_name": first_name,
+        "last_name": last_name,
+        "airline_name": session["airline_name"],
+        "permissions": list(session.get("permissions", [])),
+    }
+    _cache.put(username, identity, loaded_at, current_app.config.get("STAFF_IDENTITY_CACHE_SIZE"))
+    return identity
+
+
+def current_staff():
+    """Identity of the logged-in staff member (dict), or None if not staff / no longer exists."""
+    if "staff_identity" in g:
+        return g.staff_identity
+    username = session.get("user_id")
+    if session.get("user_role") != "staff" or not username:
+        return None
+
+    identity = _cache.get(username, _ttl()) or _from_session(username)
+    if identity is None:
+        loaded_at = time.time()
+        identity = load_staff(username)
+        if identity is None:
+            g.staff_identity = None
+            return None
+        remember(identity, loaded_at)
+        return identity
+
+    # 其他进程刷新过 / LRU 里更新：session 副本跟上，权限装饰器读的是 session
+    if session.get("permissions") != identity["permissions"] or session.get("airline_name") != identity["airline_name"]:
+        session["permissions"] = identity["permissions"]
+        session["airline_name"] = identity["airline_name"]
+    g.staff_identity = identity
+    return identity
+
+
+def invalidate(username=None):
+    """Drop the cached identity of `username` (None = everyone) after a permission / airline change."""
+    _cache.invalidate(username)
+    if has_request_context() and (username is None or session.get("user_id") == username):
+        g.pop("staff_identity", None)
+
+
+# ---------- booking agent ----------
+
+def agent_airlines(email):
+    """Airlines the agent works with (sorted list), from the LRU or one work_with query."""
+    config = current_app.config
+    key = (email or "").lower()  # 邮箱列不区分大小写
+    airlines = _agent_airlines.get(key, config.get("AGENT_AIRLINES_TTL", 60))
+    if airlines is None:
+        loaded_at = time.time()
+        rows = query_all("SELECT airline_name FROM work_with WHERE agent_email=%s", (email,))
+        airlines = sorted(r["airline_name"] for r in rows)
+        _agent_airlines.put(key, airlines, loaded_at, config.get("AGENT_AIRLINES_CACHE_SIZE"))
+    return list(airlines)
+
+
+def agent_can_sell(email, airline_name):
+    """Whether the agent works with airline_name (case-insensitive, like the column collation)."""
+    wanted = (airline_name or "").lower()
+    return any(a.lower() == wanted for a in agent_airlines(email))
+
+
+def invalidate_agent(email=None):
+    """Drop the cached airline set of `email` (None = every agent) after a work_with change."""
+    _agent_airlines.invalidate(email.lower() if email else None)
@@ -0,0 +1,269 @@
+"""
+航班生命周期：状态推进 + 归档。
+
+状态推进 (advance_statuses)：
+- 已起飞未到达、仍是 upcoming / on-time / delayed 的航班 -> in-progress
+- 已到达、仍是 upcoming / on-time / delayed / in-progress 的航班 -> arrived
+cancelled / arrived 不会被改动。按 (status, departure_time) 索引取一批主键，
+再按主键批量 UPDATE，每批一个短事务；UPDATE 时再核对一次状态，
+不会覆盖 staff 在两步之间手工改过的状态。
+
+归档 (archive_flights)：到达 / 取消超过 ARCHIVE_AFTER_DAYS 天的航班，
+连同机票和购买记录，分批搬进 flight_archive / ticket_archive / purchases_archive
+(db_sql/migrations/005_flight_archive.sql)，每批一个事务：先复制再删除。
+flight_search 行随外键级联删除；每日销售汇总表不受影响。
+分析查询、历史列表和导出跨越归档边界时读 sales_history 视图 (reaches_archive 判断)。
+
+每个周期顺带分批清理过期的占座 (seat_holds.sweep)。
+
+由 cron 或常驻进程驱动：
+
+    flask --app app flights lifecycle                  # 推进状态 + 归档，跑一次
+    flask --app app flights lifecycle --no-archive     # 只推进状态
+    flask --app app flights lifecycle --every 60       # 常驻，每 60 秒推进一次，归档按 LIFECYCLE_ARCHIVE_INTERVAL
+"""
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+
+from .utils import get_db, query_all, query_one
+from . import cache, flight_events, search_index, seat_holds
+
+# 起飞前的状态 (大小写不敏感：历史数据里有 'Delayed')
+PENDING_STATUSES = ("upcoming", "on-time", "delayed")
+FINISHED_STATUSES = ("arrived", "cancelled")
+# 超过这个数量就不逐个推送 status 事件
+MAX_EVENTS = 100
+
+_FLIGHT_COLUMNS = (
+    "flight_number", "airline_name", "departure_airport", "arrival_airport", "departure_time", "arrival_time",
+    "price", "status", "airplane_assigned", "remaining_seats",
+)
+_TICKET_COLUMNS = ("ticket_ID", "ticket_price", "ticket_status", "airline_name", "flight_number")
+_PURCHASE_COLUMNS = ("customer_email", "agent_email", "ticket_ID", "purchase_date")
+
+
+def _placeholders(keys):
+    return ", ".join(["(%s, %s)"] * len(keys))
+
+
+def _flat(keys):
+    return [v for key in keys for v in key]
+
+
+def _transition(db, from_statuses, to_status, where, params, batch_size):
+    """Move flights matching `where` from from_statuses to to_status, batch by batch. Returns changed keys."""
+    status_in = ", ".join(["%s"] * len(from_statuses))
+    changed = []
+    while True:
+        keys = [
+            (r["airline_name"], r["flight_number"])
+            for r in query_all(
+                f"SELECT airline_name, flight_number FROM flight WHERE status IN ({status_in}) AND {where} LIMIT %s",
+                (*from_statuses, *params, batch_size),
+            )
+        ]
+        if not keys:
+            return changed
+        db.begin()
+        try:
+            with db.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE flight SET status=%s WHERE status IN ({status_in}) "
+                    f"AND (airline_name, flight_number) IN ({_placeholders(keys)})",
+                    (to_status, *from_statuses, *_flat(keys)),
+                )
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        changed.extend(keys)
+        if len(keys) < batch_size:
+            return changed
+
+
+def advance_statuses(now=None, batch_size=None):
+    """
+    Move departed flights to in-progress and landed flights to arrived.
+    Returns {"in-progress": n, "arrived": n}.
+    """
+    now = now or datetime.now().replace(microsecond=0)
+    batch_size = batch_size or current_app.config.get("LIFECYCLE_BATCH_SIZE", 1000)
+    db = get_db()
+    # departure_time <= now 放在前面让 (status, departure_time) 索引只扫已起飞的部分
+    departed = _transition(db, PENDING_STATUSES, "in-progress",
+                           "departure_time <= %s AND arrival_time > %s", (now, now), batch_size)
+    arrived = _transition(db, PENDING_STATUSES + ("in-progress",), "arrived",
+                          "departure_time <= %s AND arrival_time <= %s", (now, now), batch_size)
+
+    for status, keys in (("in-progress", departed), ("arrived", arrived)):
+        for airline, number in keys:
+            search_index.set_status(airline, number, status)
+    if departed or arrived:
+        cache.active_airports.invalidate()
+    if len(departed) + len(arrived) <= MAX_EVENTS:
+        for airline, number in departed + arrived:
+            flight_events.publish_flight(airline, number, "status")
+    return {"in-progress": len(departed), "arrived": len(arrived)}
+
+
+def archive_flights(now=None, after_days=None, batch_size=None, dry_run=False):
+    """
+    Move flights finished more than `after_days` ago, with their tickets and purchases,
+    into the archive tables. Returns {"flights": n, "tickets": n, "purchases": n}.
+    """
+    now = now or datetime.now().replace(microsecond=0)
+    if after_days is None:
+        after_days = current_app.config.get("ARCHIVE_AFTER_DAYS", 400)
+    batch_size = batch_size or current_app.config.get("LIFECYCLE_BATCH_SIZE", 1000)
+    cutoff = now - timedelta(days=after_days)
+    status_in = ", ".join(["%s"] * len(FINISHED_STATUSES))
+    select_sql = (
+        f"SELECT airline_name, flight_number FROM flight WHERE status IN ({status_in}) "
+        "AND departure_time < %s AND arrival_time < %s LIMIT %s"
+    )
+    counts = {"flights": 0, "tickets": 0, "purchases": 0}
+
+    if dry_run:
+        row = query_one(
+            f"SELECT COUNT(*) AS n FROM flight WHERE status IN ({status_in}) AND departure_time < %s AND arrival_time < %s",
+            (*FINISHED_STATUSES, cutoff, cutoff),
+        )
+        counts["flights"] = row["n"]
+        return counts
+
+    db = get_db()
+    flight_cols, ticket_cols, purchase_cols = (", ".join(c) for c in (_FLIGHT_COLUMNS, _TICKET_COLUMNS, _PURCHASE_COLUMNS))
+    while True:
+        keys = [
+            (r["airline_name"], r["flight_number"])
+            for r in query_all(select_sql, (*FINISHED_STATUSES, cutoff, cutoff, batch_size))
+        ]
+        if not keys:
+            return counts
+        in_keys, key_params = _placeholders(keys), _flat(keys)
+        db.begin()
+        try:
+            with db.cursor() as cursor:
+                counts["purchases"] += cursor.execute(
+                    f"INSERT INTO purchases_archive ({purchase_cols}, archived_at) "
+                    f"SELECT {', '.join('p.' + c for c in _PURCHASE_COLUMNS)}, %s "
+                    "FROM purchases p JOIN ticket t ON p.ticket_ID = t.ticket_ID "
+                    f"WHERE (t.airline_name, t.flight_number) IN ({in_keys})",
+                    (now, *key_params),
+                )
+                counts["tickets"] += cursor.execute(
+                    f"INSERT INTO ticket_archive ({ticket_cols}, departure_time, archived_at) "
+                    f"SELECT {', '.join('t.' + c for c in _TICKET_COLUMNS)}, f.departure_time, %s "
+                    "FROM ticket t JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number "
+                    f"WHERE (t.airline_name, t.flight_number) IN ({in_keys})",
+                    (now, *key_params),
+                )
+                counts["flights"] += cursor.execute(
+                    f"INSERT INTO flight_archive ({flight_cols}, archived_at) "
+                    f"SELECT {flight_cols}, %s FROM flight WHERE (airline_name, flight_number) IN ({in_keys})",
+                    (now, *key_params),
+                )
+                cursor.execute(
+                    "DELETE FROM purchases WHERE ticket_ID IN ("
+                    f"SELECT ticket_ID FROM ticket WHERE (airline_name, flight_number) IN ({in_keys}))",
+                    key_params,
+                )
+                cursor.execute(f"DELETE FROM ticket WHERE (airline_name, flight_number) IN ({in_keys})", key_params)
+                # flight_search 随外键级联删除
+                cursor.execute(f"DELETE FROM flight WHERE (airline_name, flight_number) IN ({in_keys})", key_params)
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        if len(keys) < batch_size:
+            return counts
+
+
+# 历史列表 / 导出跨越归档边界时的数据源 (db_sql/migrations/007_sales_history_flight_columns.sql)：
+# 列名与在线查询的结果行一致，城市名按机场现查 (flight_search 只有在线航班)
+HISTORY_SELECT = """
+    SELECT s.ticket_ID, s.purchase_date, s.customer_email, s.agent_email, s.airline_name, s.flight_number,
+           s.departure_airport, s.arrival_airport, s.departure_time, s.arrival_time, s.price, s.status,
+           da.city AS dep_city, aa.city AS arr_city
+    FROM sales_history s
+    LEFT JOIN airport da ON da.name = s.departure_airport
+    LEFT JOIN airport aa ON aa.name = s.arrival_airport
+"""
+
+
+def reaches_archive(since, departures=False):
+    """
+    True when a purchase_date range starting at `since` (date / datetime / 'YYYY-MM-DD', None = all time)
+    may include archived purchases, i.e. the query has to read sales_history.
+    departures=True: `since` bounds departure_time instead of purchase_date.
+    """
+    if departures:
+        row = query_one("SELECT MAX(departure_time) AS last FROM flight_archive")
+    else:
+        row = query_one("SELECT MAX(purchase_date) AS last FROM purchases_archive")
+    last = row["last"] if row else None
+    if last is None:
+        return False
+    if not since:
+        return True
+    if isinstance(since, str):
+        try:
+            since = datetime.strptime(since[:10], "%Y-%m-%d")
+        except ValueError:
+            return False
+    elif not isinstance(since, datetime):
+        since = datetime(since.year, since.month, since.day)
+    return since <= last
+
+
+def run_once(archive=True, now=None):
+    """One scheduler tick: advance statuses, sweep expired seat holds, then (optionally) archive."""
+    report = advance_statuses(now)
+    report["holds_expired"] = seat_holds.sweep(now)
+    if archive:
+        report.update(archive_flights(now))
+    return report
+
+
+# ---------- CLI ----------
+
+def _format(report):
+    return " ".join(f"{k}={v}" for k, v in report.items())
+
+
+@click.command("lifecycle")
+@click.option("--archive/--no-archive", default=True, show_default=True,
+              help="Also move long-finished flights into the archive tables.")
+@click.option("--every", type=float, default=None,
+              help="Keep running, advancing statuses every N seconds (archive every LIFECYCLE_ARCHIVE_INTERVAL).")
+@click.option("--dry-run", is_flag=True, help="Only count the flights that would be archived.")
+def lifecycle_command(archive, every, dry_run):
+    """Advance flight statuses as departure / arrival times pass and archive finished flights."""
+    if dry_run:
+        click.echo(f"would archive: {_format(archive_flights(dry_run=True))}")
+        return
+    if every is None:
+        click.echo(_format(run_once(archive)))
+        return
+
+    app = current_app._get_current_object()
+    archive_interval = app.config.get("LIFECYCLE_ARCHIVE_INTERVAL", 3600)
+    next_archive = 0.0
+    while True:
+        started = time.monotonic()
+        do_archive = archive and started >= next_archive
+        try:
+            # 每个周期一个新的 app context：连接用完归还连接池，断线后下个周期重新取
+            with app.app_context():
+                report = run_once(do_archive)
+            if do_archive:
+                next_archive = started + archive_interval
+            if any(report.values()):
+                click.echo(f"{datetime.now():%Y-%m-%d %H:%M:%S} {_format(report)}")
+        except Exception as e:
+            # 数据库暂时不可用等：记一笔，下个周期再试
+            click.echo(f"{datetime.now():%Y-%m-%d %H:%M:%S} lifecycle error: {e}", err=True)
+        time.sleep(max(0.0, every - (time.monotonic() - started)))
@@ -0,0 +1,330 @@
+"""
+请求 / SQL 指标，Prometheus 文本格式输出到 /metrics。
+
+- 每个 endpoint 的请求耗时直方图、按状态码计数
+- 每个请求的 SQL 条数 / SQL 总耗时直方图，以及 SQL 返回 (影响) 行数
+- 慢 SQL 样本：规范化后的语句 (字面量 -> ?)，次数 / 总耗时 / 最大耗时
+- 连接池、SSE 订阅数
+
+SQL 计时在游标层完成 (InstrumentedCursor 作为连接的 cursorclass)，所以
+query_one / query_all / execute_sql 以及直接用 cursor 的事务代码都会被统计。
+单条 SQL 只累加到 flask.g；请求结束时加锁一次合并进全局统计，
+没有请求时不做任何事，/metrics 被抓取时才渲染。
+"""
+import hashlib
+import re
+import threading
+import time
+
+import pymysql.cursors
+from flask import Response, current_app, g, has_app_context, has_request_context, request
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SLOW_SAMPLE_LIMIT = 50
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+# ---------- SQL 规范化 ----------
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_RE = re.compile(r"(VALUES\s*\(\.\.\.\))(?:\s*,\s*\((?:[^()]|\([^()]*\))*\))+", re.I)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(sql, max_length=4000):
+    """
+    Collapse a statement to its shape: literals and placeholders -> ?,
+    IN lists / multi-row VALUES -> (...), whitespace squeezed.
+    """
+    if isinstance(sql, (bytes, bytearray)):
+        sql = bytes(sql[:max_length]).decode("utf-8", "replace")
+    sql = sql[:max_length]
+    sql = _COMMENT_RE.sub(" ", sql)
+    sql = _STRING_RE.sub("?", sql)
+    sql = _PLACEHOLDER_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(...)", sql)
+    sql = _VALUES_RE.sub(r"\1", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+# ---------- 采集 ----------
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.request_latency = {}     # (endpoint, method) -> Histogram
+        self.requests = {}            # (endpoint, method, status) -> n
+        self.request_queries = {}     # endpoint -> Histogram (SQL statements per request)
+        self.request_sql_time = {}    # endpoint -> Histogram (SQL seconds per request)
+        self.sql_queries = {}         # endpoint -> n
+        self.sql_seconds = {}         # endpoint -> seconds
+        self.sql_rows = {}            # endpoint -> rows returned / affected
+        self.sql_errors = {}          # endpoint -> n
+        self.slow = {}                # fingerprint -> {sql, count, seconds, max}
+
+    def observe_request(self, endpoint, method, status, seconds, stats):
+        count, sql_time, rows, errors = stats
+        with self.lock:
+            key = (endpoint, method)
+            if key not in self.request_latency:
+                self.request_latency[key] = Histogram(LATENCY_BUCKETS)
+            if endpoint not in self.request_queries:
+                self.request_queries[endpoint] = Histogram(QUERY_COUNT_BUCKETS)
+                self.request_sql_time[endpoint] = Histogram(LATENCY_BUCKETS)
+            self.request_latency[key].observe(seconds)
+            self.request_queries[endpoint].observe(count)
+            self.request_sql_time[endpoint].observe(sql_time)
+            rkey = (endpoint, method, str(status))
+            self.requests[rkey] = self.requests.get(rkey, 0) + 1
+            self._add_sql(endpoint, count, sql_time, rows, errors)
+
+    def observe_queries(self, endpoint, stats):
+        """SQL issued outside a request (CLI, background work)."""
+        with self.lock:
+            self._add_sql(endpoint, *stats)
+
+    def _add_sql(self, endpoint, count, sql_time, rows, errors):
+        self.sql_queries[endpoint] = self.sql_queries.get(endpoint, 0) + count
+        self.sql_seconds[endpoint] = self.sql_seconds.get(endpoint, 0.0) + sql_time
+        self.sql_rows[endpoint] = self.sql_rows.get(endpoint, 0) + rows
+        if errors:
+            self.sql_errors[endpoint] = self.sql_errors.get(endpoint, 0) + errors
+
+    def observe_slow(self, sql, seconds):
+        normalized = normalize_sql(sql)
+        fp = fingerprint(normalized)
+        with self.lock:
+            sample = self.slow.get(fp)
+            if sample is None:
+                if len(self.slow) >= SLOW_SAMPLE_LIMIT:
+                    # 满了就挤掉总耗时最少的那条
+                    victim = min(self.slow, key=lambda k: self.slow[k]["seconds"])
+                    if self.slow[victim]["seconds"] >= seconds:
+                        return
+                    del self.slow[victim]
+                sample = self.slow[fp] = {"sql": normalized, "count": 0, "seconds": 0.0, "max": 0.0}
+            sample["count"] += 1
+            sample["seconds"] += seconds
+            sample["max"] = max(sample["max"], seconds)
+
+
+registry = Registry()
+_slow_hooks = []
+
+
+def record_query(sql, seconds, rows, error=False, args=None, connection=None):
+    """
+    Called by the instrumented cursors for every statement.
+    connection: the (idle) connection that ran it, None for unbuffered cursors.
+    """
+    if has_request_context():
+        stats = g.get("_sql_stats")
+        if stats is None:
+            stats = g._sql_stats = [0, 0.0, 0, 0]
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] += rows
+        stats[3] += 1 if error else 0
+    else:
+        # CLI / 基准脚本等没有请求的场景，直接记到 endpoint="-"
+        registry.observe_queries("-", (1, seconds, rows, 1 if error else 0))
+
+    threshold = (current_app.config.get("SLOW_QUERY_MS", 200) if has_app_context() else 200) / 1000.0
+    if seconds >= threshold:
+        registry.observe_slow(sql, seconds)
+        for hook in _slow_hooks:
+            hook(sql, args, seconds, connection)
+
+
+def on_slow_query(hook):
+    """
+    Register hook(sql, args, seconds, connection), called for statements
+    slower than SLOW_QUERY_MS (connection is None when it is still busy).
+    """
+    _slow_hooks.append(hook)
+    return hook
+
+
+class _Timed:
+    # False for unbuffered cursors: row count unknown and the connection is busy
+    _count_rows = True
+
+    def execute(self, query, args=None):
+        t0 = time.perf_counter()
+        try:
+            result = super().execute(query, args)
+        except Exception:
+            record_query(query, time.perf_counter() - t0, 0, error=True, args=args)
+            raise
+        elapsed = time.perf_counter() - t0
+        if self._count_rows:
+            rows = self.rowcount if self.rowcount and self.rowcount > 0 else 0
+            record_query(query, elapsed, rows, args=args, connection=self.connection)
+        else:
+            # 结果集还在连接上没读完，不能在这条连接上再执行别的语句
+            record_query(query, elapsed, 0, args=args)
+        return result
+
+
+class InstrumentedCursor(_Timed, pymysql.cursors.DictCursor):
+    pass
+
+
+class InstrumentedSSCursor(_Timed, pymysql.cursors.SSDictCursor):
+    _count_rows = False
+
+
+# ---------- 输出 ----------
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _histogram_lines(name, hist, **labels):
+    lines, cumulative = [], 0
+    for bound, n in zip(list(hist.buckets) + ["+Inf"], hist.counts):
+        cumulative += n
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+    lines.append(f"{name}_sum{_labels(**labels)} {hist.sum:.6f}")
+    lines.append(f"{name}_count{_labels(**labels)} {hist.count}")
+    return lines
+
+
+def render():
+    out = []
+
+    def header(name, kind, help_text):
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {kind}")
+
+    r = registry
+    with r.lock:
+        header("http_request_duration_seconds", "histogram", "Request latency by endpoint (until the response is returned).")
+        for (endpoint, method), hist in sorted(r.request_latency.items()):
+            out.extend(_histogram_lines("http_request_duration_seconds", hist, endpoint=endpoint, method=method))
+        header("http_requests_total", "counter", "Requests by endpoint, method and status.")
+        for (endpoint, method, status), n in sorted(r.requests.items()):
+            out.append(f"http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {n}")
+        header("http_request_sql_queries", "histogram", "SQL statements issued per request.")
+        for endpoint, hist in sorted(r.request_queries.items()):
+            out.extend(_histogram_lines("http_request_sql_queries", hist, endpoint=endpoint))
+        header("http_request_sql_seconds", "histogram", "Total SQL time per request.")
+        for endpoint, hist in sorted(r.request_sql_time.items()):
+            out.extend(_histogram_lines("http_request_sql_seconds", hist, endpoint=endpoint))
+        for name, data, help_text in (
+            ("sql_queries_total", r.sql_queries, "SQL statements executed."),
+            ("sql_seconds_total", r.sql_seconds, "Time spent executing SQL."),
+            ("sql_rows_total", r.sql_rows, "Rows returned or affected by SQL statements."),
+            ("sql_errors_total", r.sql_errors, "SQL statements that raised."),
+        ):
+            header(name, "counter", help_text)
+            for endpoint, value in sorted(data.items()):
+                out.append(f"{name}{_labels(endpoint=endpoint)} {value}")
+        slow = sorted(r.slow.items(), key=lambda kv: -kv[1]["seconds"])
+        header("sql_slow_queries_total", "counter", "Statements slower than SLOW_QUERY_MS, by normalized SQL.")
+        for fp, s in slow:
+            out.append(f"sql_slow_queries_total{_labels(fingerprint=fp, sql=s['sql'][:300])} {s['count']}")
+        header("sql_slow_query_seconds_total", "counter", "Total time of slow statements, by normalized SQL.")
+        for fp, s in slow:
+            out.append(f"sql_slow_query_seconds_total{_labels(fingerprint=fp)} {s['seconds']:.6f}")
+        header("sql_slow_query_seconds_max", "gauge", "Slowest observed execution, by normalized SQL.")
+        for fp, s in slow:
+            out.append(f"sql_slow_query_seconds_max{_labels(fingerprint=fp)} {s['max']:.6f}")
+
+    pool = current_app.extensions.get("db_pool")
+    if pool is not None:
+        stats = pool.stats()
+        for key, name, kind, help_text in (
+            ("max_size", "db_pool_max_size", "gauge", "Maximum connections in the pool."),
+            ("in_use", "db_pool_in_use", "gauge", "Connections currently borrowed."),
+            ("idle", "db_pool_idle", "gauge", "Idle connections kept open."),
+            ("created", "db_pool_created_total", "counter", "Connections opened."),
+            ("destroyed", "db_pool_destroyed_total", "counter", "Connections closed (expired, broken, discarded)."),
+            ("borrowed", "db_pool_borrowed_total", "counter", "Successful acquires."),
+            ("timeouts", "db_pool_timeouts_total", "counter", "Acquires that gave up waiting (503)."),
+            ("wait_count", "db_pool_waits_total", "counter", "Acquires that had to wait for a free connection."),
+            ("wait_time_total", "db_pool_wait_seconds_total", "counter", "Time spent waiting for a connection."),
+            ("wait_time_max", "db_pool_wait_seconds_max", "gauge", "Longest wait for a connection."),
+        ):
+            header(name, kind, help_text)
+            out.append(f"{name} {stats[key]}")
+
+    hasher = current_app.extensions.get("password_hasher")
+    if hasher is not None:
+        stats = hasher.stats()
+        for key, name, kind, help_text in (
+            ("workers", "password_hash_workers", "gauge", "Password hashing processes (0 = inline)."),
+            ("in_flight", "password_hash_in_flight", "gauge", "Password jobs running or queued."),
+            ("completed", "password_hash_completed_total", "counter", "Password jobs finished."),
+            ("rejected", "password_hash_rejected_total", "counter", "Password jobs refused, pool saturated (503)."),
+            ("timeouts", "password_hash_timeouts_total", "counter", "Password jobs abandoned after the timeout (503)."),
+        ):
+            header(name, kind, help_text)
+            out.append(f"{name} {stats[key]}")
+
+    from .flight_events import broker
+    events = broker.stats()
+    header("sse_subscribers", "gauge", "Open flight status streams.")
+    out.append(f"sse_subscribers {events['subscribers']}")
+    header("sse_events_published_total", "counter", "Flight status events published.")
+    out.append(f"sse_events_published_total {events['published']}")
+
+    return "\n".join(out) + "\n"
+
+
+def init_metrics(app):
+    @app.before_request
+    def _start_timer():
+        g._request_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop("_request_started", None)
+        if started is not None:
+            stats = g.pop("_sql_stats", None) or (0, 0.0, 0, 0)
+            registry.observe_request(
+                request.endpoint or "unmatched", request.method, response.status_code,
+                time.perf_counter() - started, tuple(stats),
+            )
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        token = app.config.get("METRICS_TOKEN")
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            return "Unauthorized", 401
+        return Response(render(), mimetype="text/plain; version=0.0.4")
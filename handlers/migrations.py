@@ -0,0 +1,135 @@
+"""
+版本化的数据库迁移。
+
+db_sql/migrations/NNN_name.sql 按编号顺序执行，已执行的版本记录在
+schema_migrations 表中，重复运行只会执行新的文件：
+
+    flask --app app db migrate
+    flask --app app db status
+
+SQLite 后端 (DB_BACKEND=sqlite) 优先执行 db_sql/migrations/sqlite/ 下同名的移植版本
+(触发器等无法自动改写的语句)，没有移植版本的直接执行原文件。
+
+同一命令组下还有 db explain-check (query_plans.py) 和 db slow-queries (slow_log.py)。
+"""
+import os
+import re
+
+import click
+from flask.cli import AppGroup
+
+from .utils import get_backend, get_db, query_all
+from .query_plans import explain_check_command
+from .slow_log import slow_queries_command
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db_sql", "migrations")
+
+_FILE_RE = re.compile(r"^(\d+)_([\w\-]+)\.sql$")
+
+
+def list_migrations(directory=MIGRATIONS_DIR):
+    """Return [(version, name, path)] sorted by version."""
+    found = []
+    for filename in os.listdir(directory):
+        m = _FILE_RE.match(filename)
+        if m:
+            found.append((int(m.group(1)), m.group(2), os.path.join(directory, filename)))
+    return sorted(found)
+
+
+def split_sql_script(text):
+    """
+    Split a .sql script into statements, honouring `DELIMITER $$` blocks
+    (used for triggers) and skipping `--` comment lines.
+    """
+    statements, buf = [], []
+    delimiter = ";"
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.upper().startswith("DELIMITER "):
+            delimiter = stripped.split(None, 1)[1]
+            continue
+        if not buf and (not stripped or stripped.startswith("--")):
+            continue
+        buf.append(line)
+        if stripped.endswith(delimiter):
+            statement = "\n".join(buf).rstrip()[: -len(delimiter)].strip()
+            if statement:
+                statements.append(statement)
+            buf = []
+    tail = "\n".join(buf).strip()
+    if tail:
+        statements.append(tail)
+    return statements
+
+
+def _ensure_table():
+    with get_db().cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations(
+                version int,
+                name    varchar(100) NOT NULL,
+                applied_at  datetime NOT NULL,
+                primary key(version)
+            )
+            """
+        )
+
+
+def applied_versions():
+    _ensure_table()
+    return {r["version"] for r in query_all("SELECT version FROM schema_migrations")}
+
+
+def _script_path(path):
+    if get_backend().name != "mysql":
+        ported = os.path.join(os.path.dirname(path), get_backend().name, os.path.basename(path))
+        if os.path.exists(ported):
+            return ported
+    return path
+
+
+def migrate(directory=MIGRATIONS_DIR, echo=print):
+    """Apply every pending migration in order. Returns the versions applied."""
+    done = applied_versions()
+    applied = []
+    db = get_db()
+    for version, name, path in list_migrations(directory):
+        if version in done:
+            continue
+        with open(_script_path(path), encoding="utf-8") as f:
+            statements = split_sql_script(f.read())
+        echo(f"applying {version:03d}_{name} ({len(statements)} statements)")
+        with db.cursor() as cursor:
+            # MySQL 的 DDL 会隐式提交，无法整体回滚；失败时停下，修复后重跑即可
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (%s, %s, NOW())",
+                (version, name),
+            )
+        applied.append(version)
+    return applied
+
+
+db_cli = AppGroup("db", help="Database schema migrations and checks.")
+
+
+@db_cli.command("migrate")
+def migrate_command():
+    """Apply pending migrations from db_sql/migrations."""
+    applied = migrate(echo=click.echo)
+    click.echo(f"{len(applied)} migration(s) applied." if applied else "Database is up to date.")
+
+
+@db_cli.command("status")
+def status_command():
+    """List migrations and whether they have been applied."""
+    done = applied_versions()
+    for version, name, _ in list_migrations():
+        click.echo(f"[{'x' if version in done else ' '}] {version:03d}_{name}")
+
+
+db_cli.add_command(explain_check_command)
+db_cli.add_command(slow_queries_command)
@@ -0,0 +1,111 @@
+"""
+Keyset（游标）分页。
+
+列表按一组唯一的排序键倒序输出，例如 (purchase_date, ticket_ID)。
+下一页不用 OFFSET，而是带上上一页最后一行的键值作为条件：
+
+    purchase_date < x OR (purchase_date = x AND ticket_ID < y)
+
+配合 (…, purchase_date, ticket_ID) 索引，每页的代价与翻到第几页无关。
+游标是键值的 base64url(JSON)，对客户端不透明；JSON 接口通过
+X-Next-Cursor 响应头返回，页面通过 ?cursor= 链接实现 "Load more"。
+"""
+import base64
+import json
+
+from .utils import plain_value
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def page_size(raw, default=DEFAULT_PAGE_SIZE):
+    """Parse a ?limit= value, clamped to [1, MAX_PAGE_SIZE]."""
+    try:
+        n = int(raw)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(n, MAX_PAGE_SIZE))
+
+
+def encode_cursor(values):
+    raw = json.dumps([plain_value(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token, width):
+    """Return the list of key values in `token`; raises InvalidCursor."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != width:
+        raise InvalidCursor("Invalid cursor.")
+    # 键值原样作为绑定参数进 SQL：只接受标量 (排序键列都是 NOT NULL，null 也不收)
+    if any(isinstance(v, bool) or not isinstance(v, (str, int, float)) for v in values):
+        raise InvalidCursor("Invalid cursor.")
+    return values
+
+
+class Keyset:
+    """
+    columns: SQL expressions of the sort key, most significant first
+             (the last one must make the key unique).
+    fields:  the matching keys in the result rows.
+    """
+
+    def __init__(self, columns, fields, descending=True):
+        self.columns = tuple(columns)
+        self.fields = tuple(fields)
+        self.op = "<" if descending else ">"
+        self.direction = "DESC" if descending else "ASC"
+
+    def where(self, token):
+        """(condition, params) selecting rows after the cursor, or (None, [])."""
+        if not token:
+            return None, []
+        values = decode_cursor(token, len(self.columns))
+        # (a, b) < (x, y) 展开成 a < x OR (a = x AND b < y)，优化器能用上范围扫描
+        ors, params = [], []
+        for i, column in enumerate(self.columns):
+            ands = [f"{c} = %s" for c in self.columns[:i]] + [f"{column} {self.op} %s"]
+            ors.append("(" + " AND ".join(ands) + ")")
+            params.extend(values[: i + 1])
+        return "(" + " OR ".join(ors) + ")", params
+
+    def over(self, alias):
+        """The same key read from a single table / view aliased `alias` (e.g. sales_history s)."""
+        return Keyset([f"{alias}.{c.rsplit('.', 1)[-1]}" for c in self.columns], self.fields, self.op == "<")
+
+    def order_by(self):
+        return " ORDER BY " + ", ".join(f"{c} {self.direction}" for c in self.columns)
+
+    def order_limit(self, size):
+        """ORDER BY … LIMIT size+1 — the extra row tells whether a next page exists."""
+        return f"{self.order_by()} LIMIT {int(size) + 1}"
+
+    def page(self, rows, size):
+        """Trim the look-ahead row; return (rows, next_cursor or None)."""
+        if len(rows) <= size:
+            return rows, None
+        rows = rows[:size]
+        return rows, encode_cursor([rows[-1][f] for f in self.fields])
+
+
+# 常用排序键
+PURCHASES = Keyset(("p.purchase_date", "p.ticket_ID"), ("purchase_date", "ticket_ID"))
+TICKETS_BY_DEPARTURE = Keyset(("f.departure_time", "t.ticket_ID"), ("departure_time", "ticket_ID"))
+FLIGHTS_BY_DEPARTURE = Keyset(("f.departure_time", "f.flight_number"), ("departure_time", "flight_number"))
+TICKETS = Keyset(("t.ticket_ID",), ("ticket_ID",), descending=False)
+
+
+def next_page_headers(response, next_cursor):
+    """Expose the cursor of a JSON list response in X-Next-Cursor."""
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
@@ -0,0 +1,175 @@
+"""
+密码哈希 / 校验放到有界进程池里做。
+
+pbkdf2 每次要几百毫秒 CPU，放在请求线程里做的话，开售时的一波登录会把
+每个 worker 的 CPU 占满，搜索请求跟着排队。这里改成：
+
+- PASSWORD_HASH_WORKERS 个子进程 (ProcessPoolExecutor，spawn 启动) 专门算哈希，
+  请求线程只等结果，CPU 占用有上限；0 = 在请求线程里直接算 (旧行为)；
+- 同时在途 (执行中 + 排队) 的任务不超过 PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE，
+  超出立即抛 HashPoolBusyError，等待结果超过 PASSWORD_HASH_TIMEOUT 秒也一样，
+  由 init_passwords 注册的 errorhandler 返回 503 + Retry-After；
+- 新哈希统一用 PASSWORD_HASH_METHOD；登录校验通过而存量哈希的参数与之不同时，
+  同一个任务里顺带算出新哈希，auth.login 写回对应的表 (透明升级)。
+  PASSWORD_HASH_METHOD 要写全参数 (如 pbkdf2:sha256:200000)，按字符串比较。
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = "pbkdf2:sha256:200000"
+
+
+class HashPoolBusyError(RuntimeError):
+    """Raised when the hashing pool is saturated or a job did not finish within the timeout."""
+
+
+# ---------- 子进程里执行的函数 (必须是模块级，可 pickle) ----------
+
+def needs_rehash(pwhash, method):
+    """Whether a stored hash was made with other parameters than `method`."""
+    return pwhash.split("$", 1)[0] != method
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(pwhash, password, method):
+    """(ok, new_hash): new_hash is set only when ok and the stored parameters are outdated."""
+    if not check_password_hash(pwhash, password):
+        return False, None
+    if needs_rehash(pwhash, method):
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+# ---------- 进程池 ----------
+
+class PasswordHasher:
+    """Bounded process pool for password jobs; workers=0 runs them inline."""
+
+    def __init__(self, workers=2, queue_limit=16, timeout=10.0, method=DEFAULT_METHOD):
+        self.workers = max(0, int(workers))
+        self.queue_limit = max(0, int(queue_limit))
+        self.timeout = float(timeout)
+        self.method = method
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._in_flight = 0
+
+        self._completed = 0
+        self._rejected = 0
+        self._timeouts = 0
+
+    def _pool(self):
+        with self._lock:
+            # fork 出来的 worker (gunicorn --preload 等) 不能用父进程的池
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _done(self, future):
+        with self._lock:
+            self._in_flight -= 1
+            if not future.cancelled():
+                self._completed += 1
+
+    def run(self, fn, *args):
+        if self.workers == 0:
+            result = fn(*args)
+            with self._lock:
+                self._completed += 1
+            return result
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_limit:
+                self._rejected += 1
+                raise HashPoolBusyError(f"{self._in_flight} password jobs in flight")
+            self._in_flight += 1
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException as e:
+            with self._lock:
+                self._in_flight -= 1
+                if isinstance(e, BrokenProcessPool):
+                    self._executor = None
+            raise
+        # 名额在任务真正结束时归还：超时放弃等待的任务仍占着子进程
+        future.add_done_callback(self._done)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self._timeouts += 1
+            raise HashPoolBusyError(f"password job did not finish within {self.timeout}s")
+        except BrokenProcessPool:
+            # 子进程被杀 (OOM 等)：丢掉这个池，下次重建
+            with self._lock:
+                self._executor = None
+            raise
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timeouts": self._timeouts,
+            }
+
+
+def _hasher():
+    return current_app.extensions["password_hasher"]
+
+
+def hash_password(password):
+    """Hash a new password with PASSWORD_HASH_METHOD on the pool."""
+    hasher = _hasher()
+    return hasher.run(_hash, password, hasher.method)
+
+
+def verify_password(pwhash, password):
+    """
+    Check a password against its stored hash on the pool.
+    Returns (ok, new_hash); new_hash is not None when the caller should store it (parameters changed).
+    """
+    hasher = _hasher()
+    return hasher.run(_verify, pwhash, password, hasher.method)
+
+
+def init_passwords(app):
+    hasher = PasswordHasher(
+        workers=app.config.get("PASSWORD_HASH_WORKERS", 2),
+        queue_limit=app.config.get("PASSWORD_HASH_QUEUE", 16),
+        timeout=app.config.get("PASSWORD_HASH_TIMEOUT", 10),
+        method=app.config.get("PASSWORD_HASH_METHOD", DEFAULT_METHOD),
+    )
+    app.extensions["password_hasher"] = hasher
+    atexit.register(hasher.shutdown)
+
+    @app.errorhandler(HashPoolBusyError)
+    def handle_hash_pool_busy(e):
+        print(f"Password hashing pool busy: {e}")
+        return "Service is busy, please retry shortly.", 503, {
+            "Retry-After": str(app.config.get("PASSWORD_HASH_RETRY_AFTER", 2))
+        }
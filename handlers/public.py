@@ -1,5 +1,7 @@
 from flask import Blueprint, render_template, request, current_app, jsonify, flash
-from .utils import query_all, query_one
+from .utils import query_all, query_one, date_range
+from . import cache, flight_events, search_index, seat_holds
+from .cache import cached_json_response
 import pymysql
 
 public_bp = Blueprint("public", __name__)
@@ -23,31 +25,32 @@ def status_page():
 @public_bp.route("/api/get_airports")
 def get_airports():
     """Return distinct origins and destinations with city names based on UPCOMING flights."""
-    try:
+    def load():
         # Get distinct departure airports ONLY from upcoming flights
         sql_origins = """
-            SELECT DISTINCT f.departure_airport AS code, a.city
-            FROM flight f
-            JOIN airport a ON f.departure_airport = a.name
+            SELECT DISTINCT f.departure_airport AS code, f.dep_city AS city
+            FROM flight_search f
             WHERE f.status = 'upcoming' AND f.departure_time > NOW()
-            ORDER BY a.city
+            ORDER BY f.dep_city
         """
         origins = query_all(sql_origins)
 
         # Get distinct arrival airports ONLY from upcoming flights
         sql_dests = """
-            SELECT DISTINCT f.arrival_airport AS code, a.city
-            FROM flight f
-            JOIN airport a ON f.arrival_airport = a.name
+            SELECT DISTINCT f.arrival_airport AS code, f.arr_city AS city
+            FROM flight_search f
             WHERE f.status = 'upcoming' AND f.departure_time > NOW()
-            ORDER BY a.city
+            ORDER BY f.arr_city
         """
         dests = query_all(sql_dests)
 
-        return jsonify({
+        return {
             "origins": origins,
             "destinations": dests
-        })
+        }
+
+    try:
+        return cached_json_response(cache.active_airports, ("public",), load, public=True)
     except Exception as e:
         print(f"Error fetching airports: {e}")
         return jsonify({"origins": [], "destinations": []})
@@ -55,36 +58,22 @@ def get_airports():
 
 @public_bp.route("/api/live_search")
 def live_search():
-    """Search flights dynamically using query_all."""
+    """Search upcoming flights from the in-memory search index."""
     origin = request.args.get("origin", "").strip()
     destination = request.args.get("destination", "").strip()
     date = request.args.get("date", "").strip()
 
-    # Base query: Join with airport table to allow searching by City Name as well as Airport Code
-    query = """
-        SELECT f.*, da.city AS dep_city, aa.city AS arr_city
-        FROM flight f
-        JOIN airport da ON f.departure_airport = da.name
-        JOIN airport aa ON f.arrival_airport = aa.name
-        WHERE f.status = 'upcoming' AND f.departure_time > NOW()
-    """
-    params = []
-
-    if origin:
-        query += " AND (f.departure_airport LIKE %s OR da.city LIKE %s OR da.city IN (SELECT ca.city_name FROM city_alias ca WHERE ca.alias_name = %s))"
-        params.extend([f"%{origin}%", f"%{origin}%", origin])
-    if destination:
-        query += " AND (f.arrival_airport LIKE %s OR aa.city LIKE %s OR aa.city IN (SELECT ca.city_name FROM city_alias ca WHERE ca.alias_name = %s))"
-        params.extend([f"%{destination}%", f"%{destination}%", destination])
-    if date:
-        query += " AND DATE(f.departure_time) = %s"
-        params.append(date)
-    
-    query += " ORDER BY f.departure_time ASC LIMIT 50"
+    day = search_index.parse_date(date)
+    if date and day is None:
+        return jsonify([])
 
     try:
-        flights = query_all(query, tuple(params))
-        
+        flights = search_index.search(
+            origin, destination, day, statuses=["upcoming"], limit=50
+        )
+        # 结账中的占座不算余座 (匿名访问，没有本人的占座)
+        seat_holds.apply_to(flights)
+
         # Convert datetime objects to string for JSON serialization
         for f in flights:
             if f.get('departure_time'):
@@ -112,10 +101,8 @@ def check_status_api():
 
     # Base query for active flights
     sql = """
-        SELECT f.*, da.city AS dep_city, aa.city AS arr_city
-        FROM flight f
-        JOIN airport da ON f.departure_airport = da.name
-        JOIN airport aa ON f.arrival_airport = aa.name
+        SELECT f.*
+        FROM flight_search f
         WHERE f.status IN ('in-progress', 'delayed', 'upcoming')
     """
     params = []
@@ -129,8 +116,10 @@ def check_status_api():
         params.append(f"%{flight_num}%")
         
     if date:
-        sql += " AND DATE(f.departure_time) = %s"
-        params.append(date)
+        conds, date_params = date_range("f.departure_time", date, date)
+        for cond in conds:
+            sql += " AND " + cond
+        params.extend(date_params)
 
     sql += " ORDER BY f.departure_time DESC LIMIT 20"
 
@@ -144,4 +133,13 @@ def check_status_api():
         return jsonify(flights)
     except Exception as e:
         print(f"Error in status API: {e}")
-        return jsonify([])
\ No newline at end of file
+        return jsonify([])
+
+
+@public_bp.route("/api/status_stream")
+def status_stream():
+    """
+    Server-Sent Events: pushes flight status changes / new flights matching
+    ?airline=&flight_number=&date= instead of re-polling check_status_api.
+    """
+    return flight_events.stream_response()
@@ -0,0 +1,245 @@
+"""
+customer / agent 共用的购票服务。
+
+整个购票在一个事务里完成，条件扣减座位行锁住 flight 行，
+不再先 check_capacity 再分三次 autocommit 写入：
+
+    BEGIN
+    UPDATE flight SET remaining_seats = remaining_seats - 1 WHERE ... AND remaining_seats > <别人的占座数>
+    INSERT INTO ticket (...) SELECT ..., price, ... FROM flight WHERE ...
+    INSERT INTO purchases (...)
+    COMMIT
+
+死锁 / 锁等待超时会整体重试。
+别人未过期的占座 (seat_holds) 不可售；成功后释放下单人 (agent 或 customer) 自己的占座。
+"""
+import time
+
+import pymysql
+
+from .utils import get_db
+from . import search_index, seat_holds
+from .ticket_ids import new_ticket_id, new_ticket_ids
+
+# MySQL: 1213 deadlock, 1205 lock wait timeout, 1062 duplicate key, 1452 FK violation
+_RETRYABLE_ERRORS = (1213, 1205)
+_DUPLICATE_KEY = 1062
+_FK_VIOLATION = 1452
+MAX_ATTEMPTS = 3
+
+
+class PurchaseError(Exception):
+    """Purchase rejected for a reason that can be shown to the user."""
+
+
+def _error_code(exc):
+    return exc.args[0] if exc.args and isinstance(exc.args[0], int) else None
+
+
+def _purchase_once(db, customer_email, airline_name, flight_number, agent_email, held=0):
+    ticket_id = new_ticket_id()
+    db.begin()
+    try:
+        with db.cursor() as cursor:
+            # 条件扣减：拿到 flight 行锁，同时保证不会超卖
+            updated = cursor.execute(
+                """
+                UPDATE flight SET remaining_seats = remaining_seats - 1
+                WHERE airline_name=%s AND flight_number=%s AND remaining_seats > %s
+                """,
+                (airline_name, flight_number, held),
+            )
+            if not updated:
+                cursor.execute(
+                    "SELECT remaining_seats FROM flight WHERE airline_name=%s AND flight_number=%s",
+                    (airline_name, flight_number),
+                )
+                row = cursor.fetchone()
+                if not row:
+                    raise PurchaseError("Flight not found.")
+                if (row["remaining_seats"] or 0) > 0:
+                    raise PurchaseError("All remaining seats are held by other customers checking out. "
+                                        "Please try again in a few minutes.")
+                raise PurchaseError("No available seats.")
+
+            cursor.execute(
+                """
+                INSERT INTO ticket (ticket_ID, ticket_price, ticket_status, airline_name, flight_number)
+                SELECT %s, price, 'Confirmed', airline_name, flight_number
+                FROM flight WHERE airline_name=%s AND flight_number=%s
+                """,
+                (ticket_id, airline_name, flight_number),
+            )
+            cursor.execute(
+                """
+                INSERT INTO purchases (customer_email, agent_email, ticket_ID, purchase_date)
+                VALUES (%s, %s, %s, NOW())
+                """,
+                (customer_email, agent_email, ticket_id),
+            )
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    return ticket_id
+
+
+def _with_retry(fn):
+    """Run fn() (one full transaction); retry on deadlock / lock wait timeout."""
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            return fn()
+        except pymysql.err.IntegrityError as e:
+            if _error_code(e) != _DUPLICATE_KEY or attempt == MAX_ATTEMPTS:
+                raise
+        except pymysql.err.OperationalError as e:
+            if _error_code(e) not in _RETRYABLE_ERRORS or attempt == MAX_ATTEMPTS:
+                raise
+            time.sleep(0.01 * attempt)
+
+
+def purchase_ticket(customer_email, airline_name, flight_number, agent_email=None):
+    """
+    Buy one ticket in a single transaction and return its ticket_ID.
+    Raises PurchaseError for sold-out / unknown flight / unknown customer.
+    """
+    db = get_db()
+    holder = agent_email or customer_email
+    held = seat_holds.held_by_others(airline_name, flight_number, holder)
+    try:
+        ticket_id = _with_retry(
+            lambda: _purchase_once(db, customer_email, airline_name, flight_number, agent_email, held)
+        )
+    except pymysql.err.IntegrityError as e:
+        if _error_code(e) == _FK_VIOLATION:
+            raise PurchaseError(
+                f"Customer '{customer_email}' not found. Please ensure the email is correct."
+            ) from e
+        raise
+
+    search_index.seats_sold(airline_name, flight_number)
+    _release_hold(airline_name, flight_number, holder)
+    return ticket_id
+
+
+def _release_hold(airline_name, flight_number, holder):
+    # 票已售出：占座释放失败也只是等它自然过期
+    try:
+        seat_holds.release(airline_name, flight_number, holder)
+    except Exception as e:
+        print(f"Seat hold release failed for {holder} on {airline_name} {flight_number}: {e}")
+
+
+def _group_once(db, agent_email, flights, customers, held):
+    """
+    One transaction for the whole group: per flight, reserve len(customers)
+    seats with a single conditional decrement (all-or-nothing, seats held by
+    others excluded via held = {flight_key: n}), then insert
+    every ticket and purchase with executemany.
+    Returns {flight_key: [ticket_id, ...] or error message}.
+    """
+    outcome = {}
+    tickets, purchases = [], []
+    db.begin()
+    try:
+        with db.cursor() as cursor:
+            # 固定加锁顺序，避免两个团单互相死锁
+            for airline_name, flight_number in sorted(flights):
+                n = len(customers)
+                reserved = cursor.execute(
+                    """
+                    UPDATE flight SET remaining_seats = remaining_seats - %s
+                    WHERE airline_name=%s AND flight_number=%s AND remaining_seats >= %s
+                    """,
+                    (n, airline_name, flight_number, n + held.get((airline_name, flight_number), 0)),
+                )
+                cursor.execute(
+                    "SELECT price, remaining_seats FROM flight WHERE airline_name=%s AND flight_number=%s",
+                    (airline_name, flight_number),
+                )
+                row = cursor.fetchone()
+                if not row:
+                    outcome[(airline_name, flight_number)] = "Flight not found."
+                    continue
+                if not reserved:
+                    left = max(0, (row["remaining_seats"] or 0) - held.get((airline_name, flight_number), 0))
+                    outcome[(airline_name, flight_number)] = f"Not enough seats: {left} left, {n} requested."
+                    continue
+
+                ids = new_ticket_ids(len(customers))
+                for email, ticket_id in zip(customers, ids):
+                    tickets.append((ticket_id, row["price"], airline_name, flight_number))
+                    purchases.append((email, agent_email, ticket_id))
+                outcome[(airline_name, flight_number)] = ids
+
+            if tickets:
+                cursor.executemany(
+                    """
+                    INSERT INTO ticket (ticket_ID, ticket_price, ticket_status, airline_name, flight_number)
+                    VALUES (%s, %s, 'Confirmed', %s, %s)
+                    """,
+                    tickets,
+                )
+                cursor.executemany(
+                    """
+                    INSERT INTO purchases (customer_email, agent_email, ticket_ID, purchase_date)
+                    VALUES (%s, %s, %s, NOW())
+                    """,
+                    purchases,
+                )
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    return outcome
+
+
+def purchase_group(agent_email, flights, customer_emails):
+    """
+    Book every customer in customer_emails on every flight in flights
+    ([(airline_name, flight_number), ...]) in one transaction.
+
+    Customers are validated with a single query; unknown ones are reported
+    and skipped. Returns one result dict per (passenger, flight):
+    {customer_email, airline_name, flight_number, ok, ticket_ID | error}.
+    """
+    emails = list(dict.fromkeys(e.strip() for e in customer_emails if e and e.strip()))
+    flights = list(dict.fromkeys(flights))
+    db = get_db()
+
+    # customer.email 的比较不区分大小写 (MySQL 默认排序规则 / SQLite NOCASE)：
+    # 按小写对上库里的原值，订票和结果里都用库里的写法
+    stored = {}
+    if emails:
+        with db.cursor() as cursor:
+            cursor.execute(
+                f"SELECT email FROM customer WHERE email IN ({','.join(['%s'] * len(emails))})",
+                emails,
+            )
+            stored = {r["email"].lower(): r["email"] for r in cursor.fetchall()}
+    emails = list(dict.fromkeys(stored.get(e.lower(), e) for e in emails))
+    known = set(stored.values())
+    valid = [e for e in emails if e in known]
+
+    outcome = {}
+    if valid and flights:
+        held = {key: seat_holds.held_by_others(*key, agent_email) for key in flights}
+        outcome = _with_retry(lambda: _group_once(db, agent_email, flights, valid, held))
+
+    results = []
+    for airline_name, flight_number in flights:
+        booked = outcome.get((airline_name, flight_number))
+        if isinstance(booked, list):
+            search_index.seats_sold(airline_name, flight_number, len(booked))
+            _release_hold(airline_name, flight_number, agent_email)
+            booked = dict(zip(valid, booked))
+        for email in emails:
+            result = {"customer_email": email, "airline_name": airline_name, "flight_number": flight_number}
+            if email not in known:
+                result.update(ok=False, error="Customer not found.")
+            elif isinstance(booked, dict):
+                result.update(ok=True, ticket_ID=booked[email])
+            else:
+                result.update(ok=False, error=booked)
+            results.append(result)
+    return results
@@ -0,0 +1,257 @@
+"""
+热点查询的执行计划检查。
+
+对 hot_queries() 中每条语句执行 EXPLAIN，若某张表退化为全表扫描
+(type = ALL) 且估算行数不少于 --min-rows，则报告并以非零状态退出：
+
+    flask --app app db explain-check --min-rows 1000
+
+在小的种子数据上优化器常会直接全表扫描，请在生成的大数据集上运行。
+SQLite 后端用 EXPLAIN QUERY PLAN 检查 (SCAN 且未用索引)，没有行数估算。
+"""
+from datetime import date, timedelta
+
+import click
+
+from . import pagination
+from .agent import _transaction_filters, _transactions_query
+from .staff import _PASSENGER_FLIGHTS_SQL, _PASSENGERS_SQL, _customer_flights_query
+from .utils import get_backend, query_all
+
+
+def _sample():
+    """Sample parameters; dates are relative to the day the check runs."""
+    today = date.today()
+    return {
+        "airline": "Delta",
+        "customer": "alice@test.com",
+        "agent": "agent_a@test.com",
+        "flight": "DL9010",
+        "start": today - timedelta(days=30),
+        "end": today + timedelta(days=1),
+        "day": today + timedelta(days=7),
+        "next_day": today + timedelta(days=8),
+    }
+
+
+def _paged(name, sql, params, keyset, cursor_values):
+    """(name, sql, params) for one page of a handler's query, as the handler runs it."""
+    after, after_params = keyset.where(pagination.encode_cursor(cursor_values))
+    return (name, f"{sql} AND {after}{keyset.order_limit(pagination.DEFAULT_PAGE_SIZE)}", (*params, *after_params))
+
+
+def hot_queries(sample=None):
+    """
+    [(name, sql, params)] checked by explain-check.
+    列表 / 翻页类查询直接用 handlers 里的 SQL 常量和拼装函数生成，与线上执行的语句一致；
+    其余是 handlers 中内联查询的副本，改动时需同步。
+    """
+    s = sample or _sample()
+    agent_filters = _transaction_filters({"start_date": s["start"].isoformat(), "end_date": s["end"].isoformat()})
+    return [
+        (
+            "search_index.rebuild",
+            """
+            SELECT f.* FROM flight_search f
+            WHERE f.departure_time > NOW()
+            """,
+            (),
+        ),
+        (
+            "public.check_status_api",
+            """
+            SELECT f.*
+            FROM flight_search f
+            WHERE f.status IN ('in-progress', 'delayed', 'upcoming')
+              AND f.departure_time >= %s AND f.departure_time < %s
+            ORDER BY f.departure_time DESC LIMIT 20
+            """,
+            (s["day"], s["next_day"]),
+        ),
+        (
+            "public.get_airports",
+            """
+            SELECT DISTINCT f.departure_airport AS code, f.dep_city AS city
+            FROM flight_search f
+            WHERE f.status = 'upcoming' AND f.departure_time > NOW()
+            ORDER BY f.dep_city
+            """,
+            (),
+        ),
+        (
+            "customer.upcoming_flights",
+            """
+            SELECT f.*, t.ticket_ID, p.purchase_date
+            FROM purchases p
+            JOIN ticket t ON p.ticket_ID = t.ticket_ID
+            JOIN flight_search f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
+            WHERE p.customer_email=%s AND f.status IN ('upcoming', 'Delayed', 'on-time') AND f.departure_time > NOW()
+            ORDER BY f.departure_time ASC
+            """,
+            (s["customer"],),
+        ),
+        (
+            "customer.spending",
+            """
+            SELECT COALESCE(SUM(t.ticket_price), 0) AS total
+            FROM purchases p
+            JOIN ticket t ON p.ticket_ID = t.ticket_ID
+            WHERE p.customer_email=%s AND p.purchase_date >= %s AND p.purchase_date < %s
+            """,
+            (s["customer"], s["start"], s["end"]),
+        ),
+        _paged(
+            "agent.transactions",
+            *_transactions_query(s["agent"], agent_filters, archived=False),
+            (s["end"], "ZZZZZZZZZZZZZZZZ"),
+        ),
+        _paged(
+            "agent.transactions.archived",
+            *_transactions_query(s["agent"], agent_filters, archived=True),
+            (s["end"], "ZZZZZZZZZZZZZZZZ"),
+        ),
+        (
+            "agent.analytics",
+            """
+            SELECT COUNT(*) AS total_tickets, SUM(f.price * 0.10) AS total_commission
+            FROM purchases p
+            JOIN ticket t ON p.ticket_ID = t.ticket_ID
+            JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
+            WHERE p.agent_email=%s AND p.purchase_date >= DATE_SUB(NOW(), INTERVAL 30 DAY)
+            """,
+            (s["agent"],),
+        ),
+        (
+            "staff.dashboard",
+            """
+            SELECT f.*
+            FROM flight_search f
+            WHERE f.airline_name = %s
+              AND f.departure_time BETWEEN NOW() AND DATE_ADD(NOW(), INTERVAL 30 DAY)
+            ORDER BY f.departure_time ASC
+            """,
+            (s["airline"],),
+        ),
+        _paged(
+            "staff.passengers",
+            _PASSENGERS_SQL,
+            [s["airline"], s["flight"]],
+            pagination.TICKETS,
+            ("",),
+        ),
+        _paged(
+            "staff.passengers.flights",
+            _PASSENGER_FLIGHTS_SQL,
+            [s["airline"]],
+            pagination.FLIGHTS_BY_DEPARTURE,
+            (s["day"], s["flight"]),
+        ),
+        _paged(
+            "staff.api_customer_flights",
+            *_customer_flights_query(s["airline"], s["customer"], archived=False),
+            (s["end"], "ZZZZZZZZZZZZZZZZ"),
+        ),
+        _paged(
+            "staff.api_customer_flights.archived",
+            *_customer_flights_query(s["airline"], s["customer"], archived=True),
+            (s["end"], "ZZZZZZZZZZZZZZZZ"),
+        ),
+        (
+            "staff.analytics.top_agents",
+            """
+            SELECT agent_email, SUM(ticket_count) AS ticket_count
+            FROM sales_daily_agent
+            WHERE airline_name=%s AND sale_date >= DATE_SUB(CURDATE(), INTERVAL 1 YEAR)
+            GROUP BY agent_email
+            ORDER BY ticket_count DESC
+            LIMIT 5
+            """,
+            (s["airline"],),
+        ),
+        (
+            "staff.update_status",
+            """
+            SELECT * FROM flight
+            WHERE airline_name = %s
+              AND departure_time >= DATE_SUB(NOW(), INTERVAL 2 DAY)
+            ORDER BY departure_time ASC
+            """,
+            (s["airline"],),
+        ),
+        (
+            "lifecycle.advance",
+            """
+            SELECT airline_name, flight_number FROM flight
+            WHERE status IN ('upcoming', 'on-time', 'delayed', 'in-progress')
+              AND departure_time <= %s AND arrival_time <= %s LIMIT 1000
+            """,
+            (s["end"], s["end"]),
+        ),
+        (
+            "lifecycle.archive",
+            """
+            SELECT airline_name, flight_number FROM flight
+            WHERE status IN ('arrived', 'cancelled') AND departure_time < %s AND arrival_time < %s LIMIT 1000
+            """,
+            (s["start"], s["start"]),
+        ),
+        (
+            "seat_holds.snapshot",
+            "SELECT airline_name, flight_number, holder FROM seat_hold WHERE expires_at > %s",
+            (s["end"],),
+        ),
+        (
+            "seat_holds.held_by_others",
+            """
+            SELECT COUNT(*) AS n FROM seat_hold
+            WHERE airline_name=%s AND flight_number=%s AND holder<>%s AND expires_at>%s
+            """,
+            (s["airline"], s["flight"], s["customer"], s["end"]),
+        ),
+    ]
+
+
+def find_full_scans(min_rows=1000, queries=None):
+    """
+    EXPLAIN every hot query; return [(query_name, table, estimated_rows)]
+    for base tables read with a full table scan.
+    """
+    queries = hot_queries() if queries is None else queries
+    problems = []
+    if get_backend().name == "sqlite":
+        return _sqlite_full_scans(queries)
+    for name, sql, params in queries:
+        for row in query_all("EXPLAIN " + sql, params):
+            table = row.get("table") or ""
+            # <derivedN> / <subqueryN> 是物化的中间结果，不算基表扫描
+            if table.startswith("<"):
+                continue
+            rows = int(row.get("rows") or 0)
+            if row.get("type") == "ALL" and rows >= min_rows:
+                problems.append((name, table, rows))
+    return problems
+
+
+def _sqlite_full_scans(queries):
+    problems = []
+    for name, sql, params in queries:
+        for row in query_all("EXPLAIN QUERY PLAN " + sql, params):
+            # "SCAN f" 是全表扫描；"SCAN f USING INDEX ..." 是按索引顺序读
+            words = row["detail"].split()
+            if words[0] == "SCAN" and "USING" not in words and not words[1].startswith("("):
+                problems.append((name, words[1], None))
+    return problems
+
+
+@click.command("explain-check")
+@click.option("--min-rows", default=1000, show_default=True,
+              help="Ignore full scans of tables estimated below this many rows.")
+def explain_check_command(min_rows):
+    """Fail if a hot query's plan regresses to a full table scan."""
+    queries = hot_queries()
+    problems = find_full_scans(min_rows, queries)
+    for name, table, rows in problems:
+        click.echo(f"FULL SCAN  {name}: table {table} (~{'?' if rows is None else rows} rows)")
+    if problems:
+        raise SystemExit(1)
+    click.echo(f"OK: {len(queries)} hot queries use indexes.")
@@ -0,0 +1,91 @@
+"""
+每日销售汇总表的回填 / 重建。
+
+平时由 after_insert_purchases_rollup 触发器增量维护
+(见 db_sql/migrations/001_sales_rollups.sql)；这里提供全量或按日期的重建。
+重建范围覆盖已归档的购买记录时 (见 handlers/lifecycle.py) 改读 sales_history 视图：
+
+    flask --app app rollups rebuild
+    flask --app app rollups rebuild --since 2025-01-01
+"""
+import click
+from flask.cli import AppGroup
+
+from .utils import get_db
+from .lifecycle import reaches_archive
+
+ROLLUP_TABLES = ("sales_daily_agent", "sales_daily_customer", "sales_daily_destination")
+
+_SOURCE = """
+    FROM (
+        SELECT p.purchase_date, p.agent_email, p.customer_email, t.airline_name, t.ticket_price, f.arrival_airport
+        FROM purchases p
+        JOIN ticket t ON p.ticket_ID = t.ticket_ID
+        JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
+    ) s
+"""
+# 在线 + 归档 (db_sql/migrations/005_flight_archive.sql)
+_HISTORY_SOURCE = "FROM sales_history s"
+
+_REBUILD_SQL = {
+    "sales_daily_agent": """
+        INSERT INTO sales_daily_agent (airline_name, sale_date, agent_email, ticket_count, revenue)
+        SELECT s.airline_name, DATE(s.purchase_date), s.agent_email, COUNT(*), COALESCE(SUM(s.ticket_price), 0)
+        {source}
+        WHERE s.agent_email IS NOT NULL {since}
+        GROUP BY s.airline_name, DATE(s.purchase_date), s.agent_email
+    """,
+    "sales_daily_customer": """
+        INSERT INTO sales_daily_customer (airline_name, sale_date, customer_email, ticket_count, revenue)
+        SELECT s.airline_name, DATE(s.purchase_date), s.customer_email, COUNT(*), COALESCE(SUM(s.ticket_price), 0)
+        {source}
+        WHERE 1=1 {since}
+        GROUP BY s.airline_name, DATE(s.purchase_date), s.customer_email
+    """,
+    "sales_daily_destination": """
+        INSERT INTO sales_daily_destination (airline_name, sale_date, arrival_airport, ticket_count, revenue)
+        SELECT s.airline_name, DATE(s.purchase_date), s.arrival_airport, COUNT(*), COALESCE(SUM(s.ticket_price), 0)
+        {source}
+        WHERE 1=1 {since}
+        GROUP BY s.airline_name, DATE(s.purchase_date), s.arrival_airport
+    """,
+}
+
+
+def rebuild_rollups(since=None):
+    """
+    Recompute the rollup tables from purchases (plus the archive when the range reaches it) in one transaction.
+    since: 'YYYY-MM-DD' — only days >= since are deleted and recomputed.
+    Returns {table: rows_written}.
+    """
+    source = _HISTORY_SOURCE if reaches_archive(since) else _SOURCE
+    db = get_db()
+    counts = {}
+    db.begin()
+    try:
+        with db.cursor() as cursor:
+            for table in ROLLUP_TABLES:
+                if since:
+                    cursor.execute(f"DELETE FROM {table} WHERE sale_date >= %s", (since,))
+                    sql = _REBUILD_SQL[table].format(source=source, since="AND s.purchase_date >= %s")
+                    counts[table] = cursor.execute(sql, (since,))
+                else:
+                    cursor.execute(f"DELETE FROM {table}")
+                    sql = _REBUILD_SQL[table].format(source=source, since="")
+                    counts[table] = cursor.execute(sql)
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    return counts
+
+
+rollups_cli = AppGroup("rollups", help="Maintain the daily sales rollup tables.")
+
+
+@rollups_cli.command("rebuild")
+@click.option("--since", default=None, help="Only rebuild days on or after YYYY-MM-DD.")
+def rebuild_command(since):
+    """Backfill / rebuild the sales rollups from purchases."""
+    for table, rows in rebuild_rollups(since).items():
+        click.echo(f"{table}: {rows} rows")
@@ -0,0 +1,481 @@
+"""
+周期航班计划 (flight_schedule) 与展开器。
+
+一条计划描述一个班次：航线、当地起飞时刻、飞行时长、班期 (days_of_week,
+'1234567'，1 = 周一)、有效期、机型和票价。展开器把滚动窗口
+(今天起 SCHEDULE_HORIZON_DAYS 天) 内的每个班期日期物化成 flight 行：
+
+- 幂等：flight_schedule_instance 以 (schedule_id, service_date) 唯一，
+  重复运行只补缺失的日期；
+- 批量：一个事务里 INSERT IGNORE 实例行 -> 分配航班号 -> 多行 INSERT flight；
+- 同步：计划修改后，尚未起飞的实例跟着改时刻 / 航线 / 票价，
+  换机型只对还没有售出机票的航班生效；
+  不再在班期内的未来实例 (停用、改班期、缩短有效期) 标记为 cancelled。
+
+flight.flight_number 只有 6 位且是主键的一部分，同一班次不同日期不能共用，
+所以实例航班号由 instance_id 生成 ('S' + 5 位 36 进制)，对外班次号保存在
+flight_schedule.service_number；与已有航班号冲突时换首字母 T..Z。
+
+    flask --app app flights expand [--days 60] [--airline NAME] [--schedule ID]
+"""
+from datetime import date, datetime, time as dtime, timedelta
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+import click
+from flask import current_app
+
+from .utils import get_db, query_all, query_one
+from . import cache, flight_events, search_index
+
+DAY_NAMES = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+NUMBER_PREFIXES = "STUVWXYZ"
+_BASE36 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+# 这些状态的航班不再被计划同步改动 (已取消的实例重新启用计划后也不会自动恢复)
+_FINAL_STATUSES = ("cancelled", "arrived")
+EXPAND_BATCH_SIZE = 1000
+# 超过这个数量就不逐个推送 created / status 事件
+MAX_EVENTS = 100
+
+_SCHEDULE_COLUMNS = (
+    "service_number", "departure_airport", "arrival_airport", "departure_local", "duration_minutes",
+    "days_of_week", "valid_from", "valid_to", "airplane_assigned", "price", "seats", "active",
+)
+
+_INSERT_FLIGHT_SQL = """
+    INSERT INTO flight
+    (flight_number, airline_name, departure_airport, arrival_airport,
+     departure_time, arrival_time, price, status, airplane_assigned, remaining_seats)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, 'upcoming', %s, %s)
+"""
+
+
+# ---------- 班期 / 时刻 ----------
+
+def parse_days(text):
+    """
+    '1234567' / '1.3.5.7' (IATA) / 'daily' / 'Mon,Wed,Fri' -> sorted digit string ('135').
+    Raises ValueError.
+    """
+    text = (text or "").strip()
+    if text.lower() == "daily":
+        return "1234567"
+    days = set()
+    if any(c.isalpha() for c in text):
+        for part in text.replace(";", ",").replace(" ", ",").split(","):
+            if not part:
+                continue
+            name = part[:3].title()
+            if name not in DAY_NAMES:
+                raise ValueError(f"Unknown day '{part}'.")
+            days.add(str(DAY_NAMES.index(name) + 1))
+    else:
+        for c in text:
+            if c in "1234567":
+                days.add(c)
+            elif c not in ".-, ":
+                raise ValueError(f"Days of week must use 1-7 (1 = Monday), got '{text}'.")
+    if not days:
+        raise ValueError("Pick at least one day of the week.")
+    return "".join(sorted(days))
+
+
+def format_days(days):
+    return ", ".join(DAY_NAMES[int(d) - 1] for d in days) if days != "1234567" else "Daily"
+
+
+def time_of_day(value):
+    """MySQL TIME comes back as timedelta, SQLite as 'HH:MM:SS' text; both -> datetime.time."""
+    if isinstance(value, dtime):
+        return value
+    if isinstance(value, timedelta):
+        minutes = int(value.total_seconds()) // 60
+        return dtime(minutes // 60 % 24, minutes % 60)
+    parts = str(value).strip().split(":")
+    return dtime(int(parts[0]), int(parts[1]))
+
+
+def _as_date(value):
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def service_dates(schedule, start, end):
+    """Operating dates of `schedule` in [start, end] (inclusive), honouring its validity range."""
+    first = max(start, _as_date(schedule["valid_from"]))
+    last = end if schedule["valid_to"] is None else min(end, _as_date(schedule["valid_to"]))
+    days = schedule["days_of_week"]
+    out = []
+    d = first
+    while d <= last:
+        if str(d.isoweekday()) in days:
+            out.append(d)
+        d += timedelta(days=1)
+    return out
+
+
+def flight_number_candidates(instance_id):
+    digits = ""
+    n = instance_id
+    while n:
+        n, r = divmod(n, 36)
+        digits = _BASE36[r] + digits
+    digits = digits.rjust(5, "0")
+    return [prefix + digits for prefix in NUMBER_PREFIXES]
+
+
+# ---------- 计划的增改 ----------
+
+def validate_schedule(form, airline_name):
+    """Form / dict -> (values dict, errors list). Values are ready for INSERT / UPDATE."""
+    def text(key):
+        value = form.get(key)
+        return "" if value is None else str(value).strip()
+
+    errors = []
+    values = {"service_number": text("service_number").upper()}
+    if not values["service_number"] or len(values["service_number"]) > 10:
+        errors.append("Service number is required (at most 10 characters).")
+
+    for key, label in (("departure_airport", "Departure"), ("arrival_airport", "Arrival")):
+        row = query_one("SELECT name FROM airport WHERE name=%s", (text(key),)) if text(key) else None
+        if not row:
+            errors.append(f"{label} airport '{text(key)}' not found.")
+        values[key] = row["name"] if row else None
+    if values["departure_airport"] and values["departure_airport"] == values["arrival_airport"]:
+        errors.append("Departure and Arrival airports cannot be the same.")
+
+    try:
+        values["departure_local"] = time_of_day(text("departure_local")).strftime("%H:%M:%S")
+    except (ValueError, IndexError):
+        errors.append("Departure time must look like HH:MM.")
+    try:
+        values["duration_minutes"] = int(text("duration_minutes"))
+        if values["duration_minutes"] <= 0:
+            raise ValueError
+    except ValueError:
+        errors.append("Duration must be a positive number of minutes.")
+    try:
+        values["days_of_week"] = parse_days(text("days_of_week"))
+    except ValueError as e:
+        errors.append(str(e))
+
+    try:
+        values["valid_from"] = date.fromisoformat(text("valid_from")) if text("valid_from") else date.today()
+        values["valid_to"] = date.fromisoformat(text("valid_to")) if text("valid_to") else None
+        if values["valid_to"] and values["valid_to"] < values["valid_from"]:
+            errors.append("Valid-to date must not be before valid-from.")
+    except ValueError:
+        errors.append("Dates must look like YYYY-MM-DD.")
+
+    try:
+        values["price"] = Decimal(text("price")).quantize(Decimal("0.01"), ROUND_HALF_UP)
+        if not values["price"].is_finite() or values["price"] < 0:
+            raise InvalidOperation
+    except (InvalidOperation, ValueError):
+        errors.append("Price must be a non-negative number.")
+
+    airplane = query_one(
+        "SELECT airplane_id, seat_capacity FROM airplane WHERE airplane_id=%s AND airline_name=%s",
+        (text("airplane_assigned"), airline_name),
+    )
+    if not airplane:
+        errors.append(f"Airplane '{text('airplane_assigned')}' not found for this airline.")
+    values["airplane_assigned"] = airplane["airplane_id"] if airplane else None
+    values["seats"] = None
+    if text("seats"):
+        try:
+            values["seats"] = int(text("seats"))
+        except ValueError:
+            errors.append("Seats must be a valid number.")
+        else:
+            # 与 before_insert_flight_capacity_check 相同的范围，提前拒绝，避免展开时整批失败
+            if airplane and not 0 < values["seats"] <= airplane["seat_capacity"]:
+                errors.append(f"Seats must be between 1 and the airplane capacity ({airplane['seat_capacity']}).")
+
+    values["active"] = 1 if text("active") in ("1", "true", "on") else 0
+    return values, errors
+
+
+def save_schedule(values, airline_name, schedule_id=None):
+    """Insert or update one schedule; returns its id (None if the id is not this airline's)."""
+    db = get_db()
+    with db.cursor() as cursor:
+        if schedule_id is None:
+            cursor.execute(
+                f"""
+                INSERT INTO flight_schedule (airline_name, {', '.join(_SCHEDULE_COLUMNS)}, updated_at)
+                VALUES (%s, {', '.join(['%s'] * len(_SCHEDULE_COLUMNS))}, NOW())
+                """,
+                (airline_name, *[values[c] for c in _SCHEDULE_COLUMNS]),
+            )
+            return cursor.lastrowid
+        updated = cursor.execute(
+            f"""
+            UPDATE flight_schedule SET {', '.join(c + '=%s' for c in _SCHEDULE_COLUMNS)}, updated_at=NOW()
+            WHERE schedule_id=%s AND airline_name=%s
+            """,
+            (*[values[c] for c in _SCHEDULE_COLUMNS], schedule_id, airline_name),
+        )
+        if updated:
+            return schedule_id
+        exists = query_one(
+            "SELECT schedule_id FROM flight_schedule WHERE schedule_id=%s AND airline_name=%s",
+            (schedule_id, airline_name),
+        )
+        return schedule_id if exists else None
+
+
+def list_schedules(airline_name):
+    """This airline's schedules with the number of upcoming materialized instances."""
+    schedules = query_all(
+        "SELECT * FROM flight_schedule WHERE airline_name=%s ORDER BY service_number, valid_from",
+        (airline_name,),
+    )
+    counts = {
+        r["schedule_id"]: r["cnt"]
+        for r in query_all(
+            """
+            SELECT schedule_id, COUNT(*) AS cnt FROM flight_schedule_instance
+            WHERE airline_name=%s AND service_date >= CURDATE()
+            GROUP BY schedule_id
+            """,
+            (airline_name,),
+        )
+    }
+    for s in schedules:
+        s["departure_local"] = time_of_day(s["departure_local"]).strftime("%H:%M")
+        s["days_label"] = format_days(s["days_of_week"])
+        s["upcoming_instances"] = counts.get(s["schedule_id"], 0)
+    return schedules
+
+
+# ---------- 展开 ----------
+
+def _scope(airline_name, schedule_ids, alias=""):
+    """WHERE fragment + params limiting a query to the requested airline / schedules."""
+    conditions, params = [], []
+    if airline_name:
+        conditions.append(f"{alias}airline_name=%s")
+        params.append(airline_name)
+    if schedule_ids:
+        conditions.append(f"{alias}schedule_id IN ({', '.join(['%s'] * len(schedule_ids))})")
+        params.extend(schedule_ids)
+    return (" AND " + " AND ".join(conditions) if conditions else ""), params
+
+
+def _instance_values(schedule, service_date):
+    departure = datetime.combine(service_date, time_of_day(schedule["departure_local"]))
+    return {
+        "airline_name": schedule["airline_name"],
+        "departure_airport": schedule["departure_airport"],
+        "arrival_airport": schedule["arrival_airport"],
+        "departure_time": departure,
+        "arrival_time": departure + timedelta(minutes=schedule["duration_minutes"]),
+        "price": Decimal(schedule["price"]).quantize(Decimal("0.01")),
+        "airplane_assigned": schedule["airplane_assigned"],
+        "seats": schedule["seats"],
+    }
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def expand(horizon_days=None, airline_name=None, schedule_ids=None, now=None, dry_run=False):
+    """
+    Materialize, resync and cancel schedule instances in [today, today + horizon_days].
+    Returns a report dict with the counts of each action.
+    """
+    now = now or datetime.now()
+    if horizon_days is None:
+        horizon_days = current_app.config.get("SCHEDULE_HORIZON_DAYS", 60)
+    today = now.date()
+    last = today + timedelta(days=horizon_days)
+    report = {
+        "window": [today.isoformat(), last.isoformat()], "schedules": 0, "created": 0,
+        "existing": 0, "updated": 0, "airplane_kept": 0, "cancelled": 0, "dry_run": dry_run,
+    }
+
+    where, params = _scope(airline_name, schedule_ids)
+    schedules = query_all("SELECT * FROM flight_schedule WHERE 1=1" + where, params)
+    report["schedules"] = len(schedules)
+    if not schedules:
+        return report
+
+    wanted = {}
+    for s in schedules:
+        if not s["active"]:
+            continue
+        for d in service_dates(s, today, last):
+            values = _instance_values(s, d)
+            if values["departure_time"] > now:
+                wanted[(s["schedule_id"], d)] = values
+
+    where, params = _scope(airline_name, schedule_ids, "i.")
+    existing = query_all(
+        """
+        SELECT i.instance_id, i.schedule_id, i.service_date, i.airline_name, i.flight_number,
+               f.departure_airport, f.arrival_airport, f.departure_time, f.arrival_time,
+               f.price, f.airplane_assigned, f.status
+        FROM flight_schedule_instance i
+        LEFT JOIN flight f ON f.airline_name = i.airline_name AND f.flight_number = i.flight_number
+        WHERE i.service_date >= %s
+        """ + where,
+        [today, *params],
+    )
+
+    retime, reassign, cancel = [], [], []
+    for row in existing:
+        values = wanted.pop((row["schedule_id"], _as_date(row["service_date"])), None)
+        live = (
+            row["departure_time"] is not None
+            and row["departure_time"] > now
+            and row["status"] not in _FINAL_STATUSES
+        )
+        if values is None:
+            if live:
+                cancel.append((row["airline_name"], row["flight_number"]))
+            continue
+        report["existing"] += 1
+        if not live:
+            continue
+        key = (row["airline_name"], row["flight_number"])
+        if any(row[k] != values[k] for k in ("departure_airport", "arrival_airport",
+                                              "departure_time", "arrival_time", "price")):
+            retime.append((values["departure_airport"], values["arrival_airport"], values["departure_time"],
+                           values["arrival_time"], values["price"], *key))
+        if row["airplane_assigned"] != values["airplane_assigned"]:
+            reassign.append((values["airplane_assigned"], values["seats"], values["airplane_assigned"],
+                             values["airline_name"], *key))
+
+    create = sorted(wanted.items())
+    if dry_run:
+        touched = {params[-2:] for params in retime + reassign}
+        report.update(created=len(create), updated=len(touched), cancelled=len(cancel))
+        return report
+
+    created = []
+    touched = {params[-2:] for params in retime}
+    db = get_db()
+    db.begin()
+    try:
+        with db.cursor() as cursor:
+            if create:
+                created = _materialize(cursor, create, airline_name, schedule_ids)
+            for batch in _chunks(retime, EXPAND_BATCH_SIZE):
+                cursor.executemany(
+                    """
+                    UPDATE flight SET departure_airport=%s, arrival_airport=%s, departure_time=%s,
+                                      arrival_time=%s, price=%s
+                    WHERE airline_name=%s AND flight_number=%s
+                    """,
+                    batch,
+                )
+            for params in reassign:
+                # 只有还没售出机票的航班可以换机型 (座位数按新机型重新初始化)
+                changed = cursor.execute(
+                    """
+                    UPDATE flight SET airplane_assigned=%s,
+                        remaining_seats=COALESCE(%s, (SELECT seat_capacity FROM airplane
+                                                      WHERE airplane_id=%s AND airline_name=%s))
+                    WHERE airline_name=%s AND flight_number=%s
+                      AND NOT EXISTS (SELECT 1 FROM ticket t
+                                      WHERE t.airline_name=flight.airline_name AND t.flight_number=flight.flight_number)
+                    """,
+                    params,
+                )
+                if changed:
+                    touched.add(params[-2:])
+                else:
+                    report["airplane_kept"] += 1
+            for batch in _chunks(cancel, EXPAND_BATCH_SIZE):
+                cursor.executemany(
+                    "UPDATE flight SET status='cancelled' WHERE airline_name=%s AND flight_number=%s",
+                    batch,
+                )
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+
+    report["created"] = len(created)
+    report["updated"] = len(touched)
+    report["cancelled"] = len(cancel)
+    if created or touched or cancel:
+        search_index.invalidate()
+        cache.active_airports.invalidate()
+    if len(created) <= MAX_EVENTS:
+        for airline, number in created:
+            flight_events.publish_flight(airline, number, "created")
+    if len(cancel) <= MAX_EVENTS:
+        for airline, number in cancel:
+            flight_events.publish_flight(airline, number, "status")
+    return report
+
+
+def _materialize(cursor, create, airline_name, schedule_ids):
+    """Claim instance rows, give them flight numbers and insert the flights. Returns [(airline, number)]."""
+    for batch in _chunks(create, EXPAND_BATCH_SIZE):
+        # 并发的展开器插入同一 (schedule_id, service_date) 时，后到的被 IGNORE
+        cursor.executemany(
+            "INSERT IGNORE INTO flight_schedule_instance (schedule_id, service_date, airline_name) VALUES (%s, %s, %s)",
+            [(sid, d, values["airline_name"]) for (sid, d), values in batch],
+        )
+    where, params = _scope(airline_name, schedule_ids)
+    cursor.execute(
+        "SELECT instance_id, schedule_id, service_date FROM flight_schedule_instance WHERE flight_number IS NULL" + where,
+        params,
+    )
+    claimed = cursor.fetchall()
+    if not claimed:
+        return []
+
+    wanted = dict(create)
+    airlines = sorted({values["airline_name"] for values in wanted.values()})
+    cursor.execute(
+        f"SELECT airline_name, flight_number FROM flight WHERE airline_name IN ({', '.join(['%s'] * len(airlines))})",
+        airlines,
+    )
+    taken = {(r["airline_name"].lower(), r["flight_number"].upper()) for r in cursor.fetchall()}
+
+    numbers, flights, created = [], [], []
+    for row in claimed:
+        values = wanted.get((row["schedule_id"], _as_date(row["service_date"])))
+        if values is None:
+            continue
+        airline = values["airline_name"]
+        number = next(n for n in flight_number_candidates(row["instance_id"]) if (airline.lower(), n) not in taken)
+        taken.add((airline.lower(), number))
+        numbers.append((number, row["instance_id"]))
+        flights.append((
+            number, airline, values["departure_airport"], values["arrival_airport"],
+            values["departure_time"], values["arrival_time"], values["price"],
+            values["airplane_assigned"], values["seats"],
+        ))
+        created.append((airline, number))
+
+    for batch in _chunks(numbers, EXPAND_BATCH_SIZE):
+        cursor.executemany("UPDATE flight_schedule_instance SET flight_number=%s WHERE instance_id=%s", batch)
+    for batch in _chunks(flights, EXPAND_BATCH_SIZE):
+        cursor.executemany(_INSERT_FLIGHT_SQL, batch)
+    return created
+
+
+# ---------- CLI ----------
+
+@click.command("expand")
+@click.option("--days", type=int, default=None, help="Horizon in days (default: SCHEDULE_HORIZON_DAYS).")
+@click.option("--airline", default=None, help="Only this airline's schedules.")
+@click.option("--schedule", "schedule_ids", type=int, multiple=True, help="Only these schedule ids (repeatable).")
+@click.option("--dry-run", is_flag=True, help="Report what would change without writing.")
+def expand_command(days, airline, schedule_ids, dry_run):
+    """Materialize recurring schedules into flights for the rolling horizon (idempotent)."""
+    report = expand(days, airline, list(schedule_ids) or None, dry_run=dry_run)
+    click.echo(
+        f"window {report['window'][0]}..{report['window'][1]}: schedules={report['schedules']} "
+        f"created={report['created']} existing={report['existing']} updated={report['updated']} "
+        f"airplane_kept={report['airplane_kept']} cancelled={report['cancelled']}"
+        + (" (dry run)" if dry_run else "")
+    )
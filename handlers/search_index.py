@@ -0,0 +1,259 @@
+"""
+进程内航班搜索索引。
+
+持有所有尚未起飞的航班 (含城市名 / 座位容量 / 已售数)，按
+(出发机场, 到达机场, 出发日期) 以及城市 / 别名建立索引，
+供 public / customer / agent / staff 四个搜索 API 直接在内存中查询。
+
+写路径 (staff.add_flight / staff.update_status / 购票) 会就地更新索引；
+另外按 SEARCH_INDEX_TTL 定期全量重建，以覆盖其他 worker 进程的写入。
+"""
+import bisect
+import heapq
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from flask import current_app
+
+from .utils import query_all, query_one
+from . import airport_resolver
+
+# flight_search 已带城市名 / 座位容量 / 已售数 (触发器维护)，重建时不再 JOIN
+_FLIGHT_SELECT = "SELECT f.* FROM flight_search f"
+
+
+_SMALL_CANDIDATE_SET = 512
+
+
+def _departure(row):
+    return row["departure_time"]
+
+
+class FlightSearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._flights = {}
+        self._by_route_date = defaultdict(set)
+        self._by_origin = defaultdict(set)
+        self._by_dest = defaultdict(set)
+        self._by_date = defaultdict(set)
+        # (departure_time, key) 按起飞时间排序，宽泛查询时按序扫描、取够 limit 即停
+        self._order = []
+        self.loaded_at = 0.0
+
+    # ---------- build ----------
+
+    def load(self, flights):
+        """Replace the whole index with `flights` (rows of _FLIGHT_SELECT)."""
+        flights_map = {}
+        by_route_date = defaultdict(set)
+        by_origin = defaultdict(set)
+        by_dest = defaultdict(set)
+        by_date = defaultdict(set)
+        for row in flights:
+            key = (row["airline_name"], row["flight_number"])
+            flights_map[key] = dict(row)
+            self._add_keys(key, row, by_route_date, by_origin, by_dest, by_date)
+        order = sorted((row["departure_time"], key) for key, row in flights_map.items())
+
+        with self._lock:
+            self._flights = flights_map
+            self._by_route_date = by_route_date
+            self._by_origin = by_origin
+            self._by_dest = by_dest
+            self._by_date = by_date
+            self._order = order
+            self.loaded_at = time.monotonic()
+
+    @staticmethod
+    def _add_keys(key, row, by_route_date, by_origin, by_dest, by_date):
+        dep, arr = row["departure_airport"], row["arrival_airport"]
+        day = row["departure_time"].date()
+        by_route_date[(dep, arr, day)].add(key)
+        by_origin[dep].add(key)
+        by_dest[arr].add(key)
+        by_date[day].add(key)
+
+    @staticmethod
+    def _discard_keys(key, row, by_route_date, by_origin, by_dest, by_date):
+        dep, arr = row["departure_airport"], row["arrival_airport"]
+        day = row["departure_time"].date()
+        by_route_date[(dep, arr, day)].discard(key)
+        by_origin[dep].discard(key)
+        by_dest[arr].discard(key)
+        by_date[day].discard(key)
+
+    # ---------- incremental updates ----------
+
+    def upsert(self, row):
+        key = (row["airline_name"], row["flight_number"])
+        indexes = (self._by_route_date, self._by_origin, self._by_dest, self._by_date)
+        with self._lock:
+            old = self._flights.get(key)
+            if old is not None:
+                self._discard_keys(key, old, *indexes)
+                pos = bisect.bisect_left(self._order, (old["departure_time"], key))
+                if pos < len(self._order) and self._order[pos] == (old["departure_time"], key):
+                    del self._order[pos]
+            self._flights[key] = dict(row)
+            self._add_keys(key, row, *indexes)
+            bisect.insort(self._order, (row["departure_time"], key))
+
+    def set_status(self, airline_name, flight_number, status):
+        with self._lock:
+            row = self._flights.get((airline_name, flight_number))
+            if row is not None:
+                row["status"] = status
+
+    def seats_sold(self, airline_name, flight_number, count=1):
+        with self._lock:
+            row = self._flights.get((airline_name, flight_number))
+            if row is not None:
+                row["remaining_seats"] = max(0, (row.get("remaining_seats") or 0) - count)
+                row["sold_cnt"] = (row.get("sold_cnt") or 0) + count
+
+    # ---------- lookup ----------
+
+    def search(self, origin_codes=None, dest_codes=None, date=None, statuses=None, airlines=None,
+               start=None, end=None, require_seats=False, held=None, limit=50):
+        """
+        Return matching flights (copies) ordered by departure_time.
+        origin_codes / dest_codes: sets of airport codes (None = any);
+        date: datetime.date; start/end: datetime window on departure_time
+        (start defaults to now so departed flights never show up);
+        held: {(airline_name, flight_number): seats held by others}, subtracted
+        before require_seats is checked so the limit counts sellable flights only.
+        """
+        now = datetime.now()
+        start = max(start, now) if start else now
+        status_set = {s.lower() for s in statuses} if statuses else None
+        airline_set = set(airlines) if airlines is not None else None
+
+        with self._lock:
+            candidates = None
+
+            def narrow(keys):
+                nonlocal candidates
+                candidates = set(keys) if candidates is None else candidates & keys
+
+            if origin_codes is not None and dest_codes is not None and date is not None:
+                keys = set()
+                for o in origin_codes:
+                    for d in dest_codes:
+                        keys |= self._by_route_date.get((o, d, date), set())
+                narrow(keys)
+            else:
+                if origin_codes is not None:
+                    narrow(set().union(*(self._by_origin.get(c, set()) for c in origin_codes)))
+                if dest_codes is not None:
+                    narrow(set().union(*(self._by_dest.get(c, set()) for c in dest_codes)))
+                if date is not None:
+                    narrow(self._by_date.get(date, set()))
+
+            def accept(row):
+                dep_time = row["departure_time"]
+                if dep_time <= start or (end is not None and dep_time > end):
+                    return False
+                if status_set is not None and (row.get("status") or "").lower() not in status_set:
+                    return False
+                if airline_set is not None and row["airline_name"] not in airline_set:
+                    return False
+                if require_seats and (row.get("remaining_seats") or 0) <= (
+                    held.get((row["airline_name"], row["flight_number"]), 0) if held else 0
+                ):
+                    return False
+                return True
+
+            if candidates is not None and len(candidates) <= _SMALL_CANDIDATE_SET:
+                result = [r for r in (self._flights[k] for k in candidates) if accept(r)]
+                if limit:
+                    result = heapq.nsmallest(limit, result, key=_departure)
+                else:
+                    result.sort(key=_departure)
+            else:
+                # Walk flights in departure order from `start`, stop once `limit` rows match.
+                result = []
+                pos = bisect.bisect_right(self._order, (start, ("\uffff", "\uffff")))
+                for dep_time, key in self._order[pos:]:
+                    if end is not None and dep_time > end:
+                        break
+                    if candidates is not None and key not in candidates:
+                        continue
+                    row = self._flights[key]
+                    if accept(row):
+                        result.append(row)
+                        if limit and len(result) >= limit:
+                            break
+            return [dict(r) for r in result]
+
+
+_index = FlightSearchIndex()
+_build_lock = threading.Lock()
+
+
+def _rebuild():
+    _index.load(query_all(_FLIGHT_SELECT + " WHERE f.departure_time > NOW()"))
+
+
+def get_index():
+    """Return the process-wide index, (re)building it when missing or older than SEARCH_INDEX_TTL."""
+    ttl = current_app.config.get("SEARCH_INDEX_TTL", 60)
+    if _index.loaded_at and time.monotonic() - _index.loaded_at < ttl:
+        return _index
+    # 只让一个线程重建；其余线程继续使用旧索引 (首次构建时等待)
+    if _build_lock.acquire(blocking=not _index.loaded_at):
+        try:
+            if not _index.loaded_at or time.monotonic() - _index.loaded_at >= ttl:
+                _rebuild()
+        finally:
+            _build_lock.release()
+    return _index
+
+
+def search(origin="", destination="", date=None, exact_code=False, **filters):
+    """
+    Resolve free-text origin / destination through airport_resolver and
+    query the index; remaining keyword filters go to FlightSearchIndex.search.
+    """
+    origin_codes = airport_resolver.resolve(origin, exact_code) if origin else None
+    dest_codes = airport_resolver.resolve(destination, exact_code) if destination else None
+    if (origin_codes is not None and not origin_codes) or (dest_codes is not None and not dest_codes):
+        return []
+    return get_index().search(origin_codes, dest_codes, date, **filters)
+
+
+def invalidate():
+    """Force a full rebuild on next access."""
+    _index.loaded_at = 0.0
+
+
+def refresh_flight(airline_name, flight_number):
+    """Re-read one flight from the DB into the index (after insert / update)."""
+    if not _index.loaded_at:
+        return
+    row = query_one(
+        _FLIGHT_SELECT + " WHERE f.airline_name=%s AND f.flight_number=%s",
+        (airline_name, flight_number),
+    )
+    if row:
+        _index.upsert(row)
+
+
+def set_status(airline_name, flight_number, status):
+    _index.set_status(airline_name, flight_number, status)
+
+
+def seats_sold(airline_name, flight_number, count=1):
+    _index.seats_sold(airline_name, flight_number, count)
+
+
+def parse_date(value):
+    """'YYYY-MM-DD' -> date, or None if empty / malformed."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        return None
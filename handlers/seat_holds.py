@@ -0,0 +1,269 @@
+"""
+结账期间的临时占座。
+
+打开购票确认页 (customer / agent book_ticket) 时为 (航班, 下单人) 占一个座，
+SEAT_HOLD_TTL 秒后失效；同一个人重复打开只会续期。占座期间：
+
+- 搜索结果的余座减去别人未过期的占座 (apply_to)；
+- purchase_service 的条件扣减要求 remaining_seats 大于别人的占座数，
+  余座都被别人占着时直接拒绝，不再白白跑一趟购票事务；
+- 购票成功后释放下单人自己的占座 (release)。
+占座只是在 remaining_seats 之上的一层软预留，不会超卖：最终仍以条件扣减为准。
+
+两种存储 (SEAT_HOLD_STORE)：
+  memory  只在本进程内 (单 worker / 本地调试)；
+  db      seat_hold 表 (db_sql/migrations/006_seat_holds.sql)，多个 worker 共享；
+          取占座时锁住 flight 行再判断余座，与购票的扣减串行。
+          搜索用的占座快照每个进程缓存 SEAT_HOLD_REFRESH 秒。
+过期的占座由 sweep 分批清理：memory 在取占座时顺带清，
+db 由 `flights lifecycle` 每个周期清一次 (读取时一律按 expires_at 过滤，晚清不影响结果)。
+"""
+import heapq
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from .utils import get_db, query_all, query_one
+
+
+def _now():
+    return datetime.now().replace(microsecond=0)
+
+
+class MemoryHoldStore:
+    """Holds kept in this process only."""
+
+    name = "memory"
+
+    def __init__(self, config):
+        self.config = config
+        self._lock = threading.Lock()
+        self._holds = defaultdict(dict)  # (airline, flight) -> {holder: expires_at}
+        self._expiry = []  # heap of (expires_at, airline, flight, holder); 续期后旧条目在 sweep 时跳过
+
+    def take(self, key, holder, expires_at, now):
+        row = query_one(
+            "SELECT remaining_seats FROM flight WHERE airline_name=%s AND flight_number=%s", key
+        )
+        if not row:
+            return False
+        with self._lock:
+            self._sweep(now, self.config.get("SEAT_HOLD_SWEEP_BATCH", 1000))
+            holders = self._holds[key]
+            others = sum(1 for h, exp in holders.items() if h != holder and exp > now)
+            if (row["remaining_seats"] or 0) - others <= 0:
+                if not holders:
+                    del self._holds[key]
+                return False
+            holders[holder] = expires_at
+            heapq.heappush(self._expiry, (expires_at, key[0], key[1], holder))
+            return True
+
+    def snapshot(self, now):
+        with self._lock:
+            return {
+                key: {h for h, exp in holders.items() if exp > now}
+                for key, holders in self._holds.items()
+            }
+
+    def held_by_others(self, key, holder, now):
+        with self._lock:
+            return sum(1 for h, exp in self._holds.get(key, {}).items() if h != holder and exp > now)
+
+    def release(self, key, holder):
+        with self._lock:
+            holders = self._holds.get(key)
+            if holders is not None:
+                holders.pop(holder, None)
+                if not holders:
+                    del self._holds[key]
+
+    def _sweep(self, now, batch_size):
+        removed = 0
+        while self._expiry and self._expiry[0][0] <= now and removed < batch_size:
+            expires_at, airline, flight, holder = heapq.heappop(self._expiry)
+            holders = self._holds.get((airline, flight))
+            if holders is not None and holders.get(holder) == expires_at:
+                del holders[holder]
+                removed += 1
+                if not holders:
+                    del self._holds[(airline, flight)]
+        return removed
+
+    def sweep(self, now, batch_size):
+        total = 0
+        while True:
+            with self._lock:
+                removed = self._sweep(now, batch_size)
+            total += removed
+            if removed < batch_size:
+                return total
+
+
+class DbHoldStore:
+    """Holds in the seat_hold table, shared by every worker process."""
+
+    name = "db"
+
+    def __init__(self, config):
+        self.config = config
+        self._lock = threading.Lock()
+        self._snapshot = {}
+        self._loaded_at = 0.0
+
+    def take(self, key, holder, expires_at, now):
+        db = get_db()
+        db.begin()
+        try:
+            with db.cursor() as cursor:
+                # flight 行锁：与购票的条件扣减、别人的取占座串行
+                cursor.execute(
+                    "SELECT remaining_seats FROM flight WHERE airline_name=%s AND flight_number=%s FOR UPDATE", key
+                )
+                row = cursor.fetchone()
+                if row:
+                    cursor.execute(
+                        """
+                        SELECT COUNT(*) AS n FROM seat_hold
+                        WHERE airline_name=%s AND flight_number=%s AND holder<>%s AND expires_at>%s
+                        """,
+                        (*key, holder, now),
+                    )
+                    others = cursor.fetchone()["n"]
+                if not row or (row["remaining_seats"] or 0) - others <= 0:
+                    db.rollback()
+                    return False
+                cursor.execute(
+                    """
+                    INSERT INTO seat_hold (airline_name, flight_number, holder, expires_at, created_at)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE expires_at=VALUES(expires_at)
+                    """,
+                    (*key, holder, expires_at, now),
+                )
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        self._loaded_at = 0.0
+        return True
+
+    def snapshot(self, now):
+        with self._lock:
+            if time.monotonic() - self._loaded_at < self.config.get("SEAT_HOLD_REFRESH", 1):
+                return self._snapshot
+        snapshot = defaultdict(set)
+        for r in query_all("SELECT airline_name, flight_number, holder FROM seat_hold WHERE expires_at>%s", (now,)):
+            snapshot[(r["airline_name"], r["flight_number"])].add(r["holder"])
+        with self._lock:
+            self._snapshot, self._loaded_at = snapshot, time.monotonic()
+        return snapshot
+
+    def held_by_others(self, key, holder, now):
+        row = query_one(
+            """
+            SELECT COUNT(*) AS n FROM seat_hold
+            WHERE airline_name=%s AND flight_number=%s AND holder<>%s AND expires_at>%s
+            """,
+            (*key, holder, now),
+        )
+        return row["n"] if row else 0
+
+    def release(self, key, holder):
+        with get_db().cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM seat_hold WHERE airline_name=%s AND flight_number=%s AND holder=%s", (*key, holder)
+            )
+        self._loaded_at = 0.0
+
+    def sweep(self, now, batch_size):
+        db = get_db()
+        total = 0
+        while True:
+            keys = [
+                (r["airline_name"], r["flight_number"], r["holder"])
+                for r in query_all(
+                    "SELECT airline_name, flight_number, holder FROM seat_hold WHERE expires_at<=%s LIMIT %s",
+                    (now, batch_size),
+                )
+            ]
+            if not keys:
+                break
+            with db.cursor() as cursor:
+                # 删除时再核对一次 expires_at：两步之间被续期的不删
+                total += cursor.execute(
+                    "DELETE FROM seat_hold WHERE expires_at<=%s AND (airline_name, flight_number, holder) IN "
+                    f"({', '.join(['(%s, %s, %s)'] * len(keys))})",
+                    (now, *[v for key in keys for v in key]),
+                )
+            if len(keys) < batch_size:
+                break
+        if total:
+            self._loaded_at = 0.0
+        return total
+
+
+STORES = {"memory": MemoryHoldStore, "db": DbHoldStore}
+
+
+def get_store():
+    return current_app.extensions["seat_holds"]
+
+
+def take(airline_name, flight_number, holder):
+    """
+    Hold one seat on the flight for `holder` (renews an existing hold).
+    Returns the expiry datetime, or None when every remaining seat is held by someone else.
+    """
+    now = _now()
+    expires_at = now + timedelta(seconds=current_app.config.get("SEAT_HOLD_TTL", 600))
+    if get_store().take((airline_name, flight_number), holder, expires_at, now):
+        return expires_at
+    return None
+
+
+def held_by_others(airline_name, flight_number, holder):
+    """Live holds on the flight that belong to someone other than `holder`."""
+    return get_store().held_by_others((airline_name, flight_number), holder, _now())
+
+
+def release(airline_name, flight_number, holder):
+    get_store().release((airline_name, flight_number), holder)
+
+
+def held_counts(holder=None):
+    """{(airline_name, flight_number): live holds not belonging to `holder`} (search_index held=)."""
+    counts = {}
+    for key, holders in get_store().snapshot(_now()).items():
+        n = len(holders - {holder}) if holder else len(holders)
+        if n:
+            counts[key] = n
+    return counts
+
+
+def apply_to(flights, holder=None, counts=None):
+    """Subtract other people's live holds from remaining_seats of each flight row (in place)."""
+    counts = held_counts(holder) if counts is None else counts
+    if not counts:
+        return flights
+    for f in flights:
+        held = counts.get((f["airline_name"], f["flight_number"]))
+        if held:
+            f["remaining_seats"] = max(0, (f.get("remaining_seats") or 0) - held)
+    return flights
+
+
+def sweep(now=None, batch_size=None):
+    """Delete expired holds batch by batch; returns how many were removed."""
+    config = current_app.config
+    return get_store().sweep(now or _now(), batch_size or config.get("SEAT_HOLD_SWEEP_BATCH", 1000))
+
+
+def init_seat_holds(app):
+    name = app.config.get("SEAT_HOLD_STORE", "db")
+    if name not in STORES:
+        raise ValueError(f"Unknown SEAT_HOLD_STORE {name!r}; expected one of {', '.join(STORES)}")
+    app.extensions["seat_holds"] = STORES[name](app.config)
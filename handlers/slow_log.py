@@ -0,0 +1,197 @@
+"""
+慢 SQL 日志。
+
+超过 SLOW_QUERY_MS 的语句 (metrics.on_slow_query 钩子) 写一行 JSON 到
+SLOW_LOG_PATH (按大小轮转)：规范化 SQL、参数类型、所在路由、耗时，
+以及限频抓取的 EXPLAIN FORMAT=JSON 执行计划。汇总：
+
+    flask --app app db slow-queries --top 10
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+import click
+import pymysql.cursors
+from flask import current_app, has_request_context, request
+
+from .metrics import fingerprint, normalize_sql, on_slow_query
+
+logger = logging.getLogger("airbooking.slow_queries")
+logger.propagate = False
+
+_EXPLAINABLE = ("SELECT", "WITH")
+
+
+class ExplainLimiter:
+    """At most one plan per fingerprint per `interval` s, and `per_minute` plans overall."""
+
+    def __init__(self, interval=300, per_minute=10):
+        self.interval = interval
+        self.per_minute = per_minute
+        self._lock = threading.Lock()
+        self._last = {}
+        self._window = []
+
+    def allow(self, fp, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._window = [t for t in self._window if now - t < 60]
+            if len(self._window) >= self.per_minute:
+                return False
+            last = self._last.get(fp)
+            if last is not None and now - last < self.interval:
+                return False
+            self._last[fp] = now
+            self._window.append(now)
+            if len(self._last) > 10000:
+                self._last.clear()
+            return True
+
+
+def param_shapes(args):
+    """Types of the bound parameters (values are never logged)."""
+    if args is None:
+        return None
+    if isinstance(args, dict):
+        return {k: param_shapes(v) if isinstance(v, (list, tuple)) else type(v).__name__ for k, v in args.items()}
+    if isinstance(args, (list, tuple)):
+        return [f"{type(a).__name__}[{len(a)}]" if isinstance(a, (list, tuple)) else type(a).__name__ for a in args]
+    return type(args).__name__
+
+
+def _explain(connection, sql, args):
+    # 用普通 DictCursor，不再经过计时钩子
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute("EXPLAIN FORMAT=JSON " + sql, args)
+        row = cursor.fetchone() or {}
+    plan = row.get("EXPLAIN")
+    return json.loads(plan) if plan else None
+
+
+_limiter = ExplainLimiter()
+
+
+def _on_slow_query(sql, args, seconds, connection):
+    if isinstance(sql, (bytes, bytearray)):
+        sql_text = None  # executemany 拼好的多行 INSERT，只记规范化文本
+    else:
+        sql_text = sql
+    normalized = normalize_sql(sql)
+    fp = fingerprint(normalized)
+    entry = {
+        "ts": datetime.now().isoformat(timespec="seconds"),
+        "fingerprint": fp,
+        "duration_ms": round(seconds * 1000, 2),
+        "sql": normalized,
+        "params": param_shapes(args),
+        "endpoint": request.endpoint if has_request_context() else None,
+        "method": request.method if has_request_context() else None,
+        "path": request.path if has_request_context() else None,
+        "plan": None,
+    }
+    if (
+        connection is not None
+        and sql_text
+        and sql_text.lstrip().upper().startswith(_EXPLAINABLE)
+        and _limiter.allow(fp)
+    ):
+        try:
+            entry["plan"] = _explain(connection, sql_text, args)
+        except Exception as e:
+            entry["plan_error"] = str(e)
+    logger.warning(json.dumps(entry, default=str, ensure_ascii=False))
+
+
+def init_slow_log(app):
+    """Attach the rotating file handler; SLOW_LOG_PATH='' disables the log."""
+    global _limiter
+    path = app.config.get("SLOW_LOG_PATH")
+    if not path or logger.handlers:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=app.config.get("SLOW_LOG_MAX_BYTES", 10 * 1024 * 1024),
+        backupCount=app.config.get("SLOW_LOG_BACKUPS", 5),
+        encoding="utf-8",
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.WARNING)
+    _limiter = ExplainLimiter(
+        app.config.get("SLOW_LOG_EXPLAIN_INTERVAL", 300),
+        app.config.get("SLOW_LOG_EXPLAINS_PER_MINUTE", 10),
+    )
+    on_slow_query(_on_slow_query)
+
+
+# ---------- 汇总 ----------
+
+def _plan_tables(node, found):
+    """Collect (table, access_type, rows_examined) from an EXPLAIN FORMAT=JSON tree."""
+    if isinstance(node, dict):
+        if "table_name" in node and "access_type" in node:
+            found.append((node["table_name"], node["access_type"], node.get("rows_examined_per_scan")))
+        for value in node.values():
+            _plan_tables(value, found)
+    elif isinstance(node, list):
+        for value in node:
+            _plan_tables(value, found)
+    return found
+
+
+def summarize(path):
+    """Aggregate the log (and its rotated files) by fingerprint, heaviest total time first."""
+    stats = {}
+    for filename in sorted(glob.glob(path + ".*")) + [path]:
+        if not os.path.exists(filename):
+            continue
+        with open(filename, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                s = stats.setdefault(entry["fingerprint"], {
+                    "sql": entry["sql"], "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "endpoints": set(), "plan": None,
+                })
+                s["count"] += 1
+                s["total_ms"] += entry["duration_ms"]
+                s["max_ms"] = max(s["max_ms"], entry["duration_ms"])
+                if entry.get("endpoint"):
+                    s["endpoints"].add(entry["endpoint"])
+                if entry.get("plan"):
+                    s["plan"] = entry["plan"]
+    return sorted(stats.items(), key=lambda kv: -kv[1]["total_ms"])
+
+
+@click.command("slow-queries")
+@click.option("--top", default=10, show_default=True, help="Number of statements to show.")
+@click.option("--path", default=None, help="Log file (defaults to SLOW_LOG_PATH).")
+def slow_queries_command(top, path):
+    """Summarize the slow-query log: top statements by total time."""
+    path = path or current_app.config.get("SLOW_LOG_PATH")
+    if not path:
+        raise click.UsageError("SLOW_LOG_PATH is not set; pass --path.")
+    rows = summarize(path)
+    if not rows:
+        click.echo("No slow queries logged.")
+        return
+    for fp, s in rows[:top]:
+        click.echo(f"{fp}  total={s['total_ms']:.0f}ms count={s['count']} "
+                   f"avg={s['total_ms'] / s['count']:.1f}ms max={s['max_ms']:.1f}ms")
+        click.echo(f"    routes: {', '.join(sorted(s['endpoints'])) or '-'}")
+        click.echo(f"    {s['sql'][:300]}")
+        if s["plan"]:
+            tables = _plan_tables(s["plan"], [])
+            scans = [f"{t}({examined})" for t, access, examined in tables if access == "ALL"]
+            click.echo(f"    plan: {', '.join(f'{t}:{a}' for t, a, _ in tables)}")
+            if scans:
+                click.echo(f"    FULL SCAN: {', '.join(scans)}")
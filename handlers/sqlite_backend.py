@@ -0,0 +1,477 @@
+"""
+嵌入式 SQLite 后端 (DB_BACKEND=sqlite)，本地无 MySQL 时运行整个应用、基准和并发测试。
+
+SQLiteConnection / 游标模仿 pymysql 的接口 (DictCursor 行、execute 返回行数、
+begin / commit / rollback / ping)，handlers 里的代码不用改：
+
+- SQL 方言在执行前改写 (translate，带缓存)：%s / %(name)s 占位符，
+  NOW() / CURDATE() / DATE_SUB / DATE_ADD / DATE_FORMAT / YEAR / MONTH，
+  INSERT IGNORE，ON DUPLICATE KEY UPDATE，FOR UPDATE，GREATEST / LEAST / CONCAT / IF
+- datetime / date / numeric 列读出来是 datetime / date / Decimal，和 pymysql 一致
+- sqlite3 的错误转换成对应错误码的 pymysql.err 异常 (1062 重复键、1452 外键、
+  1205 锁等待超时、1644 触发器报错)，重试 / 提示逻辑照常工作
+- begin() 用 BEGIN IMMEDIATE 直接拿写锁，同一时刻只有一个写事务 (WAL 下读不受影响)
+
+表结构和触发器的 SQLite 版本在 db_sql/sqlite/ 和 db_sql/migrations/sqlite/；
+数据库文件不存在时自动建表、导入 basic_info.sql 的种子数据并执行迁移。
+"""
+import os
+import re
+import sqlite3
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+import pymysql.cursors
+import pymysql.err
+
+from .metrics import record_query
+
+SQLITE_SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db_sql", "sqlite")
+BASIC_INFO_SQL = os.path.join(os.path.dirname(SQLITE_SQL_DIR), "basic_info.sql")
+
+
+# ---------- 类型转换 ----------
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_DATETIME_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2})(:\d{2})?(\.\d+)?$")
+_CENT = Decimal("0.01")
+
+
+def _parse_datetime(text):
+    if _DATE_RE.match(text):
+        return datetime.strptime(text, "%Y-%m-%d")
+    m = _DATETIME_RE.match(text)
+    if not m:
+        return text
+    return datetime.strptime(f"{m.group(1)} {m.group(2)}{m.group(3) or ':00'}", "%Y-%m-%d %H:%M:%S")
+
+
+def _parse_date(text):
+    try:
+        return datetime.strptime(text[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return text
+
+
+# 按声明类型转换 (PARSE_DECLTYPES)；schema 中的 numeric 都是两位小数
+sqlite3.register_converter("DATETIME", lambda b: _parse_datetime(b.decode()))
+sqlite3.register_converter("DATE", lambda b: _parse_date(b.decode()))
+sqlite3.register_converter("NUMERIC", lambda b: Decimal(b.decode()).quantize(_CENT))
+
+
+def _coerce(value):
+    # 表达式列 (DATE(x)、MAX(departure_time) ...) 没有声明类型，按格式识别
+    if type(value) is str and len(value) in (10, 19):
+        if _DATE_RE.match(value):
+            return _parse_date(value)
+        if _DATETIME_RE.match(value):
+            return _parse_datetime(value)
+    return value
+
+
+def _dict_row(cursor, row):
+    # 与 pymysql DictCursor 一样，重名列保留第一个
+    out = {}
+    for column, value in zip(cursor.description, row):
+        if column[0] not in out:
+            out[column[0]] = _coerce(value)
+    return out
+
+
+def _adapt(value):
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, str) and len(value) >= 16:
+        # 表单里的 datetime-local ("2025-12-01T08:30")，MySQL 会自己转换
+        m = _DATETIME_RE.match(value)
+        if m:
+            return f"{m.group(1)} {m.group(2)}{m.group(3) or ':00'}"
+    return value
+
+
+def _params(args):
+    if args is None:
+        return ()
+    if isinstance(args, dict):
+        return {k: _adapt(v) for k, v in args.items()}
+    if isinstance(args, (list, tuple)):
+        return [_adapt(v) for v in args]
+    return [_adapt(args)]
+
+
+# ---------- 方言改写 ----------
+
+_LITERAL_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"", re.S)
+_PLACEHOLDER_RE = re.compile(r"%%|%\((\w+)\)s|%s")
+_MASK_RE = re.compile(r"\x00(\d+)\x00")
+_CALL_RE = re.compile(
+    r"\b(NOW|CURDATE|SYSDATE|DATE_SUB|DATE_ADD|DATE_FORMAT|YEAR|MONTH|DAY|HOUR|GREATEST|LEAST|CONCAT|IF)\s*\(",
+    re.I,
+)
+_INTERVAL_RE = re.compile(r"^INTERVAL\s+(.+?)\s+(SECOND|MINUTE|HOUR|DAY|WEEK|MONTH|YEAR)S?$", re.I | re.S)
+_KEYWORDS = [
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.I), "INSERT OR IGNORE"),
+    (re.compile(r"\s+FOR\s+UPDATE\b", re.I), ""),
+    (re.compile(r"\s+LOCK\s+IN\s+SHARE\s+MODE\b", re.I), ""),
+    (re.compile(r"\bCURRENT_TIMESTAMP(\s*\(\s*\))?", re.I), "datetime('now','localtime')"),
+    (re.compile(r"\bCURRENT_DATE(\s*\(\s*\))?", re.I), "date('now','localtime')"),
+]
+_UPSERT_RE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.I)
+_VALUES_FN_RE = re.compile(r"\bVALUES\s*\(\s*`?(\w+)`?\s*\)", re.I)
+_FORMAT_SPECS = {"%Y": "%Y", "%m": "%m", "%d": "%d", "%H": "%H", "%i": "%M", "%s": "%S", "%S": "%S",
+                 "%j": "%j", "%T": "%H:%M:%S", "%%": "%%"}
+
+
+def _split_args(text):
+    args, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            args.append(text[start:i].strip())
+            start = i + 1
+    args.append(text[start:].strip())
+    return [a for a in args if a] if len(args) > 1 or args[0] else []
+
+
+def _interval(arg, sign):
+    m = _INTERVAL_RE.match(arg)
+    if not m:
+        raise ValueError(f"unsupported INTERVAL: {arg}")
+    amount, unit = m.group(1), m.group(2).lower()
+    if unit == "week":
+        unit, amount = "day", f"({amount})*7" if not amount.isdigit() else str(int(amount) * 7)
+    if amount.lstrip("-").isdigit():
+        return f"'{sign}{int(amount)} {unit}s'".replace("--", "+")
+    return f"printf('%d {unit}s', {sign}({amount}))"
+
+
+def _call(name, args, literals):
+    name = name.upper()
+    if name in ("NOW", "SYSDATE"):
+        return "datetime('now','localtime')"
+    if name == "CURDATE":
+        return "date('now','localtime')"
+    if name in ("DATE_SUB", "DATE_ADD"):
+        base, modifier = args[0], _interval(args[1], "-" if name == "DATE_SUB" else "")
+        # CURDATE() 的结果还是 DATE
+        fn = "date" if base.startswith("date(") else "datetime"
+        return f"{fn}({base}, {modifier})"
+    if name == "DATE_FORMAT":
+        m = _MASK_RE.fullmatch(args[1])
+        fmt = literals[int(m.group(1))][1:-1] if m else None
+        if fmt is None:
+            raise ValueError("DATE_FORMAT needs a literal format")
+        fmt = re.sub(r"%.", lambda s: _FORMAT_SPECS.get(s.group(0), s.group(0)), fmt)
+        literals.append(f"'{fmt}'")
+        return f"strftime(\x00{len(literals) - 1}\x00, {args[0]})"
+    if name in ("YEAR", "MONTH", "DAY", "HOUR"):
+        spec = {"YEAR": "%Y", "MONTH": "%m", "DAY": "%d", "HOUR": "%H"}[name]
+        return f"CAST(strftime('{spec}', {args[0]}) AS INTEGER)"
+    if name == "GREATEST":
+        return f"max({', '.join(args)})"
+    if name == "LEAST":
+        return f"min({', '.join(args)})"
+    if name == "CONCAT":
+        return "(" + " || ".join(args) + ")"
+    if name == "IF":
+        return f"(CASE WHEN {args[0]} THEN {args[1]} ELSE {args[2]} END)"
+    raise ValueError(name)
+
+
+def _rewrite_calls(text, literals):
+    out, pos = [], 0
+    while True:
+        m = _CALL_RE.search(text, pos)
+        if not m:
+            out.append(text[pos:])
+            return "".join(out)
+        depth, end = 1, m.end()
+        while depth and end < len(text):
+            depth += {"(": 1, ")": -1}.get(text[end], 0)
+            end += 1
+        inner = _rewrite_calls(text[m.end():end - 1], literals)
+        out.append(text[pos:m.start()])
+        out.append(_call(m.group(1), _split_args(inner), literals))
+        pos = end
+
+
+@lru_cache(maxsize=2048)
+def translate(sql, formatted=True):
+    """
+    MySQL statement -> SQLite. formatted: args were passed, so (like pymysql)
+    %s / %(name)s are placeholders and %% is a literal percent sign.
+    """
+    literals = []
+
+    def mask(m):
+        text = m.group(0)
+        if text[0] == '"':
+            # MySQL 的双引号是字符串
+            text = "'" + text[1:-1].replace('\\"', '"').replace("'", "''") + "'"
+        else:
+            text = text.replace("\\'", "''")
+        if formatted:
+            text = text.replace("%%", "%")
+        literals.append(text)
+        return f"\x00{len(literals) - 1}\x00"
+
+    text = _LITERAL_RE.sub(mask, sql)
+    if formatted:
+        text = _PLACEHOLDER_RE.sub(
+            lambda m: "%" if m.group(0) == "%%" else (":" + m.group(1) if m.group(1) else "?"), text
+        )
+    for pattern, repl in _KEYWORDS:
+        text = pattern.sub(repl, text)
+    text = _rewrite_calls(text, literals)
+    m = _UPSERT_RE.search(text)
+    if m:
+        tail = _VALUES_FN_RE.sub(r"excluded.\1", text[m.end():])
+        text = text[:m.start()] + "ON CONFLICT DO UPDATE SET" + tail
+    return _MASK_RE.sub(lambda m: literals[int(m.group(1))], text)
+
+
+# ---------- 错误 ----------
+
+def _mysql_error(e):
+    """sqlite3 error -> the pymysql.err exception MySQL would have raised."""
+    msg = str(e)
+    if isinstance(e, sqlite3.IntegrityError):
+        if "UNIQUE" in msg or "PRIMARY KEY" in msg:
+            return pymysql.err.IntegrityError(1062, f"Duplicate entry: {msg}")
+        if "FOREIGN KEY" in msg:
+            return pymysql.err.IntegrityError(1452, f"Cannot add or update a child row: {msg}")
+        if "NOT NULL" in msg:
+            return pymysql.err.IntegrityError(1048, msg)
+        if "CHECK" in msg:
+            return pymysql.err.OperationalError(3819, msg)
+        # 触发器里的 RAISE(ABORT, ...)，对应 MySQL 的 SIGNAL SQLSTATE '45000'
+        return pymysql.err.OperationalError(1644, msg)
+    if isinstance(e, sqlite3.OperationalError):
+        if "locked" in msg or "busy" in msg:
+            return pymysql.err.OperationalError(1205, f"Lock wait timeout exceeded: {msg}")
+        if "no such table" in msg:
+            return pymysql.err.ProgrammingError(1146, msg)
+        if "syntax error" in msg or "no such" in msg:
+            return pymysql.err.ProgrammingError(1064, msg)
+        return pymysql.err.OperationalError(2013, msg)
+    if isinstance(e, sqlite3.ProgrammingError):
+        return pymysql.err.ProgrammingError(1064, msg)
+    return pymysql.err.InternalError(1815, msg)
+
+
+# ---------- 连接 / 游标 ----------
+
+class SQLiteCursor:
+    """Buffered DictCursor look-alike; stream=True leaves rows on the sqlite cursor (SSCursor)."""
+
+    def __init__(self, connection, stream=False):
+        self.connection = connection
+        self._stream = stream
+        self._cursor = None
+        self._rows = []
+        self._pos = 0
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+
+    def _run(self, query, args, many=False):
+        sql = translate(query, args is not None)
+        t0 = time.perf_counter()
+        try:
+            if many:
+                cursor = self.connection._raw.executemany(sql, [_params(a) for a in args])
+            else:
+                cursor = self.connection._raw.execute(sql, _params(args))
+            self.description = cursor.description
+            self.lastrowid = cursor.lastrowid
+            if cursor.description is None:
+                self._rows, self._pos, self.rowcount = [], 0, cursor.rowcount
+            elif self._stream:
+                self._cursor, self.rowcount = cursor, -1
+            else:
+                self._rows, self._pos = cursor.fetchall(), 0
+                self.rowcount = len(self._rows)
+        except sqlite3.Error as e:
+            record_query(query, time.perf_counter() - t0, 0, error=True, args=args)
+            raise _mysql_error(e) from e
+        # connection=None: 慢 SQL 日志不对 SQLite 抓 EXPLAIN FORMAT=JSON
+        record_query(query, time.perf_counter() - t0, max(self.rowcount, 0), args=args)
+        return self.rowcount
+
+    def execute(self, query, args=None):
+        return self._run(query, args)
+
+    def executemany(self, query, args):
+        args = list(args)
+        if not args:
+            return 0
+        return self._run(query, args, many=True)
+
+    def fetchone(self):
+        if self._cursor is not None:
+            return self._cursor.fetchone()
+        if self._pos >= len(self._rows):
+            return None
+        self._pos += 1
+        return self._rows[self._pos - 1]
+
+    def fetchmany(self, size=1):
+        if self._cursor is not None:
+            return self._cursor.fetchmany(size)
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+    def fetchall(self):
+        if self._cursor is not None:
+            return self._cursor.fetchall()
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        if self._cursor is not None:
+            self._cursor.close()
+            self._cursor = None
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SQLiteConnection:
+    """The subset of pymysql.Connection the app uses (autocommit unless begin() is called)."""
+
+    def __init__(self, path, timeout=10.0):
+        self._raw = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+        )
+        self._raw.row_factory = _dict_row
+        self._raw.execute("PRAGMA journal_mode=WAL")
+        self._raw.execute("PRAGMA synchronous=NORMAL")
+        self._raw.execute("PRAGMA foreign_keys=ON")
+        self.open = True
+
+    def cursor(self, cursor=None):
+        stream = cursor is not None and issubclass(cursor, pymysql.cursors.SSCursor)
+        return SQLiteCursor(self, stream=stream)
+
+    def _exec(self, statement):
+        try:
+            self._raw.execute(statement)
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def begin(self):
+        if self._raw.in_transaction:
+            # MySQL: BEGIN 会先隐式提交当前事务
+            self._exec("COMMIT")
+        self._exec("BEGIN IMMEDIATE")
+
+    def commit(self):
+        if self._raw.in_transaction:
+            self._exec("COMMIT")
+
+    def rollback(self):
+        if self._raw.in_transaction:
+            self._exec("ROLLBACK")
+
+    def ping(self, reconnect=False):
+        self._exec("SELECT 1")
+
+    def close(self):
+        if self.open:
+            self.open = False
+            self._raw.close()
+
+
+class SQLiteBackend:
+    name = "sqlite"
+
+    def __init__(self, config):
+        self.path = config.get("SQLITE_PATH") or os.path.join("data", "bookingsystem.sqlite3")
+        self.timeout = float(config.get("SQLITE_BUSY_TIMEOUT", 10))
+
+    def connect(self):
+        return SQLiteConnection(self.path, self.timeout)
+
+    def prepare(self, app):
+        """First run: create the schema, load the seed data and apply the migrations."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self.connect()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) AS n FROM sqlite_master WHERE type='table' AND name='flight'")
+                if cursor.fetchone()["n"]:
+                    return
+            print(f"Creating SQLite database at {self.path}")
+            load_basic_schema(conn)
+        finally:
+            conn.close()
+
+        from .migrations import migrate
+        from .rollups import rebuild_rollups
+        with app.app_context():
+            migrate()
+            # 种子数据在汇总表触发器之前导入，回填一次
+            rebuild_rollups()
+
+
+def _run_script(conn, path, transform=None):
+    from .migrations import split_sql_script
+
+    with open(path, encoding="utf-8") as f:
+        statements = split_sql_script(f.read())
+    with conn.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(transform(statement) if transform else statement)
+
+
+_SEED_DATE_RE = re.compile(r"""(["'])(\d{4})(\d{2})(\d{2})\1""")
+_SEED_MINUTES_RE = re.compile(r"""(["'])(\d{4}-\d{2}-\d{2} \d{2}:\d{2})\1""")
+
+
+def _seed_statement(statement):
+    # 种子数据里 MySQL 会自动转换的写法: "20300501" 日期、不带秒的时间
+    statement = _SEED_DATE_RE.sub(r"'\2-\3-\4'", statement)
+    return _SEED_MINUTES_RE.sub(r"'\2:00'", statement)
+
+
+def load_basic_schema(conn):
+    """SQLite equivalent of running basic_info.sql then add_flight_capacity_trigger.sql."""
+    conn.begin()
+    try:
+        _run_script(conn, os.path.join(SQLITE_SQL_DIR, "basic_schema.sql"))
+        # 种子数据直接取 basic_info.sql 里的 INSERT (与 MySQL 一样在建触发器之前导入)
+        _run_script(
+            conn, BASIC_INFO_SQL,
+            lambda s: _seed_statement(s) if s.lstrip().upper().startswith("INSERT") else "SELECT 1",
+        )
+        with conn.cursor() as cursor:
+            # DATE_SUB(CURDATE(), ...) 写进 datetime 列时 MySQL 补 00:00:00
+            cursor.execute(
+                "UPDATE purchases SET purchase_date = purchase_date || ' 00:00:00' "
+                "WHERE length(purchase_date) = 10"
+            )
+        _run_script(conn, os.path.join(SQLITE_SQL_DIR, "add_flight_capacity_trigger.sql"))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, session, flash, redirect, url_for, jsonify
+from flask import Blueprint, current_app, render_template, request, session, flash, redirect, url_for, jsonify
 from datetime import datetime, timedelta
 
 from .utils import (
@@ -7,17 +7,18 @@ from .utils import (
     query_all,
     query_one,
     execute_sql,
+    date_range,
+    stream_query,
 )
+from . import airport_resolver, cache, exports, flight_events, flight_import, identity, lifecycle, pagination, schedules, search_index
+from .cache import cached_json_response
 
 staff_bp = Blueprint("staff", __name__)
 
 
 def _get_staff_and_airline():
-    """Helper: return (staff_row_or_None, airline_name_or_None)."""
-    username = session.get("user_id")
-    if not username:
-        return None, session.get("airline_name")
-    staff = query_one("SELECT * FROM staff WHERE username=%s", (username,))
+    """Helper: return (staff_identity_or_None, airline_name_or_None) from the identity cache."""
+    staff = identity.current_staff()
     airline_name = staff["airline_name"] if staff and staff.get("airline_name") else session.get("airline_name")
     return staff, airline_name
 
@@ -28,6 +29,9 @@ def check_staff_access():
     if session.get("role") not in ["staff", "admin", "operator"]:
         # You may want to redirect or abort here in real app.
         pass
+    # 刷新 session 里的航司 / 权限副本 (缓存命中时不查库)，staff_permission_required 读的是它
+    if session.get("user_role") == "staff":
+        identity.current_staff()
 
 
 @staff_bp.route("/dashboard")
@@ -35,18 +39,13 @@ def check_staff_access():
 def dashboard():
     staff, airline_name = _get_staff_and_airline()
 
-    permissions = []
-    if staff:
-        # Query the permission table (assuming standard schema: username, permission_type)
-        p_rows = query_all("SELECT permission_type FROM permission WHERE username=%s", (staff['username'],))
-        permissions = [r['permission_type'] for r in p_rows]
+    # Permissions come with the cached identity (no permission table query)
+    permissions = staff["permissions"] if staff else []
 
-    # Updated SQL to include city names
+    # City names come from the flight_search read model
     sql = """
-        SELECT f.*, da.city AS dep_city, aa.city AS arr_city
-        FROM flight f
-        LEFT JOIN airport da ON f.departure_airport = da.name
-        LEFT JOIN airport aa ON f.arrival_airport = aa.name
+        SELECT f.*
+        FROM flight_search f
         WHERE f.airline_name = %s
           AND f.departure_time BETWEEN NOW() AND DATE_ADD(NOW(), INTERVAL 30 DAY)
     """
@@ -58,45 +57,81 @@ def dashboard():
     origin = request.args.get("origin")
     dest = request.args.get("destination")
 
-    if start_date:
-        sql += " AND f.departure_time >= %s"
-        params.append(start_date)
-    if end_date:
-        sql += " AND f.departure_time <= %s"
-        params.append(end_date)
+    conds, date_params = date_range("f.departure_time", start_date, end_date)
+    for cond in conds:
+        sql += " AND " + cond
+    params.extend(date_params)
     if origin:
-        sql += " AND (f.departure_airport LIKE %s OR da.city LIKE %s OR da.city IN (SELECT ca.city_name FROM city_alias ca WHERE ca.alias_name = %s))"
-        params.extend([f"%{origin}%", f"%{origin}%", origin])
+        clause, codes = airport_resolver.in_clause("f.departure_airport", origin)
+        sql += " AND " + clause
+        params.extend(codes)
     if dest:
-        sql += " AND (f.arrival_airport LIKE %s OR aa.city LIKE %s OR aa.city IN (SELECT ca.city_name FROM city_alias ca WHERE ca.alias_name = %s))"
-        params.extend([f"%{dest}%", f"%{dest}%", dest])
+        clause, codes = airport_resolver.in_clause("f.arrival_airport", dest)
+        sql += " AND " + clause
+        params.extend(codes)
 
     sql += " ORDER BY f.departure_time ASC"
 
     flights = query_all(sql, tuple(params))
     return render_template("staff_dashboard.html", flights=flights, airline_name=airline_name, permissions=permissions)
 
+_PASSENGERS_SQL = """
+    SELECT c.name, c.email, t.ticket_ID, p.purchase_date, p.agent_email
+    FROM ticket t
+    JOIN purchases p ON t.ticket_ID = p.ticket_ID
+    JOIN customer c ON p.customer_email = c.email
+    WHERE t.airline_name = %s AND t.flight_number = %s
+"""
+
+# staff.passengers 左侧的航班列表 (按 FLIGHTS_BY_DEPARTURE 翻页)
+_PASSENGER_FLIGHTS_SQL = "SELECT * FROM flight f WHERE f.airline_name = %s"
+
 @staff_bp.route("/passengers", methods=["GET", "POST"])
 @login_required(role="staff")
 def passengers():
     _, airline_name = _get_staff_and_airline()
     selected_flight_num = request.args.get("flight_number") or request.form.get("flight_number")
     passengers_list = []
+    passenger_next = flight_next = None
+    size = pagination.page_size(request.args.get("limit"))
+    # 翻页链接带上当前的 limit 和另一个列表的游标，翻一个列表时另一个停在原处
+    page_args = {
+        "flight_number": selected_flight_num,
+        "limit": request.args.get("limit"),
+        "passenger_cursor": request.args.get("passenger_cursor"),
+        "flight_cursor": request.args.get("flight_cursor"),
+    }
+
+    # 两个列表各自分页: ?passenger_cursor= 翻乘客, ?flight_cursor= 翻航班
+    try:
+        passenger_after = pagination.TICKETS.where(request.args.get("passenger_cursor"))
+        flight_after = pagination.FLIGHTS_BY_DEPARTURE.where(request.args.get("flight_cursor"))
+    except pagination.InvalidCursor as e:
+        flash(str(e))
+        passenger_after = flight_after = (None, [])
 
     if selected_flight_num:
         # Fetch passengers for this flight by joining through purchases
-        sql = """
-            SELECT c.name, c.email, t.ticket_ID
-            FROM ticket t
-            JOIN purchases p ON t.ticket_ID = p.ticket_ID
-            JOIN customer c ON p.customer_email = c.email
-            WHERE t.airline_name = %s AND t.flight_number = %s
-        """
-        passengers_list = query_all(sql, (airline_name, selected_flight_num))
+        sql = _PASSENGERS_SQL
+        params = [airline_name, selected_flight_num]
+        if passenger_after[0]:
+            sql += " AND " + passenger_after[0]
+            params.extend(passenger_after[1])
+        sql += pagination.TICKETS.order_limit(size)
+        passengers_list, cursor = pagination.TICKETS.page(query_all(sql, tuple(params)), size)
+        if cursor:
+            passenger_next = url_for("staff.passengers", **{**page_args, "passenger_cursor": cursor})
 
     # Always fetch the list of flights so the user can switch/select
-    flights_sql = "SELECT * FROM flight WHERE airline_name = %s ORDER BY departure_time DESC LIMIT 50"
-    flights = query_all(flights_sql, (airline_name,))
+    flights_sql = _PASSENGER_FLIGHTS_SQL
+    params = [airline_name]
+    if flight_after[0]:
+        flights_sql += " AND " + flight_after[0]
+        params.extend(flight_after[1])
+    flights_sql += pagination.FLIGHTS_BY_DEPARTURE.order_limit(size)
+    flights, cursor = pagination.FLIGHTS_BY_DEPARTURE.page(query_all(flights_sql, tuple(params)), size)
+    if cursor:
+        flight_next = url_for("staff.passengers", **{**page_args, "flight_cursor": cursor})
 
     return render_template(
         "staff_passengers.html",
@@ -104,6 +139,8 @@ def passengers():
         passengers=passengers_list,
         selected_flight=selected_flight_num,
         airline_name=airline_name,
+        flight_next=flight_next,
+        passenger_next=passenger_next,
     )
 
 @staff_bp.route("/customer_flights")
@@ -114,42 +151,117 @@ def customer_flights():
     return render_template("staff_customer_flights.html", airline_name=airline_name)
 
 
-@staff_bp.route("/api/customer_flights")
-@login_required(role="staff")
-def api_customer_flights():
-    """API to fetch flight history. If customer_email provided, filter by it. Else show recent."""
-    _, airline_name = _get_staff_and_airline()
-    customer_email = request.args.get("customer_email", "").strip()
-    
-    # Modified SQL to handle optional customer_email and include it in result
-    sql = """
-        SELECT t.ticket_ID, f.flight_number, f.departure_airport, f.arrival_airport, 
-               f.departure_time, f.arrival_time, f.status,
-               da.city AS dep_city, aa.city AS arr_city,
-               p.customer_email
-        FROM purchases p
-        JOIN ticket t ON p.ticket_ID = t.ticket_ID
-        JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
-        LEFT JOIN airport da ON f.departure_airport = da.name
-        LEFT JOIN airport aa ON f.arrival_airport = aa.name
-        WHERE f.airline_name = %s
+def _customer_flights_query(airline_name, customer_email, archived=None):
+    """
+    (sql, params, keyset) for tickets sold on this airline, optionally for one customer; no ORDER BY.
+    archived: read sales_history (live + archived flights); None = whenever anything has been archived.
     """
+    if archived is None:
+        # 这个列表没有日期筛选，总是从最早的记录算起
+        archived = lifecycle.reaches_archive(None)
+    if archived:
+        sql = lifecycle.HISTORY_SELECT + " WHERE s.airline_name = %s"
+        p = "s"
+        keyset = pagination.TICKETS_BY_DEPARTURE.over("s")
+    else:
+        # Modified SQL to handle optional customer_email and include it in result
+        sql = """
+            SELECT t.ticket_ID, f.flight_number, f.departure_airport, f.arrival_airport, 
+                   f.departure_time, f.arrival_time, f.status,
+                   f.dep_city, f.arr_city,
+                   p.customer_email
+            FROM purchases p
+            JOIN ticket t ON p.ticket_ID = t.ticket_ID
+            JOIN flight_search f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
+            WHERE f.airline_name = %s
+        """
+        p = "p"
+        keyset = pagination.TICKETS_BY_DEPARTURE
     params = [airline_name]
 
     if customer_email:
-        sql += " AND p.customer_email = %s"
+        sql += f" AND {p}.customer_email = %s"
         params.append(customer_email)
+    return sql, params, keyset
 
-    sql += " ORDER BY f.departure_time DESC LIMIT 50"
 
-    flights = query_all(sql, tuple(params))
+@staff_bp.route("/api/customer_flights")
+@login_required(role="staff")
+def api_customer_flights():
+    """
+    API to fetch flight history. If customer_email provided, filter by it. Else show recent.
+    Paged with ?cursor= / ?limit=; the next cursor is in the X-Next-Cursor header.
+    """
+    _, airline_name = _get_staff_and_airline()
+    customer_email = request.args.get("customer_email", "").strip()
+    size = pagination.page_size(request.args.get("limit"))
+    sql, params, keyset = _customer_flights_query(airline_name, customer_email)
+
+    try:
+        after, after_params = keyset.where(request.args.get("cursor"))
+    except pagination.InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+    if after:
+        sql += " AND " + after
+        params.extend(after_params)
+    sql += keyset.order_limit(size)
+
+    flights, next_cursor = keyset.page(query_all(sql, tuple(params)), size)
     
     # Serialize dates
     for f in flights:
         if f.get('departure_time'): f['departure_time'] = str(f['departure_time'])
         if f.get('arrival_time'): f['arrival_time'] = str(f['arrival_time'])
         
-    return jsonify(flights)
+    return pagination.next_page_headers(jsonify(flights), next_cursor)
+
+
+PASSENGER_EXPORT_COLUMNS = ["ticket_ID", "name", "email", "purchase_date", "agent_email"]
+CUSTOMER_FLIGHT_EXPORT_COLUMNS = [
+    "ticket_ID", "customer_email", "flight_number", "departure_airport", "arrival_airport",
+    "departure_time", "arrival_time", "status",
+]
+
+
+@staff_bp.route("/export/passengers")
+@login_required(role="staff")
+def export_passengers():
+    """Stream every passenger of ?flight_number= as CSV or NDJSON (?format=)."""
+    _, airline_name = _get_staff_and_airline()
+    flight_number = request.args.get("flight_number", "").strip()
+    fmt = exports.requested_format()
+    if not flight_number:
+        return jsonify({"error": "flight_number is required."}), 400
+    if fmt is None:
+        return jsonify({"error": "Unsupported format. Use csv or ndjson."}), 400
+
+    try:
+        stream = stream_query(_PASSENGERS_SQL + " ORDER BY t.ticket_ID", (airline_name, flight_number))
+    except Exception as e:
+        print(f"Export error: {e}")
+        return jsonify({"error": "Export failed."}), 500
+    return exports.export_response(
+        stream, PASSENGER_EXPORT_COLUMNS, fmt, f"passengers_{airline_name}_{flight_number}"
+    )
+
+
+@staff_bp.route("/export/customer_flights")
+@login_required(role="staff")
+def export_customer_flights():
+    """Stream the airline's customer flight history (optionally ?customer_email=) as CSV or NDJSON."""
+    _, airline_name = _get_staff_and_airline()
+    fmt = exports.requested_format()
+    if fmt is None:
+        return jsonify({"error": "Unsupported format. Use csv or ndjson."}), 400
+
+    sql, params, keyset = _customer_flights_query(airline_name, request.args.get("customer_email", "").strip())
+    sql += keyset.order_by()
+    try:
+        stream = stream_query(sql, tuple(params))
+    except Exception as e:
+        print(f"Export error: {e}")
+        return jsonify({"error": "Export failed."}), 500
+    return exports.export_response(stream, CUSTOMER_FLIGHT_EXPORT_COLUMNS, fmt, f"customer_flights_{airline_name}")
 
 
 @staff_bp.route("/analytics")
@@ -157,18 +269,17 @@ def api_customer_flights():
 def analytics():
     staff, airline_name = _get_staff_and_airline()
 
+    # 所有销售统计都读每日汇总表 (sales_daily_*)，不再扫描 purchases 全量历史
+
     # Top agents (month) - by ticket count
     sql_top_agent_month = """
-        SELECT p.agent_email,
-               COUNT(*) AS ticket_count,
-               COALESCE(SUM(t.ticket_price*0.1), 0) AS commission
-        FROM purchases p
-        JOIN ticket t ON p.ticket_ID = t.ticket_ID
-        JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
-        WHERE f.airline_name=%s
-          AND p.purchase_date >= DATE_SUB(CURDATE(), INTERVAL 1 MONTH)
-          AND p.agent_email IS NOT NULL
-        GROUP BY p.agent_email
+        SELECT agent_email,
+               SUM(ticket_count) AS ticket_count,
+               COALESCE(SUM(revenue)*0.1, 0) AS commission
+        FROM sales_daily_agent
+        WHERE airline_name=%s
+          AND sale_date >= DATE_SUB(CURDATE(), INTERVAL 1 MONTH)
+        GROUP BY agent_email
         ORDER BY ticket_count DESC
         LIMIT 5
     """
@@ -177,18 +288,18 @@ def analytics():
     # Top agents (year) - by ticket count
     sql_top_agent_year = sql_top_agent_month.replace("1 MONTH", "1 YEAR")
     top_agent_year = query_all(sql_top_agent_year, (airline_name,))
+    # SUM() comes back as DECIMAL; keep counts as ints for the charts
+    for r in (*top_agent_month, *top_agent_year):
+        r["ticket_count"] = int(r["ticket_count"])
 
     # Top agents (year) - by commission
     sql_top_agent_commission_year = """
-        SELECT p.agent_email,
-               COALESCE(SUM(t.ticket_price*0.1), 0) AS total_commission
-        FROM purchases p
-        JOIN ticket t ON p.ticket_ID = t.ticket_ID
-        JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
-        WHERE f.airline_name=%s
-          AND p.purchase_date >= DATE_SUB(CURDATE(), INTERVAL 1 YEAR)
-          AND p.agent_email IS NOT NULL
-        GROUP BY p.agent_email
+        SELECT agent_email,
+               COALESCE(SUM(revenue)*0.1, 0) AS total_commission
+        FROM sales_daily_agent
+        WHERE airline_name=%s
+          AND sale_date >= DATE_SUB(CURDATE(), INTERVAL 1 YEAR)
+        GROUP BY agent_email
         ORDER BY total_commission DESC
         LIMIT 5
     """
@@ -200,26 +311,22 @@ def analytics():
 
     # Most frequent customer last year
     sql_freq_cust = """
-        SELECT p.customer_email, COUNT(*) AS cnt
-        FROM purchases p
-        JOIN ticket t ON p.ticket_ID = t.ticket_ID
-        JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
-        WHERE f.airline_name=%s
-          AND p.purchase_date >= DATE_SUB(CURDATE(), INTERVAL 1 YEAR)
-        GROUP BY p.customer_email
+        SELECT customer_email, SUM(ticket_count) AS cnt
+        FROM sales_daily_customer
+        WHERE airline_name=%s
+          AND sale_date >= DATE_SUB(CURDATE(), INTERVAL 1 YEAR)
+        GROUP BY customer_email
         ORDER BY cnt DESC
         LIMIT 1
     """
     most_freq_customer = query_one(sql_freq_cust, (airline_name,))
 
-    # tickets sold per month
+    # tickets sold per month (every purchase has exactly one customer row)
     sql_tickets_month = """
-        SELECT DATE_FORMAT(p.purchase_date, '%%Y-%%m') AS month,
-               COUNT(*) AS cnt
-        FROM purchases p
-        JOIN ticket t ON p.ticket_ID = t.ticket_ID
-        JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
-        WHERE f.airline_name=%s
+        SELECT DATE_FORMAT(sale_date, '%%Y-%%m') AS month,
+               SUM(ticket_count) AS cnt
+        FROM sales_daily_customer
+        WHERE airline_name=%s
         GROUP BY month
         ORDER BY month
     """
@@ -240,13 +347,11 @@ def analytics():
 
     # top destinations last 3 months / last year
     sql_top_dest_3m = """
-        SELECT f.arrival_airport, COUNT(*) AS cnt
-        FROM purchases p
-        JOIN ticket t ON p.ticket_ID = t.ticket_ID
-        JOIN flight f ON t.airline_name = f.airline_name AND t.flight_number = f.flight_number
-        WHERE f.airline_name=%s
-          AND p.purchase_date >= DATE_SUB(CURDATE(), INTERVAL 3 MONTH)
-        GROUP BY f.arrival_airport
+        SELECT arrival_airport, SUM(ticket_count) AS cnt
+        FROM sales_daily_destination
+        WHERE airline_name=%s
+          AND sale_date >= DATE_SUB(CURDATE(), INTERVAL 3 MONTH)
+        GROUP BY arrival_airport
         ORDER BY cnt DESC
         LIMIT 5
     """
@@ -254,6 +359,8 @@ def analytics():
 
     sql_top_dest_1y = sql_top_dest_3m.replace("3 MONTH", "1 YEAR")
     top_dest_1y = query_all(sql_top_dest_1y, (airline_name,))
+    for r in (*top_dest_3m, *top_dest_1y):
+        r["cnt"] = int(r["cnt"])
 
     return render_template(
         "staff_analytics.html",
@@ -294,6 +401,8 @@ def add_airport():
                 
                 # 3. Now insert the airport
                 execute_sql("INSERT INTO airport (name, city) VALUES (%s, %s)", (name, city))
+                airport_resolver.reload()
+                cache.active_airports.invalidate()
                 flash("Airport added.")
             except Exception as e:
                 flash(f"Error: {e}", "error")
@@ -394,6 +503,9 @@ def add_flight():
                             departure_time, arrival_time, price, status, airplane_assigned, remaining_seats_value
                         ),
                     )
+                    search_index.refresh_flight(airline_name, flight_number)
+                    cache.active_airports.invalidate()
+                    flight_events.publish_flight(airline_name, flight_number, "created")
                     flash("Flight created.")
                 except Exception as e:
                     flash(f"Error: {e}", "error")
@@ -405,6 +517,109 @@ def add_flight():
     return render_template("staff_admin_flight.html", airline_name=airline_name, flights=flights, airports=airports)
 
 
+@staff_bp.route("/admin/flight/import", methods=["GET", "POST"])
+@login_required(role="staff")
+@staff_permission_required("Admin")
+def import_flights():
+    """Bulk schedule import: CSV / JSON / NDJSON upload, or a JSON body (returns JSON)."""
+    staff, airline_name = _get_staff_and_airline()
+    wants_json = request.is_json or request.accept_mimetypes.best == "application/json"
+    report = None
+
+    if request.method == "POST":
+        options = request.args if request.is_json else request.form
+        skip_invalid = options.get("skip_invalid") in ("1", "true", "on")
+        dry_run = options.get("dry_run") in ("1", "true", "on")
+        try:
+            if request.is_json:
+                records = flight_import.parse_upload(request.get_data(), "json")
+            else:
+                upload = request.files.get("file")
+                if not upload or not upload.filename:
+                    raise flight_import.ImportFormatError("Choose a file to import.")
+                fmt = flight_import.guess_format(upload.filename, request.form.get("format"))
+                records = flight_import.parse_upload(upload.read(), fmt)
+            report = flight_import.import_flights(records, airline_name, skip_invalid=skip_invalid, dry_run=dry_run)
+        except flight_import.ImportFormatError as e:
+            if wants_json:
+                return jsonify({"error": str(e)}), 400
+            flash(f"Error: {e}", "error")
+        except Exception as e:
+            print(f"Error importing flights: {e}")
+            if wants_json:
+                return jsonify({"error": f"Import failed, nothing was imported: {e}"}), 500
+            flash(f"Error: import failed, nothing was imported: {e}", "error")
+
+        if report is not None and wants_json:
+            return jsonify(report), (200 if report["inserted"] or dry_run or not report["error_count"] else 422)
+        if report is not None and report["inserted"]:
+            flash(f"Imported {report['inserted']} flights.")
+
+    return render_template("staff_admin_flight_import.html", airline_name=airline_name, report=report,
+                           fields=flight_import.FIELDS, statuses=flight_import.STATUSES)
+
+
+@staff_bp.route("/admin/schedules", methods=["GET", "POST"])
+@login_required(role="staff")
+@staff_permission_required("Admin")
+def manage_schedules():
+    """Create / edit recurring schedules; saving one expands it over the rolling horizon."""
+    staff, airline_name = _get_staff_and_airline()
+    form = {}
+    edit_id = request.args.get("edit", type=int)
+
+    if request.method == "POST":
+        edit_id = request.form.get("schedule_id", type=int)
+        form = request.form
+        values, errors = schedules.validate_schedule(request.form, airline_name)
+        if errors:
+            for error in errors:
+                flash(f"Error: {error}", "error")
+        else:
+            try:
+                schedule_id = schedules.save_schedule(values, airline_name, edit_id)
+                if schedule_id is None:
+                    flash("Error: Schedule not found.", "error")
+                else:
+                    report = schedules.expand(schedule_ids=[schedule_id])
+                    flash(
+                        f"Schedule {values['service_number']} saved: {report['created']} flights created, "
+                        f"{report['updated']} updated, {report['cancelled']} cancelled."
+                    )
+                    return redirect(url_for("staff.manage_schedules"))
+            except Exception as e:
+                print(f"Error saving schedule: {e}")
+                flash(f"Error: {e}", "error")
+    elif edit_id:
+        form = next((s for s in schedules.list_schedules(airline_name) if s["schedule_id"] == edit_id), {})
+
+    return render_template(
+        "staff_admin_schedules.html",
+        airline_name=airline_name,
+        schedules=schedules.list_schedules(airline_name),
+        form=form,
+        edit_id=edit_id if form else None,
+        horizon=current_app.config.get("SCHEDULE_HORIZON_DAYS", 60),
+    )
+
+
+@staff_bp.route("/admin/schedules/expand", methods=["POST"])
+@login_required(role="staff")
+@staff_permission_required("Admin")
+def expand_schedules():
+    staff, airline_name = _get_staff_and_airline()
+    try:
+        report = schedules.expand(airline_name=airline_name)
+        flash(
+            f"Expanded {report['schedules']} schedules through {report['window'][1]}: "
+            f"{report['created']} flights created, {report['updated']} updated, {report['cancelled']} cancelled."
+        )
+    except Exception as e:
+        print(f"Error expanding schedules: {e}")
+        flash(f"Error: {e}", "error")
+    return redirect(url_for("staff.manage_schedules"))
+
+
 @staff_bp.route("/admin/agent", methods=["GET", "POST"])
 @login_required(role="staff")
 @staff_permission_required("Admin")
@@ -425,6 +640,7 @@ def add_agent():
                         "INSERT INTO work_with (agent_email, airline_name) VALUES (%s, %s)",
                         (agent_email, airline_name),
                     )
+                    identity.invalidate_agent(agent_email)
                     flash("Agent associated with airline.")
                 except Exception as e:
                     flash(f"Error: {e}", "error")
@@ -511,16 +727,21 @@ def update_status():
         try:
             execute_sql("UPDATE flight SET status=%s WHERE airline_name=%s AND flight_number=%s",
                         (new_status, airline_name, flight_num))
+            search_index.set_status(airline_name, flight_num, new_status)
+            cache.active_airports.invalidate()
+            flight_events.publish_flight(airline_name, flight_num, "status")
             flash(f"Flight {flight_num} status updated to {new_status}.")
         except Exception as e:
             flash(f"Error updating status: {e}")
 
         return redirect(url_for("staff.update_status"))
 
-    # GET: Show all upcoming/in-progress flights to allow selection
+    # GET: Show upcoming / in-progress flights and those that departed in the last 2 days;
+    # older ones are moved on by `flights lifecycle` and archived
     sql = """
         SELECT * FROM flight
         WHERE airline_name = %s
+          AND departure_time >= DATE_SUB(NOW(), INTERVAL 2 DAY)
         ORDER BY departure_time ASC
     """
     flights = query_all(sql, (airline_name,))
@@ -557,53 +778,52 @@ def get_airports():
     _, airline_name = _get_staff_and_airline()
     params = [airline_name]
 
-    try:
+    def load():
         # 1. ALL TIME
         sql_all_origins = """
-            SELECT DISTINCT f.departure_airport AS code, a.city
-            FROM flight f
-            JOIN airport a ON f.departure_airport = a.name
+            SELECT DISTINCT f.departure_airport AS code, f.dep_city AS city
+            FROM flight_search f
             WHERE f.airline_name = %s
-            ORDER BY a.city, f.departure_airport
+            ORDER BY f.dep_city, f.departure_airport
         """
         all_origins = query_all(sql_all_origins, tuple(params))
 
         sql_all_dests = """
-            SELECT DISTINCT f.arrival_airport AS code, a.city
-            FROM flight f
-            JOIN airport a ON f.arrival_airport = a.name
+            SELECT DISTINCT f.arrival_airport AS code, f.arr_city AS city
+            FROM flight_search f
             WHERE f.airline_name = %s
-            ORDER BY a.city, f.arrival_airport
+            ORDER BY f.arr_city, f.arrival_airport
         """
         all_dests = query_all(sql_all_dests, tuple(params))
 
         # 2. NEXT 30 DAYS
         sql_30_origins = """
-            SELECT DISTINCT f.departure_airport AS code, a.city
-            FROM flight f
-            JOIN airport a ON f.departure_airport = a.name
+            SELECT DISTINCT f.departure_airport AS code, f.dep_city AS city
+            FROM flight_search f
             WHERE f.airline_name = %s
               AND f.departure_time BETWEEN NOW() AND DATE_ADD(NOW(), INTERVAL 30 DAY)
-            ORDER BY a.city, f.departure_airport
+            ORDER BY f.dep_city, f.departure_airport
         """
         next_30_origins = query_all(sql_30_origins, tuple(params))
 
         sql_30_dests = """
-            SELECT DISTINCT f.arrival_airport AS code, a.city
-            FROM flight f
-            JOIN airport a ON f.arrival_airport = a.name
+            SELECT DISTINCT f.arrival_airport AS code, f.arr_city AS city
+            FROM flight_search f
             WHERE f.airline_name = %s
               AND f.departure_time BETWEEN NOW() AND DATE_ADD(NOW(), INTERVAL 30 DAY)
-            ORDER BY a.city, f.arrival_airport
+            ORDER BY f.arr_city, f.arrival_airport
         """
         next_30_dests = query_all(sql_30_dests, tuple(params))
 
-        return jsonify({
+        return {
             "all_origins": all_origins,
             "all_destinations": all_dests,
             "next_30_origins": next_30_origins,
             "next_30_destinations": next_30_dests
-        })
+        }
+
+    try:
+        return cached_json_response(cache.active_airports, ("staff", airline_name), load)
     except Exception as e:
         print(f"Error getting airports: {e}")
         return jsonify({
@@ -621,41 +841,60 @@ def search_flights_api():
     end_date = request.args.get("end_date")
     origin = request.args.get("origin")
     dest = request.args.get("destination")
-    date_range = request.args.get("range", "30") # Default to 30 days
+    range_opt = request.args.get("range", "30") # Default to 30 days
     
+    # Default view (next 30 days, no manual dates) is served from the in-memory
+    # index; manual date ranges and "All" may reach into the past, so they
+    # still go to the database.
+    if not (start_date or end_date) and range_opt == "30":
+        try:
+            now = datetime.now()
+            flights = search_index.search(
+                origin or "", dest or "",
+                airlines=[airline_name],
+                start=now,
+                end=now + timedelta(days=30),
+                limit=None,
+            )
+            for f in flights:
+                f['departure_time'] = f['departure_time'].strftime('%Y-%m-%d %H:%M')
+                if f.get('arrival_time'):
+                    f['arrival_time'] = f['arrival_time'].strftime('%Y-%m-%d %H:%M')
+            return jsonify(flights)
+        except Exception as e:
+            print(f"Search API Error: {e}")
+            return jsonify([])
+
     params = [airline_name]
     conditions = ["f.airline_name = %s"]
     
     # 1. If specific dates are manually picked, they take priority
     if start_date or end_date:
-        if start_date:
-            conditions.append("f.departure_time >= %s")
-            params.append(start_date)
-        if end_date:
-            conditions.append("f.departure_time <= %s")
-            params.append(end_date)
+        conds, date_params = date_range("f.departure_time", start_date, end_date)
+        conditions.extend(conds)
+        params.extend(date_params)
     else:
         # 2. Otherwise, use the toggle (30 days vs All)
-        if date_range == "30":
+        if range_opt == "30":
             conditions.append("f.departure_time BETWEEN NOW() AND DATE_ADD(NOW(), INTERVAL 30 DAY)")
         else:
             pass
 
     if origin:
-        conditions.append("(f.departure_airport LIKE %s OR da.city LIKE %s OR da.city IN (SELECT ca.city_name FROM city_alias ca WHERE ca.alias_name = %s))")
-        params.extend([f"%{origin}%", f"%{origin}%", origin])
+        clause, codes = airport_resolver.in_clause("f.departure_airport", origin)
+        conditions.append(clause)
+        params.extend(codes)
     if dest:
-        conditions.append("(f.arrival_airport LIKE %s OR aa.city LIKE %s OR aa.city IN (SELECT ca.city_name FROM city_alias ca WHERE ca.alias_name = %s))")
-        params.extend([f"%{dest}%", f"%{dest}%", dest])
+        clause, codes = airport_resolver.in_clause("f.arrival_airport", dest)
+        conditions.append(clause)
+        params.extend(codes)
         
     where_clause = " AND ".join(conditions)
     
-    # Join with airport table to get city names
+    # City names come from the flight_search read model
     sql = f"""
-        SELECT f.*, da.city AS dep_city, aa.city AS arr_city
-        FROM flight f
-        LEFT JOIN airport da ON f.departure_airport = da.name
-        LEFT JOIN airport aa ON f.arrival_airport = aa.name
+        SELECT f.*
+        FROM flight_search f
         WHERE {where_clause}
         ORDER BY f.departure_time ASC
     """
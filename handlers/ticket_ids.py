@@ -0,0 +1,166 @@
+"""
+ticket_ID 生成器：16 位、按时间有序、带 worker id、进程内单调递增。
+
+80 位整数按 Crockford base32 (0-9 A-Z 去掉 I L O U，ASCII 升序) 编成 16 个字符，
+正好放进 ticket.ticket_ID char(16)，字符串顺序 = 数值顺序：
+
+    42 位  毫秒时间戳 (自 2024-01-01 UTC，可用到 2163 年)
+    14 位  worker id (0-16383)
+    24 位  同一毫秒内的序号
+
+- 同一进程内严格递增：时钟回拨时沿用上一次的毫秒；一毫秒内序号用完就借下一毫秒，
+  所以一个进程每毫秒最多 800 万+ 个 (每进程每秒远超百万)；
+- 不同进程靠 worker id 区分：TICKET_WORKER_ID 显式配置 (多机 / 多 worker 部署应逐进程配置)，
+  否则由主机名 + pid 推出，fork 出的子进程会重新推一次；
+- 每个新毫秒的序号从 [0, 2^23) 里随机起步，worker id 万一撞上也很难撞出同一个 ID，
+  真撞上时 purchase_service 遇到主键冲突会换一个 ID 重试；
+- 新 ID 总比之前的大，InnoDB 主键按顺序追加，不像 uuid4 那样随机插入导致页分裂。
+"""
+import os
+import random
+import socket
+import threading
+import time
+import zlib
+from base64 import b32encode
+
+# 2024-01-01T00:00:00Z，毫秒
+EPOCH_MS = 1704067200000
+
+TIMESTAMP_BITS = 42
+WORKER_BITS = 14
+SEQUENCE_BITS = 24
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+_SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+_RANDOM_START = 1 << (SEQUENCE_BITS - 1)
+
+_DIGITS = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+# 标准 base32 字母表 -> Crockford (升序)，用 C 实现的 b32encode + translate 编码
+_CROCKFORD = bytes.maketrans(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ234567", _DIGITS.encode())
+
+
+def default_worker_id():
+    """Worker id derived from host name and pid (used when TICKET_WORKER_ID is not set)."""
+    return zlib.crc32(f"{socket.gethostname()}:{os.getpid()}".encode()) & MAX_WORKER_ID
+
+
+def encode(value):
+    """80-bit int -> 16-character sortable string."""
+    return b32encode(value.to_bytes(10, "big")).translate(_CROCKFORD).decode("ascii")
+
+
+# 后 5 个字符 (低 25 位) 查表拼出：序号只落在低 24 位，同一毫秒内前 11 个字符不变，
+# 只编码一次 (见 TicketIdGenerator._head)
+_LOW_BITS = 25
+_TAIL_HI = [a + b + c for a in _DIGITS for b in _DIGITS for c in _DIGITS]  # 高 15 位
+_TAIL_LO = [a + b for a in _DIGITS for b in _DIGITS]  # 低 10 位
+
+
+def decode(ticket_id):
+    """(timestamp_ms, worker_id, sequence) of an ID minted here; ValueError for other IDs."""
+    if len(ticket_id) != 16:
+        raise ValueError(f"not a generated ticket ID: {ticket_id!r}")
+    value = 0
+    for ch in ticket_id.upper():
+        digit = _DIGITS.find(ch)
+        if digit < 0:
+            raise ValueError(f"not a generated ticket ID: {ticket_id!r}")
+        value = (value << 5) | digit
+    return (
+        (value >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS,
+        (value >> SEQUENCE_BITS) & MAX_WORKER_ID,
+        value & _SEQUENCE_MASK,
+    )
+
+
+class TicketIdGenerator:
+    """Thread-safe, monotonic ID source for one process."""
+
+    def __init__(self, worker_id=None):
+        if worker_id is not None and not 0 <= int(worker_id) <= MAX_WORKER_ID:
+            raise ValueError(f"worker id must be between 0 and {MAX_WORKER_ID}")
+        self._configured = worker_id
+        self._lock = threading.Lock()
+        self.worker_id = int(worker_id) if worker_id is not None else default_worker_id()
+        self._last_ms = 0
+        self._sequence = 0
+        self._head_cache = None
+
+    def configure(self, worker_id):
+        if worker_id is not None and not 0 <= int(worker_id) <= MAX_WORKER_ID:
+            raise ValueError(f"worker id must be between 0 and {MAX_WORKER_ID}")
+        with self._lock:
+            self._configured = worker_id
+            self.worker_id = int(worker_id) if worker_id is not None else default_worker_id()
+
+    def after_fork(self):
+        # 子进程继承了父进程的锁和 worker id：换一把锁，未显式配置的重新推一次
+        self._lock = threading.Lock()
+        if self._configured is None:
+            self.worker_id = default_worker_id()
+
+    def _advance(self, n):
+        """Reserve n consecutive IDs; returns (ms, first sequence). Caller holds the lock."""
+        now = int(time.time() * 1000) - EPOCH_MS
+        if now > self._last_ms:
+            self._last_ms = now
+            self._sequence = random.randrange(_RANDOM_START)
+        # 时钟回拨 / 同一毫秒：沿用 _last_ms；序号不够就借下一毫秒
+        if self._sequence + n > _SEQUENCE_MASK + 1:
+            self._last_ms += 1
+            self._sequence = 0
+        first = self._sequence
+        self._sequence += n
+        return self._last_ms, first
+
+    def _head(self, ms):
+        """(first 11 characters, low 25 bits without the sequence) for this ms and worker id."""
+        prefix = (ms << WORKER_BITS | self.worker_id) << SEQUENCE_BITS
+        high = prefix >> _LOW_BITS
+        cached = self._head_cache
+        if cached is None or cached[0] != high:
+            cached = self._head_cache = (high, encode(prefix)[:16 - _LOW_BITS // 5])
+        return cached[1], prefix & ((1 << _LOW_BITS) - 1)
+
+    def next_id(self):
+        with self._lock:
+            ms, seq = self._advance(1)
+            head, low = self._head(ms)
+        low |= seq
+        return head + _TAIL_HI[low >> 10] + _TAIL_LO[low & 1023]
+
+    def next_ids(self, n):
+        """n consecutive IDs in one lock round trip (group bookings)."""
+        if n <= 0:
+            return []
+        ids = []
+        hi, lo = _TAIL_HI, _TAIL_LO
+        while n:
+            # 一批最多占满一毫秒的序号空间
+            chunk = min(n, _SEQUENCE_MASK + 1)
+            with self._lock:
+                ms, first = self._advance(chunk)
+                head, low = self._head(ms)
+            ids.extend([head + hi[v >> 10] + lo[v & 1023] for v in range(low | first, (low | first) + chunk)])
+            n -= chunk
+        return ids
+
+
+_generator = TicketIdGenerator()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_generator.after_fork)
+
+
+def init_ticket_ids(app):
+    """Pin the worker id from TICKET_WORKER_ID (None / unset = derive from host + pid)."""
+    _generator.configure(app.config.get("TICKET_WORKER_ID"))
+
+
+def new_ticket_id():
+    """Next ticket_ID of this process."""
+    return _generator.next_id()
+
+
+def new_ticket_ids(n):
+    """n ticket_IDs, ascending."""
+    return _generator.next_ids(n)
@@ -1,31 +1,88 @@
 import pymysql
 from flask import current_app, g, redirect, url_for, session, flash
 from functools import wraps
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from .db_pool import ConnectionPool, PoolExhaustedError
+from .metrics import InstrumentedCursor, InstrumentedSSCursor
+from .sqlite_backend import SQLiteBackend
+
+class MySQLBackend:
+    """Production backend: pymysql connections to DB_HOST / DB_NAME."""
+
+    name = "mysql"
+
+    def __init__(self, config):
+        self.config = config
+
+    def connect(self):
+        config = self.config
+        return pymysql.connect(
+            host=config["DB_HOST"],
+            port=config["DB_PORT"],
+            user=config["DB_USER"],
+            password=config["DB_PASSWORD"],
+            database=config["DB_NAME"],
+            # DictCursor + per-statement timing for /metrics
+            cursorclass=InstrumentedCursor,
+            autocommit=True,
+            charset="utf8mb4",
+        )
+
+    def prepare(self, app):
+        # 表结构由 basic_info.sql + `flask db migrate` 维护
+        pass
+
+# DB_BACKEND 选择；sqlite 是本地运行用的嵌入式替身 (见 sqlite_backend.py)
+BACKENDS = {"mysql": MySQLBackend, "sqlite": SQLiteBackend}
+
+def get_backend(app=None):
+    app = app or current_app
+    return app.extensions["db_backend"]
+
+def get_pool(app=None):
+    app = app or current_app
+    return app.extensions["db_pool"]
+
+def pool_stats():
+    """当前进程连接池的运行时统计 (in use / idle / wait time / created / destroyed)。"""
+    return get_pool().stats()
 
 def get_db():
     """
     获取当前请求使用的 DB 连接，存在 g 中以复用。
+    连接从进程级连接池借出，请求结束时归还。
     """
     if "db" not in g:
-        g.db = pymysql.connect(
-            host=current_app.config["DB_HOST"],
-            port=current_app.config["DB_PORT"],
-            user=current_app.config["DB_USER"],
-            password=current_app.config["DB_PASSWORD"],
-            database=current_app.config["DB_NAME"],
-            cursorclass=pymysql.cursors.DictCursor,
-            autocommit=True,
-            charset="utf8mb4",
-        )
+        g.db = get_pool().acquire()
     return g.db
 
 def close_db(e=None):
     db = g.pop("db", None)
     if db is not None:
-        db.close()
+        get_pool().release(db)
 
 def init_db_connection(app):
+    config = app.config
+    name = config.get("DB_BACKEND", "mysql")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown DB_BACKEND {name!r}; expected one of {', '.join(BACKENDS)}")
+    backend = app.extensions["db_backend"] = BACKENDS[name](config)
+    app.extensions["db_pool"] = ConnectionPool(
+        backend.connect,
+        max_size=config.get("DB_POOL_SIZE", 10),
+        timeout=config.get("DB_POOL_TIMEOUT", 5.0),
+        recycle=config.get("DB_POOL_RECYCLE", 3600),
+        ping_interval=config.get("DB_POOL_PING_INTERVAL", 0),
+    )
     app.teardown_appcontext(close_db)
+    backend.prepare(app)
+
+    @app.errorhandler(PoolExhaustedError)
+    def handle_pool_exhausted(e):
+        print(f"DB pool exhausted: {e}")
+        return "Service is busy, please retry shortly.", 503, {"Retry-After": "1"}
 
 def login_required(role=None):
     """
@@ -82,3 +139,85 @@ def execute_sql(sql, params=None):
     with db.cursor() as cursor:
         cursor.execute(sql, params or ())
     # autocommit = True
+
+class RowStream:
+    """
+    Rows of one query read through an unbuffered server-side cursor (SSDictCursor):
+    MySQL sends the result set as we iterate, so memory stays flat for any row count.
+
+    The stream holds its own pooled connection (not g.db) because it is consumed
+    by the response after the request context is gone; close() returns it.
+    Closing before the end (client went away) discards the connection instead of
+    draining the rest of the result set.
+    """
+
+    def __init__(self, sql, params=None, batch_size=1000):
+        self._pool = get_pool()
+        self._conn = self._pool.acquire()
+        self._batch_size = batch_size
+        self._done = False
+        try:
+            self._cursor = self._conn.cursor(InstrumentedSSCursor)
+            self._cursor.execute(sql, params or ())
+        except BaseException:
+            self._pool.release(self._conn, discard=True)
+            self._conn = None
+            raise
+
+    def __iter__(self):
+        while self._conn is not None:
+            batch = self._cursor.fetchmany(self._batch_size)
+            if not batch:
+                self._done = True
+                self.close()
+                return
+            yield from batch
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        if self._done:
+            self._cursor.close()
+        self._pool.release(conn, discard=not self._done)
+
+def stream_query(sql, params=None, batch_size=1000):
+    """Execute now (errors surface before any response is sent); iterate later."""
+    return RowStream(sql, params, batch_size)
+
+def plain_value(value):
+    """DB value -> JSON / CSV friendly value (datetime, date and Decimal become strings)."""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).strip(), "%Y-%m-%d").date()
+
+def date_range(column, start=None, end=None):
+    """
+    日期筛选改写成半开区间，保持索引列裸露 (sargable)：
+        DATE(col) >= start AND DATE(col) <= end
+    =>  col >= start AND col < end + 1 day
+    start / end 为 'YYYY-MM-DD' 字符串或 date，空值表示不限。
+    返回 (conditions, params)；日期格式错误时返回恒假条件。
+    """
+    conditions, params = [], []
+    try:
+        if start:
+            conditions.append(f"{column} >= %s")
+            params.append(_as_date(start))
+        if end:
+            conditions.append(f"{column} < %s")
+            params.append(_as_date(end) + timedelta(days=1))
+    except ValueError:
+        return ["1=0"], []
+    return conditions, params